@@ -0,0 +1,313 @@
+"""mock ComfyUI 위에서 handler()를 실제와 비슷한 입력으로 돌려 처리량/단계별 지연/메모리를 측정
+
+    python bench/benchmark.py --jobs 40 --concurrency 4 --latency 0.5 --output-size 4000000
+    python bench/benchmark.py --json after.json --baseline before.json --tolerance 0.2
+
+--baseline을 주면 처리량이 줄거나 단계별 p95/최대 RSS가 tolerance 이상 늘었을 때 종료 코드 1로 끝난다.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from workflows import WAN22_BINDINGS, WAN22_FLF2V_BINDINGS  # noqa: E402
+
+SCENARIOS = ("base64_small", "base64_large", "image_ref", "url", "flf2v", "lora", "custom")
+# 합성 템플릿의 노드 class_type (바인딩 대상 노드 + 출력 노드)
+_TEMPLATE_CLASS_TYPES = {
+    "244": "LoadImage", "617": "LoadImage", "541": "WanVideoImageToVideoEncode", "135": "WanVideoTextEncode",
+    "220": "WanVideoSampler", "540": "WanVideoSampler", "834": "WanVideoSampler", "829": "SplitSigmas",
+    "235": "INTConstant", "236": "INTConstant", "498": "WanVideoContextOptions",
+    "279": "WanVideoLoraSelectMulti", "553": "WanVideoLoraSelectMulti", "131": "VHS_VideoCombine",
+}
+_LORAS = ("motion_high.safetensors", "motion_low.safetensors", "style/anime_high.safetensors", "style/anime_low.safetensors")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_status(pid, field):
+    """/proc/<pid>/status의 kB 값을 MiB로"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def _template_graph(bindings):
+    graph = {}
+    for targets in bindings.values():
+        for target in targets:
+            node_id = target["node"]
+            class_type = _TEMPLATE_CLASS_TYPES.get(node_id, "BenchNode")
+            inputs = {"steps": 10} if class_type == "WanVideoSampler" else {}
+            graph.setdefault(node_id, {"class_type": class_type, "inputs": inputs})
+    graph["131"] = {"class_type": "VHS_VideoCombine", "inputs": {"images": ["540", 0], "frame_rate": 16}}
+    return graph
+
+
+def prepare_environment(root, mock_port, args):
+    """합성 템플릿/LoRA 폴더/캐시 경로를 만들고 handler import 전에 환경 변수를 설정"""
+    template_dir = os.path.join(root, "workflows")
+    os.makedirs(template_dir, exist_ok=True)
+    node_types = set()
+    for name, bindings in (("wan22", WAN22_BINDINGS), ("wan22_flf2v", WAN22_FLF2V_BINDINGS)):
+        graph = _template_graph(bindings)
+        node_types.update(node["class_type"] for node in graph.values())
+        with open(os.path.join(template_dir, f"{name}.json"), 'w') as f:
+            json.dump(graph, f)
+        with open(os.path.join(template_dir, f"{name}.bindings.json"), 'w') as f:
+            json.dump(bindings, f)
+
+    lora_dir = os.path.join(root, "models", "loras")
+    for name in _LORAS:
+        path = os.path.join(lora_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(64 * 1024))
+    config_path = os.path.join(root, "extra_model_paths.yaml")
+    with open(config_path, 'w') as f:
+        f.write(f"bench:\n    base_path: {os.path.join(root, 'models')}\n    loras: loras/\n    diffusion_models: diffusion_models/\n")
+
+    os.environ.update({
+        "SERVER_ADDRESS": "127.0.0.1",
+        "SERVER_PORT": str(mock_port),
+        "WORKFLOW_TEMPLATE_DIR": template_dir,
+        "MODEL_PATHS_CONFIG": config_path,
+        "MODEL_CACHE_DIR": "",
+        "RESULT_CACHE_DIR": os.path.join(root, "results") if args.result_cache else "",
+        "DOWNLOAD_CACHE_DIR": os.path.join(root, "downloads"),
+        "INPUT_STORE_DIR": os.path.join(root, "inputs"),
+        "COMFYUI_INPUT_DIR": os.path.join(root, "comfy-input-not-shared"),
+        "JOB_CONCURRENCY": str(args.concurrency),
+    })
+    return node_types
+
+
+def make_images(root, seed=0):
+    """크기가 다른 입력 이미지 (노이즈라 JPEG 압축이 잘 안 돼 실제 사진 크기에 가까움)"""
+    from PIL import Image
+    rng = random.Random(seed)
+    images = {}
+    for name, size in (("small", (512, 512)), ("large", (1920, 1080)), ("end", (512, 512))):
+        image = Image.effect_noise(size, 64).convert("RGB")
+        image = Image.blend(image, Image.new("RGB", size, (rng.randrange(256), 96, 160)), 0.5)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        images[name] = buffer.getvalue()
+        with open(os.path.join(root, f"{name}.jpg"), 'wb') as f:
+            f.write(images[name])
+    return images
+
+
+def build_job(scenario, index, images, image_base_url):
+    seed = random.randrange(1 << 31)
+    common = {"prompt": f"benchmark {scenario} {index}", "seed": seed, "cfg": 1.0, "width": 480, "height": 832, "length": 81, "steps": 10}
+    small = base64.b64encode(images["small"]).decode('ascii')
+    if scenario == "base64_small":
+        job_input = {**common, "image_base64": small}
+    elif scenario == "base64_large":
+        job_input = {**common, "image_base64": base64.b64encode(images["large"]).decode('ascii')}
+    elif scenario == "image_ref":
+        # 큰 이미지를 미리 upload_only로 올려 두고 해시만 보냄 (파라미터 스윕)
+        job_input = {**common, "image_ref": hashlib.sha256(images["large"]).hexdigest()}
+    elif scenario == "url":
+        job_input = {**common, "image_url": f"{image_base_url}/large.jpg"}
+    elif scenario == "flf2v":
+        job_input = {**common, "image_base64": small, "end_image_base64": base64.b64encode(images["end"]).decode('ascii')}
+    elif scenario == "lora":
+        # 대소문자/확장자/하위 폴더가 다른 이름도 섞어 인덱스 보정 경로를 함께 측정
+        job_input = {**common, "image_base64": small, "lora_pairs": [
+            {"high": "motion_high.safetensors", "low": "Motion_Low", "high_weight": 1.0, "low_weight": 1.0},
+            {"high": "anime_high", "low": "style/anime_low.safetensors", "high_weight": 0.8, "low_weight": 0.8},
+        ]}
+    elif scenario == "custom":
+        job_input = {"image_base64": small, "workflow": {
+            "1": {"class_type": "LoadImage", "inputs": {"image": "input_image.jpg"}},
+            "2": {"class_type": "KSampler", "inputs": {"steps": 10, "seed": seed, "model": ["1", 0]}},
+            "3": {"class_type": "VHS_VideoCombine", "inputs": {"images": ["2", 0], "frame_rate": 16}},
+        }}
+    else:
+        raise ValueError(f"unknown scenario: {scenario}")
+    return {"id": f"bench-{scenario}-{index}", "input": job_input}
+
+
+def summarize(samples, wall, scenarios, args):
+    stages = {}
+    for sample in samples:
+        for stage, seconds in sample.get("timings", {}).items():
+            stages.setdefault(stage, []).append(seconds)
+    errors = [sample for sample in samples if sample.get("error")]
+    return {
+        "jobs": len(samples),
+        "errors": len(errors),
+        "error_messages": sorted({str(sample["error"])[:200] for sample in errors}),
+        "concurrency": args.concurrency,
+        "scenarios": list(scenarios),
+        "latency": args.latency,
+        "output_size": args.output_size,
+        "wall_seconds": round(wall, 3),
+        "jobs_per_sec": round(len(samples) / wall, 3) if wall else 0.0,
+        "peak_rss_mb": _proc_status(os.getpid(), "VmHWM"),
+        "stages": {
+            stage: {
+                "p50": round(_percentile(values, 0.5), 4),
+                "p95": round(_percentile(values, 0.95), 4),
+                "p99": round(_percentile(values, 0.99), 4),
+                "mean": round(sum(values) / len(values), 4),
+                "count": len(values),
+            }
+            for stage, values in sorted(stages.items())
+        },
+    }
+
+
+def compare(report, baseline, tolerance, min_seconds=0.005):
+    """기준 결과 대비 회귀 목록"""
+    regressions = []
+    if report["jobs_per_sec"] < baseline["jobs_per_sec"] * (1 - tolerance):
+        regressions.append(f"jobs/sec {baseline['jobs_per_sec']} -> {report['jobs_per_sec']}")
+    if report.get("peak_rss_mb") and baseline.get("peak_rss_mb") and report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']} MiB -> {report['peak_rss_mb']} MiB")
+    for stage, stats in report["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before is None:
+            continue
+        # 아주 짧은 단계는 잡음이 커서 절대값 기준도 함께 적용
+        if stats["p95"] > before["p95"] * (1 + tolerance) and stats["p95"] - before["p95"] > min_seconds:
+            regressions.append(f"{stage} p95 {before['p95']}s -> {stats['p95']}s")
+    return regressions
+
+
+def print_report(report):
+    print(f"\njobs {report['jobs']} (errors {report['errors']}), concurrency {report['concurrency']}, "
+          f"wall {report['wall_seconds']}s, {report['jobs_per_sec']} jobs/sec, peak RSS {report['peak_rss_mb']} MiB")
+    for message in report["error_messages"]:
+        print(f"  error: {message}")
+    print(f"\n{'stage':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}{'n':>6}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<16}{stats['p50']:>10.4f}{stats['p95']:>10.4f}{stats['p99']:>10.4f}{stats['mean']:>10.4f}{stats['count']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark handler() against a mock ComfyUI server")
+    parser.add_argument("--jobs", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=float, default=0.5, help="mock execution seconds per prompt")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--output-size", type=int, default=4 * 1024 * 1024, help="mock output bytes per video")
+    parser.add_argument("--trace", default=None, help="ws trace for the mock to replay instead of synthetic events")
+    parser.add_argument("--trace-speed", type=float, default=1.0)
+    parser.add_argument("--result-cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--json", default=None, help="write the report as JSON")
+    parser.add_argument("--baseline", default=None, help="previous --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    scenarios = [s for s in args.scenarios.split(",") if s]
+
+    root = tempfile.mkdtemp(prefix="worker-bench-")
+    mock_port = _free_port()
+    node_types = prepare_environment(root, mock_port, args)
+    images = make_images(root)
+
+    mock_cmd = [
+        sys.executable, os.path.join(REPO_ROOT, "bench", "mock_comfyui.py"),
+        "--port", str(mock_port), "--root", os.path.join(root, "comfyui"),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--output-size", str(args.output_size), "--node-types", ",".join(sorted(node_types | {"LoadImage", "KSampler"})),
+    ]
+    if args.trace:
+        mock_cmd += ["--trace", args.trace, "--trace-speed", str(args.trace_speed)]
+    mock = subprocess.Popen(mock_cmd)
+    file_server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=root))
+    threading.Thread(target=file_server.serve_forever, daemon=True).start()
+    image_base_url = f"http://127.0.0.1:{file_server.server_address[1]}"
+
+    cwd = os.getcwd()
+    try:
+        # handler는 작업 디렉토리 아래 task_<uuid>/에 입력을 저장하므로 임시 루트에서 실행하고 끝나면 삭제
+        os.chdir(root)
+        import handler
+        handler.cold_start.done.wait(60)
+        if handler.cold_start.error:
+            raise SystemExit(f"mock ComfyUI not ready: {handler.cold_start.error}")
+
+        if "image_ref" in scenarios:
+            handler.handler({"id": "bench-upload", "input": {"upload_only": True, "image_base64": base64.b64encode(images["large"]).decode('ascii')}})
+        jobs = [build_job(scenarios[i % len(scenarios)], i, images, image_base_url) for i in range(args.jobs)]
+        samples = []
+        lock = threading.Lock()
+
+        def run(job):
+            started = time.monotonic()
+            try:
+                result = handler.handler(job)
+                sample = {"timings": result.get("timings", {}), "error": result.get("error")}
+            except Exception as e:
+                sample = {"error": e}
+            sample.setdefault("timings", {}).setdefault("total", round(time.monotonic() - started, 4))
+            with lock:
+                samples.append(sample)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(run, jobs))
+        report = summarize(samples, time.monotonic() - started, scenarios, args)
+    finally:
+        os.chdir(cwd)
+        mock.terminate()
+        mock.wait()
+        file_server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+    sys.exit(1 if report["errors"] else 0)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    main()
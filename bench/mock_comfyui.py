@@ -0,0 +1,328 @@
+"""GPU 없이 워커를 측정하기 위한 ComfyUI 대역 서버
+
+워커가 사용하는 API(/, /system_stats, /object_info, /prompt, /ws, /history/{id}, /view,
+/upload/image, /queue, /interrupt)를 구현한다. prompt는 ComfyUI처럼 하나씩 실행되며,
+실행 시간/출력 크기를 설정하거나 record_trace.py로 녹화한 웹소켓 메시지를 재생할 수 있다.
+
+    python bench/mock_comfyui.py --port 8188 --latency 2.0 --output-size 5000000
+    python bench/mock_comfyui.py --trace trace.jsonl --trace-speed 10
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import struct
+import tempfile
+import uuid
+
+from aiohttp import web
+
+# 출력 노드로 보는 class_type (VHS_VideoCombine 등)
+_OUTPUT_CLASS_HINTS = ("VideoCombine", "SaveVideo", "SaveAnimated")
+
+
+class MockComfyUI:
+    def __init__(self, root, latency=1.0, jitter=0.0, steps=10, output_size=2 * 1024 * 1024,
+                 preview=False, trace=None, trace_speed=1.0, node_types=()):
+        self.root = root
+        self.input_dir = os.path.join(root, "input")
+        self.output_dir = os.path.join(root, "output")
+        os.makedirs(self.input_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.latency = latency
+        self.jitter = jitter
+        self.steps = steps
+        self.output_size = output_size
+        self.preview = preview
+        self.trace = self._load_trace(trace) if trace else None
+        self.trace_speed = trace_speed
+        self.node_types = set(node_types)
+
+        self.clients = {}
+        self.history = {}
+        self.pending = []
+        self.running = None
+        self.interrupted = False
+        self.stats = {"prompts": 0, "uploads": 0, "views": 0, "interrupts": 0}
+        self._wakeup = None
+
+    @staticmethod
+    def _load_trace(path):
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def index(self, request):
+        return web.Response(text="mock ComfyUI", content_type="text/html")
+
+    async def system_stats(self, request):
+        return web.json_response({
+            "system": {"os": "posix", "comfyui_version": "mock", "python_version": "", "embedded_python": False},
+            "devices": [{"name": "mock", "type": "cpu", "index": 0, "vram_total": 0, "vram_free": 0}],
+        })
+
+    async def object_info(self, request):
+        return web.json_response({class_type: {"input": {}, "output": []} for class_type in sorted(self.node_types)})
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        client_id = request.query.get("clientId") or str(uuid.uuid4())
+        self.clients[client_id] = ws
+        await ws.send_str(json.dumps({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": len(self.pending)}}, "sid": client_id}}))
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            if self.clients.get(client_id) is ws:
+                del self.clients[client_id]
+        return ws
+
+    async def queue_prompt(self, request):
+        body = await request.json()
+        prompt = body.get("prompt")
+        if not isinstance(prompt, dict) or not prompt:
+            return web.json_response({"error": {"type": "invalid_prompt", "message": "no prompt"}, "node_errors": {}}, status=400)
+        prompt_id = body.get("prompt_id") or str(uuid.uuid4())
+        self.stats["prompts"] += 1
+        self.pending.append({"prompt_id": prompt_id, "prompt": prompt, "client_id": body.get("client_id")})
+        self._wakeup.set()
+        return web.json_response({"prompt_id": prompt_id, "number": self.stats["prompts"], "node_errors": {}})
+
+    async def get_history(self, request):
+        prompt_id = request.match_info["prompt_id"]
+        entry = self.history.get(prompt_id)
+        return web.json_response({prompt_id: entry} if entry is not None else {})
+
+    async def view(self, request):
+        folder = self.output_dir if request.query.get("type", "output") == "output" else self.input_dir
+        path = os.path.join(folder, request.query.get("subfolder", ""), os.path.basename(request.query["filename"]))
+        if not os.path.isfile(path):
+            return web.Response(status=404)
+        self.stats["views"] += 1
+        return web.FileResponse(path)
+
+    async def upload_image(self, request):
+        form = await request.post()
+        image = form["image"]
+        subfolder = form.get("subfolder", "")
+        directory = os.path.join(self.input_dir, subfolder)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, image.filename), 'wb') as f:
+            f.write(image.file.read())
+        self.stats["uploads"] += 1
+        return web.json_response({"name": image.filename, "subfolder": subfolder, "type": "input"})
+
+    async def get_queue(self, request):
+        running = [[0, self.running["prompt_id"], {}, {}, []]] if self.running else []
+        pending = [[i + 1, item["prompt_id"], {}, {}, []] for i, item in enumerate(self.pending)]
+        return web.json_response({"queue_running": running, "queue_pending": pending})
+
+    async def post_queue(self, request):
+        body = await request.json()
+        if body.get("clear"):
+            self.pending.clear()
+        delete = set(body.get("delete", []))
+        self.pending = [item for item in self.pending if item["prompt_id"] not in delete]
+        return web.json_response({})
+
+    async def interrupt(self, request):
+        self.stats["interrupts"] += 1
+        body = await request.json() if request.can_read_body else {}
+        # 최신 ComfyUI처럼 prompt_id를 주면 그 prompt가 실행 중일 때만 중단
+        if self.running is not None and body.get("prompt_id") in (None, self.running["prompt_id"]):
+            self.interrupted = True
+        return web.json_response({})
+
+    async def mock_stats(self, request):
+        return web.json_response({**self.stats, "pending": len(self.pending), "running": self.running is not None})
+
+    # ------------------------------------------------------------------
+    # 실행
+    # ------------------------------------------------------------------
+    async def _send(self, client_id, message):
+        ws = self.clients.get(client_id)
+        if ws is None or ws.closed:
+            return
+        if isinstance(message, (bytes, bytearray)):
+            await ws.send_bytes(message)
+        else:
+            await ws.send_str(json.dumps(message))
+
+    async def _sleep(self, seconds):
+        """interrupt되면 True"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while not self.interrupted:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, 0.05))
+        return True
+
+    def _write_output(self, prompt_id, node_id):
+        filename = f"mock_{prompt_id}_{node_id}.mp4"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, 'wb') as f:
+            remaining = self.output_size
+            while remaining > 0:
+                chunk = min(remaining, 1024 * 1024)
+                f.write(os.urandom(chunk))
+                remaining -= chunk
+        return {"gifs": [{"filename": filename, "subfolder": "", "type": "output", "format": "video/h264-mp4", "frame_rate": 16, "fullpath": path}]}
+
+    def _preview_frame(self, step):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (step * 20 % 256, 64, 128)).save(buffer, "JPEG")
+        return struct.pack(">II", 1, 1) + buffer.getvalue()
+
+    async def _run_synthetic(self, item):
+        prompt_id, prompt, client_id = item["prompt_id"], item["prompt"], item["client_id"]
+        node_ids = list(prompt)
+        output_nodes = [n for n in node_ids if any(hint in str(prompt[n].get("class_type")) for hint in _OUTPUT_CLASS_HINTS)] or node_ids[-1:]
+        latency = max(self.latency + random.uniform(-self.jitter, self.jitter), 0.0)
+        # 스텝이 있는 노드(샘플러)가 실행 시간의 대부분을 차지하도록 배분
+        samplers = [n for n in node_ids if "steps" in (prompt[n].get("inputs") or {})]
+        sampler_share = 0.8 if samplers else 0.0
+        other_time = latency * (1 - sampler_share) / max(len(node_ids) - len(samplers), 1)
+        sampler_time = latency * sampler_share / max(len(samplers), 1)
+        outputs = {}
+        for node_id in node_ids:
+            await self._send(client_id, {"type": "executing", "data": {"node": node_id, "display_node": node_id, "prompt_id": prompt_id}})
+            if node_id in samplers:
+                steps = self.steps
+                for step in range(1, steps + 1):
+                    if await self._sleep(sampler_time / steps):
+                        return outputs, node_id
+                    await self._send(client_id, {"type": "progress", "data": {"value": step, "max": steps, "prompt_id": prompt_id, "node": node_id}})
+                    if self.preview:
+                        await self._send(client_id, self._preview_frame(step))
+            elif await self._sleep(other_time):
+                return outputs, node_id
+            if node_id in output_nodes:
+                outputs[node_id] = self._write_output(prompt_id, node_id)
+                await self._send(client_id, {"type": "executed", "data": {"node": node_id, "display_node": node_id, "output": outputs[node_id], "prompt_id": prompt_id}})
+        return outputs, None
+
+    async def _run_trace(self, item):
+        prompt_id, client_id = item["prompt_id"], item["client_id"]
+        outputs = {}
+        current = None
+        previous_t = 0.0
+        for record in self.trace:
+            if await self._sleep(max(record.get("t", 0.0) - previous_t, 0.0) / self.trace_speed):
+                return outputs, current
+            previous_t = record.get("t", 0.0)
+            if "binary" in record:
+                await self._send(client_id, base64.b64decode(record["binary"]))
+                continue
+            message = json.loads(json.dumps(record["message"]))
+            data = message.get("data") or {}
+            msg_type = message.get("type")
+            if msg_type in ("execution_start", "execution_success", "execution_interrupted", "execution_error"):
+                # 시작/종료 이벤트는 실행 루프가 직접 보냄
+                continue
+            if "prompt_id" in data:
+                data["prompt_id"] = prompt_id
+            if msg_type == "executing":
+                if data.get("node") is None:
+                    continue
+                current = data["node"]
+            if msg_type == "executed" and (data.get("output") or {}).get("gifs"):
+                # 녹화된 경로 대신 이 서버에서 만든 출력 파일을 가리키게 함
+                outputs[data["node"]] = data["output"] = self._write_output(prompt_id, data["node"])
+            await self._send(client_id, message)
+        if not outputs:
+            outputs["output"] = self._write_output(prompt_id, "output")
+        return outputs, None
+
+    async def _worker(self):
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            item = self.running = self.pending.pop(0)
+            self.interrupted = False
+            prompt_id, client_id = item["prompt_id"], item["client_id"]
+            await self._send(client_id, {"type": "execution_start", "data": {"prompt_id": prompt_id}})
+            await self._send(client_id, {"type": "execution_cached", "data": {"nodes": [], "prompt_id": prompt_id}})
+            run = self._run_trace if self.trace else self._run_synthetic
+            outputs, interrupted_node = await run(item)
+            if interrupted_node is not None:
+                await self._send(client_id, {"type": "execution_interrupted", "data": {"prompt_id": prompt_id, "node_id": interrupted_node, "node_type": None, "executed": []}})
+                status = {"status_str": "error", "completed": False, "messages": []}
+            else:
+                await self._send(client_id, {"type": "execution_success", "data": {"prompt_id": prompt_id}})
+                status = {"status_str": "success", "completed": True, "messages": []}
+            self.history[prompt_id] = {"prompt": [], "outputs": outputs, "status": status}
+            await self._send(client_id, {"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+            self.running = None
+
+    async def _on_startup(self, app):
+        self._wakeup = asyncio.Event()
+        app["worker"] = asyncio.create_task(self._worker())
+
+    async def _on_shutdown(self, app):
+        # 열린 웹소켓을 닫지 않으면 graceful shutdown이 타임아웃까지 기다린다
+        for ws in list(self.clients.values()):
+            await ws.close()
+
+    def app(self):
+        app = web.Application(client_max_size=1024 ** 3)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        app.add_routes([
+            web.get("/", self.index),
+            web.get("/system_stats", self.system_stats),
+            web.get("/object_info", self.object_info),
+            web.get("/ws", self.websocket),
+            web.post("/prompt", self.queue_prompt),
+            web.get("/history/{prompt_id}", self.get_history),
+            web.get("/view", self.view),
+            web.post("/upload/image", self.upload_image),
+            web.get("/queue", self.get_queue),
+            web.post("/queue", self.post_queue),
+            web.post("/interrupt", self.interrupt),
+            web.get("/mock/stats", self.mock_stats),
+        ])
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock ComfyUI server for worker benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--root", default=None, help="input/output directory (default: temp dir)")
+    parser.add_argument("--latency", type=float, default=1.0, help="execution seconds per prompt")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random seconds added to latency")
+    parser.add_argument("--steps", type=int, default=10, help="progress steps per sampler node")
+    parser.add_argument("--output-size", type=int, default=2 * 1024 * 1024, help="bytes per output video")
+    parser.add_argument("--preview", action="store_true", help="send binary preview frames")
+    parser.add_argument("--trace", default=None, help="replay a ws trace recorded with record_trace.py")
+    parser.add_argument("--trace-speed", type=float, default=1.0, help="trace replay speed multiplier")
+    parser.add_argument("--node-types", default="", help="comma separated class_types reported by /object_info")
+    args = parser.parse_args()
+
+    server = MockComfyUI(
+        args.root or tempfile.mkdtemp(prefix="mock-comfyui-"),
+        latency=args.latency,
+        jitter=args.jitter,
+        steps=args.steps,
+        output_size=args.output_size,
+        preview=args.preview,
+        trace=args.trace,
+        trace_speed=args.trace_speed,
+        node_types=[t for t in args.node_types.split(",") if t],
+    )
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""실제 ComfyUI에서 prompt 하나를 실행하며 웹소켓 메시지를 녹화 (mock_comfyui.py --trace로 재생)
+
+    python bench/record_trace.py --server 127.0.0.1:8188 --workflow prompt_api.json --out trace.jsonl
+
+각 줄은 {"t": 제출 후 경과 초, "message": {...}} 또는 바이너리 메시지의 {"t": ..., "binary": base64}.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import uuid
+
+import websocket
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comfy_client import ComfyUIClient  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record ComfyUI websocket messages for one prompt")
+    parser.add_argument("--server", default="127.0.0.1:8188")
+    parser.add_argument("--workflow", required=True, help="ComfyUI API format workflow JSON")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--no-binary", action="store_true", help="skip binary preview frames")
+    args = parser.parse_args()
+
+    host, _, port = args.server.partition(":")
+    client_id = str(uuid.uuid4())
+    comfy = ComfyUIClient(host, int(port or 8188), client_id)
+    with open(args.workflow, 'r') as f:
+        prompt = json.load(f)
+
+    ws = websocket.WebSocket()
+    ws.connect(comfy.ws_url)
+    prompt_id = str(uuid.uuid4())
+    started = time.monotonic()
+    comfy.queue_prompt(prompt, prompt_id)
+    count = 0
+    with open(args.out, 'w') as out:
+        while True:
+            message = ws.recv()
+            t = round(time.monotonic() - started, 4)
+            if isinstance(message, bytes):
+                if not args.no_binary:
+                    out.write(json.dumps({"t": t, "binary": base64.b64encode(message).decode('ascii')}) + "\n")
+                    count += 1
+                continue
+            message = json.loads(message)
+            data = message.get("data") or {}
+            if data.get("prompt_id") not in (None, prompt_id):
+                continue
+            out.write(json.dumps({"t": t, "message": message}) + "\n")
+            count += 1
+            if message.get("type") == "executing" and data.get("node") is None and data.get("prompt_id") == prompt_id:
+                break
+    ws.close()
+    print(f"{count} messages, {time.monotonic() - started:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 결과 에러 메시지 앞에 붙는 코드 (클라이언트가 실패 원인을 구분하는 기준)
+JOB_TIMEOUT = "JOB_TIMEOUT"
+JOB_CANCELLED = "JOB_CANCELLED"
+# 웹소켓 메시지/게이트를 기다리는 동안 마감/취소를 확인하는 간격(초)
+POLL_SECONDS = 1.0
+# RunPod에서 job이 더 이상 진행 중이 아닌 상태
+_ABANDONED_STATUSES = ("CANCELLED", "TIMED_OUT", "FAILED", "COMPLETED")
+
+
+class JobCancelled(Exception):
+    """job이 마감 시간을 넘겼거나 RunPod에서 취소/타임아웃된 경우"""
+
+    def __init__(self, reason, job_id=None, timeout=None, elapsed=0.0, stage=None):
+        code = JOB_TIMEOUT if reason == "timeout" else JOB_CANCELLED
+        if reason == "timeout":
+            detail = f"마감 시간 {timeout}초 초과" if timeout else "RunPod 실행 시간 초과"
+        else:
+            detail = "RunPod에서 취소됨"
+        super().__init__(f"{code}: {detail} (job {job_id}, {elapsed:.1f}s 경과)")
+        self.reason = reason
+        self.job_id = job_id
+        self.timeout = timeout
+        self.elapsed = elapsed
+        self.stage = stage
+
+    def result(self):
+        """handler가 반환하는 구조화된 에러 결과"""
+        return {
+            "error": str(self),
+            "error_type": self.reason,
+            "timeout_seconds": self.timeout,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "stage": self.stage,
+        }
+
+
+class RunPodStatusChecker:
+    """RunPod /status API로 처리 중인 job이 밖에서 취소/타임아웃됐는지 확인 (job당 interval초에 한 번)"""
+
+    def __init__(self, endpoint_id, api_key, interval=10.0, timeout=5.0):
+        self.status_url = f"https://api.runpod.ai/v2/{endpoint_id}/status"
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+
+    @classmethod
+    def from_env(cls):
+        # RUNPOD_ENDPOINT_ID는 RunPod가 워커에 설정하고, API 키는 엔드포인트 환경 변수로 넣어야 함
+        endpoint_id = os.getenv("RUNPOD_ENDPOINT_ID")
+        api_key = os.getenv("RUNPOD_API_KEY")
+        interval = float(os.getenv("CANCEL_CHECK_INTERVAL", "10"))
+        if not endpoint_id or not api_key or interval <= 0:
+            return None
+        return cls(endpoint_id, api_key, interval)
+
+    def abandoned(self, job_id):
+        """job이 RunPod 쪽에서 이미 끝난 상태(취소/타임아웃 등)면 그 상태를, 아니면 None을 반환"""
+        try:
+            response = self.session.get(f"{self.status_url}/{job_id}", timeout=self.timeout)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            status = response.json().get("status")
+        except (requests.RequestException, ValueError) as e:
+            logger.debug(f"RunPod job 상태 확인 실패: {e}")
+            return None
+        return status if status in _ABANDONED_STATUSES else None
+
+
+class JobControl:
+    """job 하나의 마감 시각과 취소 여부. 긴 대기 중에 check()를 불러 JobCancelled로 중단"""
+
+    def __init__(self, job_id=None, timeout=None, checker=None):
+        self.job_id = job_id
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.checker = checker
+        self.started = time.monotonic()
+        self.stage = None
+        self._cancelled = threading.Event()
+        self._next_status_check = self.started + (checker.interval if checker else 0)
+
+    @classmethod
+    def for_job(cls, job, default_timeout=None, checker=None):
+        """job 입력의 timeout_seconds(없으면 워커 기본값)로 JobControl을 생성"""
+        timeout = (job.get("input") or {}).get("timeout_seconds", default_timeout)
+        try:
+            timeout = float(timeout) if timeout is not None else None
+        except (TypeError, ValueError):
+            raise Exception(f"timeout_seconds 값이 숫자가 아닙니다: {timeout}")
+        return cls(job.get("id"), timeout, checker)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        if self.timeout is None:
+            return None
+        return max(self.timeout - self.elapsed(), 0.0)
+
+    def poll_interval(self):
+        remaining = self.remaining()
+        return POLL_SECONDS if remaining is None else max(min(POLL_SECONDS, remaining), 0.01)
+
+    def cancel(self):
+        """RunPod가 job task를 취소했을 때 등 외부에서 취소를 알림"""
+        self._cancelled.set()
+
+    def check(self):
+        """마감 시간이 지났거나 취소됐으면 JobCancelled를 발생"""
+        if self._cancelled.is_set():
+            raise JobCancelled("cancelled", self.job_id, self.timeout, self.elapsed(), self.stage)
+        if self.timeout is not None and self.elapsed() >= self.timeout:
+            raise JobCancelled("timeout", self.job_id, self.timeout, self.elapsed(), self.stage)
+        if self.checker is not None and self.job_id and time.monotonic() >= self._next_status_check:
+            self._next_status_check = time.monotonic() + self.checker.interval
+            status = self.checker.abandoned(self.job_id)
+            if status is not None:
+                logger.warning(f"⚠️ RunPod에서 job이 이미 {status} 상태입니다: {self.job_id}")
+                self._cancelled.set()
+                reason = "timeout" if status == "TIMED_OUT" else "cancelled"
+                raise JobCancelled(reason, self.job_id, self.timeout, self.elapsed(), self.stage)
@@ -0,0 +1,307 @@
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.parse
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+# keep-alive 연결이 서버 쪽에서 끊겼을 때 발생하는 예외들 (재시도 대상)
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+# 디스패처가 웹소켓 메시지(dict)를 받은 시각(time.monotonic)을 기록하는 키
+RECEIVED_AT = "received_at"
+
+
+def received_at(message):
+    """메시지를 웹소켓에서 받은 시각. 기록이 없으면(바이너리 메시지 등) 현재 시각
+
+    job 스레드가 큐에서 꺼내는 시점은 출력 처리나 멈춘 스트림 제너레이터 때문에 늦어질 수 있으므로
+    노드 실행 시간/ETA는 이 시각으로 계산한다.
+    """
+    if isinstance(message, dict):
+        stamp = message.get(RECEIVED_AT)
+        if stamp is not None:
+            return stamp
+    return time.monotonic()
+
+
+class ComfyUIClient:
+    """워커 수명 동안 ComfyUI 서버와의 HTTP keep-alive 연결과 웹소켓을 유지하는 클라이언트"""
+
+    def __init__(self, host, port=8188, client_id=None, timeout=30, pool_size=4):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.base_url = f"http://{host}:{port}"
+        self.ws_url = f"ws://{host}:{port}/ws?clientId={client_id}"
+
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self._ws = None
+        self._ws_lock = threading.Lock()
+        self._healthy = False
+        self._ready_lock = threading.Lock()
+        self.system_stats = None
+        self.node_types = None
+        self.reconnects = 0
+
+        self._dispatcher = None
+        self._dispatch_lock = threading.Lock()
+        self._subscribers = {}
+        self._executing_prompt = None
+        self._closing = False
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    def _acquire(self):
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop(), True
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, conn):
+        with self._pool_lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """keep-alive 연결을 재사용해 요청을 보내고 응답 본문(bytes)을 반환"""
+        headers = dict(headers or {})
+        for attempt in range(2):
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except _STALE_CONNECTION_ERRORS as e:
+                conn.close()
+                # 풀에서 꺼낸 연결이 이미 끊겨 있었던 경우에만 한 번 재시도
+                if reused and attempt == 0:
+                    logger.debug(f"재사용 연결이 끊겨 있어 다시 연결합니다: {e}")
+                    if hasattr(body, "seek"):
+                        body.seek(0)
+                    continue
+                self._healthy = False
+                raise
+            except OSError:
+                conn.close()
+                self._healthy = False
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+
+            if response.status >= 400:
+                raise Exception(f"ComfyUI HTTP {response.status} ({method} {path}): {data[:500]!r}")
+            return data
+
+    def get_json(self, path):
+        return json.loads(self.request("GET", path))
+
+    def post_json(self, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        data = self.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        return json.loads(data) if data else {}
+
+    def queue_prompt(self, prompt, prompt_id=None):
+        payload = {"prompt": prompt, "client_id": self.client_id}
+        if prompt_id is not None:
+            # 미리 구독할 수 있도록 prompt_id를 클라이언트에서 지정
+            payload["prompt_id"] = prompt_id
+        return self.post_json("/prompt", payload)
+
+    def get_history(self, prompt_id):
+        return self.get_json(f"/history/{prompt_id}")
+
+    def get_queue(self):
+        return self.get_json("/queue")
+
+    def delete_from_queue(self, prompt_ids):
+        """대기 중인 prompt를 큐에서 제거 (실행 중인 prompt에는 영향 없음)"""
+        return self.post_json("/queue", {"delete": list(prompt_ids)})
+
+    def interrupt(self, prompt_id=None):
+        """실행 중인 prompt를 중단. prompt_id를 지원하는 ComfyUI는 그 prompt가 실행 중일 때만 중단"""
+        return self.post_json("/interrupt", {"prompt_id": prompt_id} if prompt_id else {})
+
+    def get_image(self, filename, subfolder, folder_type):
+        query = urllib.parse.urlencode({"filename": filename, "subfolder": subfolder, "type": folder_type})
+        return self.request("GET", f"/view?{query}")
+
+    def upload_image(self, body, content_type, content_length=None):
+        """multipart 본문(bytes 또는 file-like)을 /upload/image로 전송"""
+        headers = {"Content-Type": content_type}
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        data = self.request("POST", "/upload/image", body=body, headers=headers)
+        return json.loads(data)
+
+    # ------------------------------------------------------------------
+    # Readiness
+    # ------------------------------------------------------------------
+    @property
+    def healthy(self):
+        return self._healthy
+
+    def wait_until_ready(self, timeout=180, interval=0.25, required_nodes=(), alive=None):
+        """/system_stats가 응답할 때까지 짧은 간격으로 대기. 한 번 확인되면 이후 호출은 즉시 반환
+
+        required_nodes가 있으면 /object_info에 해당 노드 타입이 모두 등록됐는지도 확인하고,
+        alive 콜백이 False를 반환하면(ComfyUI 프로세스 종료) 기다리지 않고 실패한다.
+        """
+        if self._healthy:
+            return
+        with self._ready_lock:
+            if self._healthy:
+                return
+            started = time.monotonic()
+            attempt = 0
+            while True:
+                attempt += 1
+                if alive is not None and not alive():
+                    raise Exception("ComfyUI 프로세스가 종료되었습니다. 로그를 확인하세요.")
+                try:
+                    self.system_stats = self.get_json("/system_stats")
+                    break
+                except Exception as e:
+                    elapsed = time.monotonic() - started
+                    if elapsed >= timeout:
+                        raise Exception(f"ComfyUI 서버에 연결할 수 없습니다. 서버가 실행 중인지 확인하세요. ({e})")
+                    if attempt % 40 == 0:
+                        logger.info(f"ComfyUI 시작 대기 중... ({elapsed:.0f}s)")
+                    time.sleep(interval)
+            logger.info(f"HTTP 연결 성공 ({time.monotonic() - started:.2f}s, 시도 {attempt})")
+            if required_nodes:
+                # 서버는 커스텀 노드 로드가 끝난 뒤 열리므로 여기서 빠진 노드는 기다려도 생기지 않음
+                self.node_types = set(self.get_json("/object_info"))
+                missing = sorted(set(required_nodes) - self.node_types)
+                if missing:
+                    logger.warning(f"⚠️ ComfyUI에 등록되지 않은 노드 타입: {', '.join(missing)}")
+            self._healthy = True
+
+    # ------------------------------------------------------------------
+    # WebSocket
+    # ------------------------------------------------------------------
+    def ensure_ws(self, max_attempts=36, initial_backoff=0.5, max_backoff=5.0):
+        """웹소켓이 열려 있지 않으면 지수 백오프로 다시 연결"""
+        with self._ws_lock:
+            if self._ws is not None and self._ws.connected:
+                return self._ws
+            backoff = initial_backoff
+            for attempt in range(max_attempts):
+                ws = websocket.WebSocket()
+                try:
+                    ws.connect(self.ws_url, timeout=self.timeout)
+                    # 연결 이후 recv는 블로킹 (실행 시간이 긴 프롬프트 대비)
+                    ws.settimeout(None)
+                    self._ws = ws
+                    logger.info(f"웹소켓 연결 성공 (시도 {attempt+1})")
+                    return ws
+                except Exception as e:
+                    logger.warning(f"웹소켓 연결 실패 (시도 {attempt+1}/{max_attempts}): {e}")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, max_backoff)
+            raise Exception("웹소켓 연결 시간 초과")
+
+    def start_dispatcher(self):
+        """웹소켓을 읽어 prompt_id별 구독 큐로 나눠 주는 백그라운드 스레드를 시작 (이미 실행 중이면 무시)"""
+        self.ensure_ws()
+        with self._dispatch_lock:
+            if self._dispatcher is not None and self._dispatcher.is_alive():
+                return
+            self._closing = False
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="comfy-ws", daemon=True)
+            self._dispatcher.start()
+
+    def subscribe(self, prompt_id, messages=None):
+        """prompt_id로 오는 메시지(dict 또는 바이너리 bytes)를 받을 큐를 등록. None은 재연결 신호"""
+        messages = messages if messages is not None else queue.Queue()
+        with self._dispatch_lock:
+            self._subscribers[prompt_id] = messages
+        return messages
+
+    def unsubscribe(self, prompt_id):
+        with self._dispatch_lock:
+            self._subscribers.pop(prompt_id, None)
+
+    def _dispatch_loop(self):
+        while not self._closing:
+            try:
+                ws = self.ensure_ws()
+                out = ws.recv()
+                if not out:
+                    # 서버가 close 프레임을 보내면 recv가 빈 값을 반환
+                    raise websocket.WebSocketConnectionClosedException("서버가 웹소켓을 닫았습니다")
+                message = json.loads(out) if isinstance(out, str) else out
+            except Exception as e:
+                if self._closing:
+                    break
+                logger.warning(f"웹소켓 연결이 끊겼습니다. 재연결합니다: {e}")
+                self.close_ws()
+                self.reconnects += 1
+                try:
+                    # 서버가 다시 응답할 때 알려야 구독자가 큐/history를 확인할 수 있음
+                    self.ensure_ws()
+                except Exception as e:
+                    logger.error(f"웹소켓 재연결 실패: {e}")
+                # 그 사이 메시지가 유실됐을 수 있으므로 구독자들이 큐/history로 확인하도록 알림
+                with self._dispatch_lock:
+                    subscribers = list(self._subscribers.values())
+                for messages in subscribers:
+                    messages.put(None)
+                continue
+            self._route(message)
+
+    def _route(self, message):
+        if isinstance(message, (bytes, bytearray)):
+            # 바이너리 프리뷰에는 prompt_id가 없으므로 현재 실행 중인 prompt로 보냄
+            prompt_id = self._executing_prompt
+        else:
+            message[RECEIVED_AT] = time.monotonic()
+            data = message.get("data") or {}
+            prompt_id = data.get("prompt_id")
+            msg_type = message.get("type")
+            if msg_type == "execution_start" or (msg_type == "executing" and data.get("node") is not None):
+                self._executing_prompt = prompt_id
+            elif prompt_id is None and msg_type in ("progress", "executing", "executed"):
+                prompt_id = self._executing_prompt
+        if prompt_id is None:
+            return
+        with self._dispatch_lock:
+            messages = self._subscribers.get(prompt_id)
+        if messages is not None:
+            messages.put(message)
+
+    def close_ws(self):
+        with self._ws_lock:
+            if self._ws is not None:
+                try:
+                    self._ws.close()
+                except Exception:
+                    pass
+                self._ws = None
+
+    def close(self):
+        self._closing = True
+        self.close_ws()
+        with self._pool_lock:
+            for conn in self._pool:
+                conn.close()
+            self._pool = []
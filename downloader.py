@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class Downloader:
+    """커넥션 풀을 공유하는 인프로세스 다운로더 + 볼륨 위 콘텐츠 주소 기반 캐시
+
+    캐시 구조:
+        <cache_dir>/entries/<sha256(url)>.json  URL별 검증자(ETag/Last-Modified)와 blob 해시
+        <cache_dir>/blobs/<sha256(content)><ext> 실제 파일 (mtime을 LRU 접근 시각으로 사용)
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        max_cache_bytes=5 * 1024 ** 3,
+        max_file_bytes=100 * 1024 ** 2,
+        connect_timeout=10,
+        read_timeout=30,
+        total_timeout=120,
+        fresh_seconds=3600,
+        pool_size=8,
+    ):
+        self.max_cache_bytes = max_cache_bytes
+        self.max_file_bytes = max_file_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.fresh_seconds = fresh_seconds
+
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="download")
+
+        self.cache_dir = None
+        self._evict_lock = threading.Lock()
+        if cache_dir:
+            try:
+                os.makedirs(os.path.join(cache_dir, "entries"), exist_ok=True)
+                os.makedirs(os.path.join(cache_dir, "blobs"), exist_ok=True)
+                self.cache_dir = cache_dir
+            except OSError as e:
+                logger.warning(f"다운로드 캐시 디렉토리를 만들 수 없어 캐시 없이 동작합니다: {cache_dir} ({e})")
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            cache_dir=os.getenv("DOWNLOAD_CACHE_DIR", "/runpod-volume/cache/downloads") or None,
+            max_cache_bytes=int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(5 * 1024 ** 3))),
+            max_file_bytes=int(os.getenv("DOWNLOAD_MAX_BYTES", str(100 * 1024 ** 2))),
+            connect_timeout=float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(os.getenv("DOWNLOAD_READ_TIMEOUT", "30")),
+            total_timeout=float(os.getenv("DOWNLOAD_TOTAL_TIMEOUT", "120")),
+            fresh_seconds=float(os.getenv("DOWNLOAD_CACHE_FRESH_SECONDS", "3600")),
+        )
+
+    # ------------------------------------------------------------------
+    # Cache helpers
+    # ------------------------------------------------------------------
+    def _entry_path(self, url):
+        return os.path.join(self.cache_dir, "entries", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _blob_path(self, name):
+        return os.path.join(self.cache_dir, "blobs", name)
+
+    def _load_entry(self, url):
+        try:
+            with open(self._entry_path(url), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or not os.path.exists(self._blob_path(entry["blob"])):
+            return None
+        return entry
+
+    def _save_entry(self, url, entry):
+        path = self._entry_path(url)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(entry, url=url), f)
+        os.replace(tmp_path, path)
+
+    def _evict(self, keep=None):
+        """blob 총 용량이 예산을 넘으면 가장 오래 사용하지 않은 blob부터 삭제 (keep은 제외)"""
+        with self._evict_lock:
+            blobs_dir = os.path.join(self.cache_dir, "blobs")
+            blobs = []
+            total = 0
+            with os.scandir(blobs_dir) as it:
+                for item in it:
+                    if item.is_file() and not item.name.endswith(".part"):
+                        stat = item.stat()
+                        blobs.append((stat.st_mtime, stat.st_size, item.path))
+                        total += stat.st_size
+            if total <= self.max_cache_bytes:
+                return
+            for _, size, path in sorted(blobs):
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                logger.info(f"🧹 다운로드 캐시 제거: {os.path.basename(path)} ({size} bytes)")
+                if total <= self.max_cache_bytes:
+                    break
+
+    @staticmethod
+    def _place(src, dst):
+        """캐시 blob을 작업 디렉토리로 하드링크(같은 파일시스템) 또는 복사"""
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+        return dst
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+    def _stream_to(self, response, fileobj, url):
+        """응답 본문을 크기/전체 시간 제한을 지키며 파일로 쓰고 sha256과 크기를 반환"""
+        length = response.headers.get("Content-Length")
+        if length and int(length) > self.max_file_bytes:
+            raise Exception(f"파일이 너무 큽니다 ({length} bytes > {self.max_file_bytes} bytes): {url}")
+        digest = hashlib.sha256()
+        size = 0
+        deadline = time.monotonic() + self.total_timeout
+        for chunk in response.iter_content(chunk_size=256 * 1024):
+            size += len(chunk)
+            if size > self.max_file_bytes:
+                raise Exception(f"파일이 너무 큽니다 (> {self.max_file_bytes} bytes): {url}")
+            if time.monotonic() > deadline:
+                raise Exception(f"다운로드 시간 초과 ({self.total_timeout}s): {url}")
+            digest.update(chunk)
+            fileobj.write(chunk)
+        return digest.hexdigest(), size
+
+    def fetch(self, url, output_path):
+        """URL을 output_path로 다운로드. 캐시가 신선하면 네트워크를 사용하지 않음"""
+        if self.cache_dir is None:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path, "wb") as f:
+                    self._stream_to(response, f, url)
+            return output_path
+
+        entry = self._load_entry(url)
+        headers = {}
+        if entry is not None:
+            blob = self._blob_path(entry["blob"])
+            if time.time() - entry.get("validated_at", 0) < self.fresh_seconds:
+                os.utime(blob)
+                logger.info(f"♻️ 다운로드 캐시 적중 (네트워크 생략): {url}")
+                return self._place(blob, output_path)
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                entry["validated_at"] = time.time()
+                self._save_entry(url, entry)
+                os.utime(blob)
+                logger.info(f"♻️ 다운로드 캐시 재검증 (304): {url}")
+                return self._place(blob, output_path)
+            response.raise_for_status()
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.cache_dir, "blobs"), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    sha256, size = self._stream_to(response, f, url)
+                ext = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+                if not ext:
+                    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+                    ext = mimetypes.guess_extension(content_type) or ""
+                blob_name = sha256 + ext
+                os.replace(tmp_path, self._blob_path(blob_name))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._save_entry(url, {
+                "blob": blob_name,
+                "size": size,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "validated_at": time.time(),
+            })
+
+        blob = self._blob_path(blob_name)
+        self._evict(keep=blob)
+        return self._place(blob, output_path)
+
+    def submit(self, url, output_path):
+        return self.executor.submit(self.fetch, url, output_path)
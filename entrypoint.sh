@@ -1,29 +1,24 @@
 #!/bin/bash
 
-# Start ComfyUI in the background (from volume)
-echo "Starting ComfyUI in the background..."
-python /runpod-volume/ComfyUI/main.py --listen --use-sage-attention &
-
-# Wait for ComfyUI to be ready
-echo "Waiting for ComfyUI to be ready..."
-max_wait=180  # 최대 3분
-wait_count=0
-while [ $wait_count -lt $max_wait ]; do
-    if curl -s http://127.0.0.1:8188/ > /dev/null 2>&1; then
-        echo "ComfyUI is ready!"
-        break
-    fi
-    echo "Waiting for ComfyUI... ($wait_count/$max_wait)"
-    sleep 2
-    wait_count=$((wait_count + 2))
-done
+# 콜드 스타트 단계별 시간 측정 기준 시각
+export BOOT_STARTED_AT=$(date +%s.%N)
 
-if [ $wait_count -ge $max_wait ]; then
-    echo "Error: ComfyUI failed to start within $max_wait seconds"
-    exit 1
+# 모델 경로 설정: 기본 설정 뒤에 로컬 모델 캐시 경로를 넘겨 로컬 복사본이 우선 사용되도록 합니다.
+EXTRA_MODEL_PATHS="--extra-model-paths-config /app/extra_model_paths.yaml"
+MODEL_CACHE_CONFIG=$(python /app/model_cache.py)
+if [ -n "$MODEL_CACHE_CONFIG" ]; then
+    echo "Using local model cache config: $MODEL_CACHE_CONFIG"
+    EXTRA_MODEL_PATHS="$EXTRA_MODEL_PATHS --extra-model-paths-config $MODEL_CACHE_CONFIG"
 fi
 
-# Start the handler in the foreground
+# Start ComfyUI in the background (from volume)
+echo "Starting ComfyUI in the background..."
+python /runpod-volume/ComfyUI/main.py --listen --use-sage-attention $EXTRA_MODEL_PATHS &
+export COMFYUI_PID=$!
+
+# ComfyUI가 부팅되는 동안 핸들러를 바로 시작합니다.
+# 준비 확인(/system_stats, /object_info)과 웜업은 핸들러가 백그라운드에서 수행하며,
+# ComfyUI 프로세스가 종료되면 핸들러가 이를 감지해 job을 실패 처리합니다.
 # 이 스크립트가 컨테이너의 메인 프로세스가 됩니다.
 echo "Starting the handler..."
-exec python /app/handler.py
\ No newline at end of file
+exec python /app/handler.py
@@ -6,21 +6,884 @@ Client for generating videos from images using RunPod's generate_video endpoint
 
 import os
 import requests
+import urllib3
 import json
 import time
 import base64
-from typing import Optional, Dict, Any, List, Union
+import codecs
+import io
+import hashlib
+import random
+import re
+import shutil
+import tempfile
+import uuid
+import weakref
+import asyncio
+import heapq
+import threading
+from functools import partial
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Optional, Dict, Any, List, Tuple, Union, Iterable, Iterator, Callable, Generator
 import logging
 
+try:
+    import aiohttp
+except ImportError:  # only needed for async_batch_process_images
+    aiohttp = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # only needed for image preprocessing
+    Image = ImageOps = None
+
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTTP statuses worth retrying (rate limiting and transient server errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Submitting a job is not idempotent: after a timeout or 5xx the job may already be queued,
+# so POSTs are only retried when the request was rejected before RunPod accepted it
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+NON_IDEMPOTENT_RETRYABLE_STATUS_CODES = {429}
+TERMINAL_FAILURE_STATUSES = ('FAILED', 'CANCELLED', 'TIMED_OUT')
+# Client-side outcomes after which the job may still be running on the endpoint:
+# it is not resubmitted, and a resumed batch re-attaches to it
+UNSETTLED_STATUSES = ('TIMEOUT', 'POLL_ERROR')
+# Extra time a batch worker waits for the shared poller beyond max_wait_time
+POLLER_GRACE_SECONDS = 60
+# Base64 is encoded/decoded in slices of this many input bytes (a multiple of 3)
+BASE64_CHUNK_BYTES = 3 * 64 * 1024
+RESPONSE_CHUNK_BYTES = 256 * 1024
+# Error prefix of jobs whose image_ref is not in the endpoint's input store
+IMAGE_REF_NOT_FOUND = "IMAGE_REF_NOT_FOUND"
+# I/O step yielded by a batch item flow: (operation, argument), see GenerateVideoClient._batch_item_flow
+_BatchOp = Tuple[str, Any]
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _is_connect_error(error: requests.exceptions.RequestException) -> bool:
+    """True if the request failed before a connection was made (so the server never saw it)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class _AtomicFile:
+    """
+    File written under a temporary name next to its target and renamed into place by commit()
+    
+    Leaving the with block without commit() removes the temporary file, so readers never
+    see a partially written output.
+    """
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.part")
+        self.file = open(self.tmp_path, 'xb')
+        self.committed = False
+    
+    def write(self, data: bytes):
+        self.file.write(data)
+    
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        self.committed = True
+    
+    def discard(self):
+        self.file.close()
+        _remove_quietly(self.tmp_path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        if not self.committed:
+            self.discard()
+
+
+def _write_base64(f, text: str):
+    """Decode a base64 string into a file slice by slice instead of as one bytes object"""
+    step = BASE64_CHUNK_BYTES // 3 * 4
+    for start in range(0, len(text), step):
+        f.write(base64.b64decode(text[start:start + step]))
+
+
+class Base64File:
+    """
+    File sent as a base64 string in a request body without loading it into memory
+    
+    Used as a value in API input data; _JsonBody encodes it slice by slice while
+    the request is being sent.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path)
+    
+    def __len__(self) -> int:
+        return (self.size + 2) // 3 * 4
+    
+    def iter_chunks(self) -> Iterator[bytes]:
+        with open(self.path, 'rb') as f:
+            while True:
+                data = f.read(BASE64_CHUNK_BYTES)
+                if not data:
+                    return
+                yield base64.b64encode(data)
+    
+    def __repr__(self) -> str:
+        return f"<base64 of {self.path} ({self.size} bytes)>"
+
+
+class _JsonBody:
+    """
+    JSON request body whose Base64File values are streamed from disk
+    
+    Iterating yields the encoded body in chunks; len() is the exact body size, so
+    requests sends it with a Content-Length header. Every iteration starts over,
+    which lets retries resend the same body.
+    """
+    
+    # A file placeholder ("\x00<index>\x00") as it appears in the serialized JSON
+    _PLACEHOLDER = re.compile(r'"\\u0000(\d+)\\u0000"')
+    
+    def __init__(self, payload: Any):
+        self.files = []
+        text = json.dumps(self._replace_files(payload), ensure_ascii=False)
+        # Alternating JSON text and file indexes
+        self.parts = self._PLACEHOLDER.split(text)
+        for i in range(0, len(self.parts), 2):
+            self.parts[i] = self.parts[i].encode('utf-8')
+        self.length = sum(len(part) for part in self.parts[::2]) + sum(len(f) + 2 for f in self.files)
+    
+    def _replace_files(self, value: Any) -> Any:
+        if isinstance(value, Base64File):
+            self.files.append(value)
+            return f"\x00{len(self.files) - 1}\x00"
+        if isinstance(value, dict):
+            return {key: self._replace_files(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._replace_files(item) for item in value]
+        return value
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __iter__(self) -> Iterator[bytes]:
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                yield part
+            else:
+                yield b'"'
+                yield from self.files[int(part)].iter_chunks()
+                yield b'"'
+    
+    async def aiter(self):
+        # Reading and encoding file slices blocks, so each chunk is produced in the default executor
+        loop = asyncio.get_running_loop()
+        chunks = iter(self)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+
+class SpooledMedia:
+    """
+    Media decoded from a base64 response field into a temporary file while the response is parsed
+    
+    Returned in place of the base64 string (e.g. output["video"]) when the client streams
+    media, so the video never has to be held in memory.
+    """
+    
+    def __init__(self, spool_dir: Optional[str] = None):
+        self.path = os.path.join(spool_dir or tempfile.gettempdir(), f"media-{uuid.uuid4().hex}.part")
+        self._file = open(self.path, 'xb')
+        self._carry = ''
+        self.size = 0
+        self._finalizer = weakref.finalize(self, _remove_quietly, self.path)
+    
+    def write_base64(self, text: str):
+        if not text:
+            return
+        text = self._carry + ''.join(text.split())
+        usable = len(text) - len(text) % 4
+        data = base64.b64decode(text[:usable])
+        self._carry = text[usable:]
+        self._file.write(data)
+        self.size += len(data)
+    
+    def close(self):
+        self._file.close()
+        if self._carry:
+            raise ValueError("Truncated base64 media in response")
+    
+    def discard(self):
+        self._file.close()
+        _remove_quietly(self.path)
+        self._finalizer.detach()
+    
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+    
+    def move_to(self, output_path: str):
+        """Move the decoded media to output_path (a rename when both are on the same filesystem)"""
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        try:
+            os.replace(self.path, output_path)
+        except OSError:
+            with _AtomicFile(output_path) as out, open(self.path, 'rb') as f:
+                shutil.copyfileobj(f, out.file, RESPONSE_CHUNK_BYTES)
+                out.commit()
+            _remove_quietly(self.path)
+        self._finalizer.detach()
+    
+    def __repr__(self) -> str:
+        return f"<SpooledMedia {self.path} ({self.size} bytes)>"
+
+
+class _JsonStreamParser:
+    """
+    Minimal pull parser for a JSON document arriving in chunks
+    
+    String values of keys in media_keys are base64-decoded straight into SpooledMedia
+    files, so the size of the parsed result does not grow with the media size.
+    """
+    
+    _LITERALS = {'true': True, 'false': False, 'null': None}
+    
+    def __init__(self, chunks: Iterable[bytes], media_keys: Iterable[str] = (), spool_dir: Optional[str] = None):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.media_keys = set(media_keys)
+        self.spool_dir = spool_dir
+        self.buf = ''
+        self.pos = 0
+    
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        return False
+    
+    def _peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+    
+    def _take(self, expected: str):
+        if self._peek() != expected:
+            raise ValueError(f"Expected {expected!r} at offset {self.pos} of response JSON")
+        self.pos += 1
+    
+    def parse(self) -> Any:
+        value = self._value(None)
+        if self._peek():
+            raise ValueError("Extra data after response JSON")
+        return value
+    
+    def _value(self, key: Optional[str]) -> Any:
+        c = self._peek()
+        if c == '{':
+            self.pos += 1
+            result = {}
+            if self._peek() == '}':
+                self.pos += 1
+                return result
+            while True:
+                if self._peek() != '"':
+                    raise ValueError("Expected an object key in response JSON")
+                name = self._string()
+                self._take(':')
+                result[name] = self._value(name)
+                c = self._peek()
+                self.pos += 1
+                if c == '}':
+                    return result
+                if c != ',':
+                    raise ValueError("Expected ',' or '}' in response JSON")
+        if c == '[':
+            self.pos += 1
+            result = []
+            if self._peek() == ']':
+                self.pos += 1
+                return result
+            while True:
+                result.append(self._value(None))
+                c = self._peek()
+                self.pos += 1
+                if c == ']':
+                    return result
+                if c != ',':
+                    raise ValueError("Expected ',' or ']' in response JSON")
+        if c == '"':
+            return self._media() if key in self.media_keys else self._string()
+        if not c:
+            raise ValueError("Unexpected end of response JSON")
+        return self._scalar()
+    
+    def _string(self) -> str:
+        self.pos += 1
+        raw = []
+        while True:
+            end = self.buf.find('"', self.pos)
+            if end < 0:
+                raw.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unterminated string in response JSON")
+                continue
+            raw.append(self.buf[self.pos:end])
+            self.pos = end + 1
+            text = ''.join(raw)
+            # A quote preceded by an odd number of backslashes is part of the string
+            if (len(text) - len(text.rstrip('\\'))) % 2 == 0:
+                return json.loads(f'"{text}"') if '\\' in text else text
+            raw = [text, '"']
+    
+    def _media(self) -> SpooledMedia:
+        self.pos += 1
+        media = SpooledMedia(self.spool_dir)
+        try:
+            while True:
+                end = self.buf.find('"', self.pos)
+                stop = end if end >= 0 else len(self.buf)
+                # Keep an escape split across chunks (base64 may be sent with escaped slashes)
+                if end < 0:
+                    tail = self.buf[self.pos:]
+                    if (len(tail) - len(tail.rstrip('\\'))) % 2:
+                        stop -= 1
+                segment = self.buf[self.pos:stop]
+                media.write_base64(json.loads(f'"{segment}"') if '\\' in segment else segment)
+                self.pos = stop
+                if end >= 0:
+                    self.pos = end + 1
+                    media.close()
+                    return media
+                if not self._fill():
+                    raise ValueError("Unterminated string in response JSON")
+        except Exception:
+            media.discard()
+            raise
+    
+    def _scalar(self) -> Any:
+        while True:
+            end = self.pos
+            while end < len(self.buf) and self.buf[end] not in ',}] \t\r\n':
+                end += 1
+            if end < len(self.buf) or not self._fill():
+                break
+        token = self.buf[self.pos:end]
+        self.pos = end
+        if token in self._LITERALS:
+            return self._LITERALS[token]
+        return json.loads(token)
+
+
+def to_nearest_multiple_of_16(value: Union[int, float, str]) -> int:
+    """
+    Snap a width/height to the nearest multiple of 16 (at least 16), as the worker does
+    """
+    adjusted = int(round(float(value) / 16.0) * 16)
+    return max(adjusted, 16)
+
+
+def preprocess_image(
+    image_path: str,
+    width: int,
+    height: int,
+    fit: str = "crop",
+    image_format: str = "JPEG",
+    quality: int = 90,
+    max_bytes: Optional[int] = None,
+    min_quality: int = 50
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Shrink an input image to the resolution the worker will actually use
+    
+    The target size is width/height snapped to multiples of 16. With fit="crop" the
+    image is center-cropped to the target aspect ratio and downscaled to the target
+    size; with fit="contain" it is only downscaled to fit inside it. Images are never
+    upscaled. EXIF orientation is applied and metadata dropped. Module-level so it
+    can run in a process pool.
+    
+    Args:
+        image_path: Image file path
+        width: Target width (before snapping)
+        height: Target height (before snapping)
+        fit: "crop" or "contain"
+        image_format: Output format ("JPEG", "WEBP" or "PNG")
+        quality: Encoder quality for JPEG/WEBP
+        max_bytes: Optional size budget; quality is lowered (down to min_quality) until the image fits
+        min_quality: Lowest quality tried for max_bytes
+    
+    Returns:
+        (encoded image bytes, info dictionary with original/final size and bytes)
+    """
+    if Image is None:
+        raise ImportError("Image preprocessing requires Pillow (pip install pillow)")
+    if fit not in ("crop", "contain"):
+        raise ValueError(f"Unknown fit mode: {fit}")
+    
+    image_format = image_format.upper()
+    target_w, target_h = to_nearest_multiple_of_16(width), to_nearest_multiple_of_16(height)
+    original_bytes = os.path.getsize(image_path)
+    
+    with Image.open(image_path) as img:
+        original_format = img.format
+        # Orientations 5-8 are rotated by 90 degrees, so the stored image is transposed
+        rotated = img.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+        original_size = (img.height, img.width) if rotated else img.size
+        # JPEG can decode at 1/2..1/8 scale directly, which is far cheaper than decoding full size
+        img.draft('RGB', (target_h, target_w) if rotated else (target_w, target_h))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGB')
+    
+    src_w, src_h = img.size
+    if fit == "crop":
+        ratio = target_w / target_h
+        if src_w / src_h > ratio:
+            crop_w = max(1, round(src_h * ratio))
+            left = (src_w - crop_w) // 2
+            img = img.crop((left, 0, left + crop_w, src_h))
+        elif src_w / src_h < ratio:
+            crop_h = max(1, round(src_w / ratio))
+            top = (src_h - crop_h) // 2
+            img = img.crop((0, top, src_w, top + crop_h))
+    if img.width > target_w or img.height > target_h:
+        scale = min(target_w / img.width, target_h / img.height)
+        size = (target_w, target_h) if fit == "crop" else (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    
+    def encode(q: int) -> bytes:
+        buffer = io.BytesIO()
+        if image_format == "JPEG":
+            img.save(buffer, "JPEG", quality=q, optimize=True)
+        elif image_format == "WEBP":
+            img.save(buffer, "WEBP", quality=q, method=4)
+        else:
+            img.save(buffer, image_format, optimize=True)
+        return buffer.getvalue()
+    
+    used_quality = quality
+    data = encode(quality)
+    if max_bytes and len(data) > max_bytes and image_format in ("JPEG", "WEBP"):
+        # Binary search for the highest quality that fits the budget
+        low, high, best = min_quality, quality - 1, None
+        while low <= high:
+            q = (low + high) // 2
+            candidate = encode(q)
+            if len(candidate) <= max_bytes:
+                best, used_quality, low = candidate, q, q + 1
+            else:
+                high = q - 1
+        if best is None:
+            used_quality = min_quality
+            best = encode(min_quality)
+            logger.warning(f"⚠️ {image_path} is {len(best)} bytes at quality {min_quality}, over the {max_bytes} byte budget")
+        data = best
+    
+    info = {
+        "original_size": list(original_size),
+        "original_bytes": original_bytes,
+        "size": list(img.size),
+        "bytes": len(data),
+        "format": image_format,
+        "quality": used_quality,
+        "reencoded": True
+    }
+    # Nothing to gain: the original already has this size and is smaller
+    if original_size == img.size and original_bytes <= len(data) and original_format in ("JPEG", "PNG", "WEBP"):
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        info.update(bytes=original_bytes, format=original_format, quality=None, reencoded=False)
+    return data, info
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _redact_media(value: Any, key: Optional[str] = None) -> Any:
+    """Copy of API input data for logging, with media fields (*_base64) replaced by their size and sha256"""
+    if isinstance(value, Base64File):
+        return f"<{value.size} bytes from {value.path}, sha256 {_file_sha256(value.path)}>"
+    if isinstance(value, str) and key is not None and key.endswith('_base64'):
+        return f"<{len(value)} base64 chars, sha256 {hashlib.sha256(value.encode('utf-8')).hexdigest()}>"
+    if isinstance(value, dict):
+        return {k: _redact_media(item, k) for k, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact_media(item) for item in value]
+    return value
+
+
+class BatchManifest:
+    """
+    Persistent record of batch items, so an interrupted batch can be resumed
+    
+    Items are keyed by the file name and the SHA-256 of the input file and of the request
+    parameters, so changed images or parameters are processed again, and identical copies
+    of an image in one batch get their own entries instead of overwriting each other.
+    Each update appends the item's full state as one JSON line; on load the last line
+    per key wins (a torn last line from a crash is ignored) and the file is compacted.
+    
+    Entry fields: key, filename, content_sha256, params_sha256, job_id, status
+    ("pending", "submitted", "success" or "failed"), output_file, error, updated_at.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get('key'):
+                    self.entries[entry['key']] = entry
+        with _AtomicFile(self.path) as f:
+            for entry in self.entries.values():
+                f.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.commit()
+        logger.info(f"📒 Loaded batch manifest: {self.path} ({len(self.entries)} items)")
+    
+    @staticmethod
+    def params_sha256(video_params: Dict[str, Any], preprocess: Optional[Dict[str, Any]] = None) -> str:
+        """Hash of everything besides the image that determines the generated video"""
+        canonical = json.dumps({"params": video_params, "preprocess": preprocess}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+    
+    def update(self, key: str, **fields) -> Dict[str, Any]:
+        with self._lock:
+            entry = {**self.entries.get(key, {"key": key}), **fields, "updated_at": round(time.time(), 3)}
+            self.entries[key] = entry
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return entry
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _BatchProgress:
+    """Counts finished batch items and forwards progress events to a callback"""
+    
+    def __init__(self, total: int, callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.total = total
+        self.callback = callback
+        self.successful = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+    
+    def emit(self, event: str, filename: str, **fields):
+        with self._lock:
+            if event in ('success', 'skipped'):
+                self.successful += 1
+            elif event == 'failed':
+                self.failed += 1
+            if self.callback is None:
+                return
+            payload = {
+                "event": event,
+                "filename": filename,
+                "done": self.successful + self.failed,
+                "total": self.total,
+                "successful": self.successful,
+                "failed": self.failed,
+                **fields
+            }
+            try:
+                self.callback(payload)
+            except Exception as e:
+                logger.warning(f"Progress callback raised an error: {e}")
+
+
+class _AdaptiveInterval:
+    """
+    Status polling interval that starts short and backs off while a job stays in the same state
+    
+    The interval resets whenever the status changes (e.g. IN_QUEUE -> IN_PROGRESS). While a job
+    runs and the typical execution time is known, polls are spaced by half of the remaining
+    expected time, so they get frequent again around the expected completion.
+    """
+    
+    def __init__(self, min_interval: float, max_interval: float, backoff: float = 1.5, expected_seconds: Optional[float] = None):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.expected_seconds = expected_seconds
+        self.interval = min_interval
+        self.status = None
+        self.progress_started = None
+    
+    def next(self, status: Optional[str]) -> float:
+        now = time.monotonic()
+        if status != self.status:
+            self.status = status
+            self.interval = self.min_interval
+            if status == 'IN_PROGRESS':
+                self.progress_started = now
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        
+        interval = self.interval
+        if status == 'IN_PROGRESS' and self.expected_seconds and self.progress_started is not None:
+            remaining = self.expected_seconds - (now - self.progress_started)
+            if remaining > 0:
+                interval = min(self.max_interval, max(self.min_interval, remaining / 2))
+                # Back off from the minimum again once the job runs longer than expected
+                self.interval = self.min_interval
+        # Jitter keeps many jobs submitted together from polling in lockstep
+        return interval * random.uniform(0.9, 1.1)
+
+
+class _StatusPollerBase:
+    """Shared bookkeeping of the coalesced batch pollers: one schedule for all in-flight jobs"""
+    
+    def __init__(self, client: "GenerateVideoClient", check_interval: float, min_interval: float, max_wait_time: int):
+        self.client = client
+        self.check_interval = check_interval
+        self.min_interval = min_interval
+        self.max_wait_time = max_wait_time
+        # job_id -> [future, adaptive interval, deadline]
+        self._jobs = {}
+        # (due time, job_id) heap
+        self._due = []
+    
+    def _register(self, job_id: str, future):
+        now = time.monotonic()
+        self._jobs[job_id] = [future, self.client._adaptive_interval(self.check_interval, self.min_interval), now + self.max_wait_time]
+        heapq.heappush(self._due, (now + self.min_interval, job_id))
+    
+    def _seconds_until_due(self) -> Optional[float]:
+        return self._due[0][0] - time.monotonic() if self._due else None
+    
+    def _pop_due(self) -> List[str]:
+        now = time.monotonic()
+        due = []
+        while self._due and self._due[0][0] <= now:
+            due.append(heapq.heappop(self._due)[1])
+        return due
+    
+    def _handle(self, job_id: str, status_data: Optional[Dict[str, Any]]):
+        """
+        Process one status response (None when the check failed)
+        
+        Returns:
+            (future, result) once the job is finished, otherwise None after rescheduling it
+        """
+        future, interval, deadline = self._jobs[job_id]
+        result = self.client._status_result(job_id, status_data) if status_data is not None else None
+        now = time.monotonic()
+        if result is None and now >= deadline:
+            logger.error(f"❌ Job wait timeout ({self.max_wait_time} seconds, Job ID: {job_id})")
+            result = {'status': 'TIMEOUT', 'job_id': job_id}
+        if result is not None:
+            del self._jobs[job_id]
+            return future, result
+        
+        if status_data is None:
+            delay = self.check_interval
+        else:
+            status = status_data.get('status')
+            if status != interval.status:
+                logger.info(f"🏃 Job in progress... (Job ID: {job_id}, Status: {status})")
+            delay = interval.next(status)
+        heapq.heappush(self._due, (min(now + delay, deadline), job_id))
+        return None
+    
+    def _fail(self, job_id: str, error: BaseException):
+        """
+        Stop polling a job whose status could not be processed
+        
+        Returns:
+            (future, result) with a POLL_ERROR result, or None if the job is no longer tracked
+        """
+        logger.error(f"❌ Status handling failed (Job ID: {job_id}): {error!r}")
+        entry = self._jobs.pop(job_id, None)
+        if entry is None:
+            return None
+        return entry[0], {'status': 'POLL_ERROR', 'job_id': job_id, 'error': f"Status check failed: {error!r}"}
+
+
+class _StatusPoller(_StatusPollerBase):
+    """
+    Background thread that polls /status for every in-flight job of a batch
+    
+    Workers block on wait() while a single loop sleeps until the next job is due,
+    so the number of pollers does not grow with the number of jobs in flight.
+    """
+    
+    def __init__(self, client: "GenerateVideoClient", check_interval: float, min_interval: float, max_wait_time: int):
+        super().__init__(client, check_interval, min_interval, max_wait_time)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="status-poller", daemon=True)
+        self._thread.start()
+    
+    def wait(self, job_id: str) -> Dict[str, Any]:
+        future = Future()
+        with self._cond:
+            self._register(job_id, future)
+            self._cond.notify()
+        try:
+            return future.result(timeout=self.max_wait_time + POLLER_GRACE_SECONDS)
+        except FuturesTimeoutError:
+            # The poller should have resolved the job by its deadline; do not block the worker forever
+            with self._cond:
+                self._jobs.pop(job_id, None)
+            logger.error(f"❌ Status poller did not answer in time (Job ID: {job_id})")
+            return {'status': 'TIMEOUT', 'job_id': job_id}
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+    
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    timeout = self._seconds_until_due()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                due = self._pop_due()
+            
+            for job_id in due:
+                try:
+                    try:
+                        status_data = self.client._get_status(job_id, stream_media=True)
+                    except requests.exceptions.HTTPError as e:
+                        logger.error(f"❌ Status check error: {e}")
+                        # Unknown or expired job IDs end the wait instead of polling until the timeout
+                        status_data = {"status": "NOT_FOUND"} if e.response is not None and e.response.status_code == 404 else None
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"❌ Status check error: {e}")
+                        status_data = None
+                    with self._cond:
+                        finished = self._handle(job_id, status_data)
+                except Exception as e:
+                    # Anything else (e.g. spooling media to a full disk) only ends this job's wait
+                    with self._cond:
+                        finished = self._fail(job_id, e)
+                if finished and not finished[0].done():
+                    finished[0].set_result(finished[1])
+
+
+class _AsyncStatusPoller(_StatusPollerBase):
+    """asyncio counterpart of _StatusPoller; due jobs are checked concurrently"""
+    
+    def __init__(self, client: "GenerateVideoClient", http: "aiohttp.ClientSession", check_interval: float, min_interval: float, max_wait_time: int):
+        super().__init__(client, check_interval, min_interval, max_wait_time)
+        self.http = http
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+    
+    async def wait(self, job_id: str) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._register(job_id, future)
+        self._wakeup.set()
+        return await future
+    
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+    
+    async def _poll(self, job_id: str):
+        try:
+            try:
+                status_data = await self.client._async_request(
+                    self.http, 'GET', f"{self.client.status_url}/{job_id}", stream_media=True,
+                    timeout=aiohttp.ClientTimeout(total=30)
+                )
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"❌ Status check error: {e!r}")
+                status_data = {"status": "NOT_FOUND"} if e.status == 404 else None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"❌ Status check error: {e!r}")
+                status_data = None
+            finished = self._handle(job_id, status_data)
+        except Exception as e:
+            # Anything else (e.g. spooling media to a full disk) only ends this job's wait
+            finished = self._fail(job_id, e)
+        if finished and not finished[0].done():
+            finished[0].set_result(finished[1])
+    
+    async def _loop(self):
+        while True:
+            timeout = self._seconds_until_due()
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await asyncio.gather(*(self._poll(job_id) for job_id in self._pop_due()))
+
+
 class GenerateVideoClient:
     def __init__(
         self,
         runpod_endpoint_id: str,
-        runpod_api_key: str
+        runpod_api_key: str,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        retry_backoff_max: float = 30.0,
+        stream_media: bool = False,
+        spool_dir: Optional[str] = None
     ):
         """
         Initialize Generate Video client
@@ -28,11 +891,31 @@ class GenerateVideoClient:
         Args:
             runpod_endpoint_id: RunPod endpoint ID
             runpod_api_key: RunPod API key
+            max_retries: Retries for RunPod API calls that fail with a connection error, 429 or 5xx
+            retry_backoff: Base delay of the exponential backoff between retries (seconds)
+            retry_backoff_max: Upper bound of a single retry delay (seconds)
+            stream_media: Parse status responses incrementally and decode output["video"] straight
+                to a temporary file (SpooledMedia) instead of keeping the base64 string in memory.
+                Batch methods always do this, since their results are saved rather than returned
+            spool_dir: Directory for those temporary files (default: system temp directory);
+                on the same filesystem as the output folder, saving is a rename
         """
         self.runpod_endpoint_id = runpod_endpoint_id
         self.runpod_api_key = runpod_api_key
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.stream_media = stream_media
+        self.spool_dir = spool_dir
+        self.media_keys = ('video',)
         self.runpod_api_endpoint = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/run"
         self.status_url = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/status"
+        self.stream_url = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/stream"
+        self.runsync_url = f"https://api.runpod.ai/v2/{runpod_endpoint_id}/runsync"
+        # Moving average of reported execution times, used to space status checks of running jobs
+        self.expected_execution_seconds = None
+        # Images known to be in the endpoint's input store (sha256), sent as image_ref
+        self._image_refs = set()
         
         # Initialize HTTP session
         self.session = requests.Session()
@@ -43,10 +926,143 @@ class GenerateVideoClient:
         
         logger.info(f"GenerateVideoClient initialized - Endpoint: {runpod_endpoint_id}")
     
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Exponential backoff with full jitter, so concurrent requests do not retry in lockstep
+        
+        Args:
+            attempt: Zero-based retry attempt
+            retry_after: Retry-After header of the failed response, if any
+        
+        Returns:
+            Delay before the next attempt (seconds)
+        """
+        delay = random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a RunPod API request, retrying connection errors, timeouts, 429 and 5xx responses
+        
+        Non-idempotent requests (POST /run, /runsync) are only retried on 429 and on
+        errors raised before a connection was established.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Arguments passed to requests.Session.request
+        
+        Returns:
+            Successful response
+        
+        Raises:
+            requests.exceptions.RequestException: When the last attempt fails
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRYABLE_STATUS_CODES if idempotent else NON_IDEMPOTENT_RETRYABLE_STATUS_CODES
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in retry_statuses or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+                response.close()
+                logger.warning(f"⚠️ {method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or _is_connect_error(e)):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"⚠️ {method} {url} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def _read_json(self, response: requests.Response, stream_media: Optional[bool] = None) -> Any:
+        """
+        Decode a JSON response; with stream_media, media fields are spooled to disk while parsing
+        
+        The request must have been sent with stream=True for the body to be read incrementally.
+        stream_media defaults to the client setting.
+        """
+        if not (self.stream_media if stream_media is None else stream_media):
+            return response.json()
+        with response:
+            try:
+                return _JsonStreamParser(
+                    response.iter_content(RESPONSE_CHUNK_BYTES), self.media_keys, self.spool_dir
+                ).parse()
+            except ValueError as e:
+                # Same exception family as response.json() so callers handle both alike
+                raise requests.exceptions.InvalidJSONError(str(e), response=response)
+    
+    def _get_status(self, job_id: str, stream_media: Optional[bool] = None) -> Dict[str, Any]:
+        stream_media = self.stream_media if stream_media is None else stream_media
+        response = self._request('GET', f"{self.status_url}/{job_id}", timeout=30, stream=stream_media)
+        return self._read_json(response, stream_media)
+    
+    def _adaptive_interval(self, max_interval: float, min_interval: float) -> _AdaptiveInterval:
+        return _AdaptiveInterval(min_interval, max_interval, expected_seconds=self.expected_execution_seconds)
+    
+    def _observe_execution(self, status_data: Dict[str, Any]):
+        execution_ms = status_data.get('executionTime')
+        if not execution_ms:
+            return
+        seconds = execution_ms / 1000
+        if self.expected_execution_seconds is None:
+            self.expected_execution_seconds = seconds
+        else:
+            self.expected_execution_seconds = 0.7 * self.expected_execution_seconds + 0.3 * seconds
+    
+    def _status_result(self, job_id: str, status_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Turn a /status response into a job result dictionary
+        
+        Args:
+            job_id: Job ID
+            status_data: /status response
+        
+        Returns:
+            Job result dictionary, or None while the job is still queued or running
+        """
+        status = status_data.get('status')
+        
+        if status == 'COMPLETED':
+            logger.info(f"✅ Job completed! (Job ID: {job_id})")
+            self._observe_execution(status_data)
+            return {
+                'status': 'COMPLETED',
+                'output': status_data.get('output'),
+                'job_id': job_id
+            }
+        elif status in TERMINAL_FAILURE_STATUSES:
+            logger.error(f"❌ Job failed. (Job ID: {job_id}, Status: {status})")
+            return {
+                'status': 'FAILED',
+                'error': status_data.get('error', f'Job ended with status {status}'),
+                'job_id': job_id
+            }
+        elif status in ['IN_QUEUE', 'IN_PROGRESS']:
+            return None
+        else:
+            logger.warning(f"❓ Unknown status: {status}")
+            return {
+                'status': 'UNKNOWN',
+                'data': status_data,
+                'job_id': job_id
+            }
+    
     def encode_file_to_base64(self, file_path: str) -> Optional[str]:
         """
         Encode file to base64
         
+        The file is encoded slice by slice, but the result is still one string;
+        API input built by build_video_input uses Base64File instead, which is
+        streamed from disk while the request is sent.
+        
         Args:
             file_path: File path to encode
         
@@ -58,9 +1074,7 @@ class GenerateVideoClient:
                 logger.error(f"File does not exist: {file_path}")
                 return None
             
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-                base64_data = base64.b64encode(file_data).decode('utf-8')
+            base64_data = b''.join(Base64File(file_path).iter_chunks()).decode('ascii')
             
             logger.info(f"✅ File base64 encoding completed: {file_path}")
             return base64_data
@@ -74,7 +1088,7 @@ class GenerateVideoClient:
         Submit job to RunPod
         
         Args:
-            input_data: API input data
+            input_data: API input data (Base64File values are streamed from disk)
         
         Returns:
             Job ID or None (on failure)
@@ -83,10 +1097,10 @@ class GenerateVideoClient:
         
         try:
             logger.info(f"Submitting job to RunPod: {self.runpod_api_endpoint}")
-            logger.info(f"Input data: {json.dumps(input_data, indent=2, ensure_ascii=False)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Input data: {json.dumps(_redact_media(input_data), indent=2, ensure_ascii=False)}")
             
-            response = self.session.post(self.runpod_api_endpoint, json=payload, timeout=30)
-            response.raise_for_status()
+            response = self._request('POST', self.runpod_api_endpoint, data=_JsonBody(payload), timeout=30)
             
             response_data = response.json()
             job_id = response_data.get('id')
@@ -102,58 +1116,48 @@ class GenerateVideoClient:
             logger.error(f"❌ Job submission failed: {e}")
             return None
     
-    def wait_for_completion(self, job_id: str, check_interval: int = 10, max_wait_time: int = 1800) -> Dict[str, Any]:
+    def wait_for_completion(
+        self,
+        job_id: str,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_interval: float = 0.5
+    ) -> Dict[str, Any]:
         """
         Wait for job completion
         
+        Status checks start every min_interval seconds and back off towards
+        check_interval while the job stays queued or running (see _AdaptiveInterval).
+        
         Args:
             job_id: Job ID
-            check_interval: Status check interval (seconds)
+            check_interval: Maximum status check interval (seconds)
             max_wait_time: Maximum wait time (seconds)
+            min_interval: Initial status check interval (seconds); equal to check_interval for fixed polling
         
         Returns:
             Job result dictionary
         """
         start_time = time.time()
+        interval = self._adaptive_interval(check_interval, min_interval)
         
         while time.time() - start_time < max_wait_time:
             try:
-                logger.info(f"⏱️ Checking job status... (Job ID: {job_id})")
-                
-                response = self.session.get(f"{self.status_url}/{job_id}", timeout=30)
-                response.raise_for_status()
+                logger.debug(f"⏱️ Checking job status... (Job ID: {job_id})")
                 
-                status_data = response.json()
+                status_data = self._get_status(job_id)
+                result = self._status_result(job_id, status_data)
+                if result is not None:
+                    return result
                 status = status_data.get('status')
-                
-                if status == 'COMPLETED':
-                    logger.info("✅ Job completed!")
-                    return {
-                        'status': 'COMPLETED',
-                        'output': status_data.get('output'),
-                        'job_id': job_id
-                    }
-                elif status == 'FAILED':
-                    logger.error("❌ Job failed.")
-                    return {
-                        'status': 'FAILED',
-                        'error': status_data.get('error', 'Unknown error'),
-                        'job_id': job_id
-                    }
-                elif status in ['IN_QUEUE', 'IN_PROGRESS']:
+                if status != interval.status:
                     logger.info(f"🏃 Job in progress... (Status: {status})")
-                    time.sleep(check_interval)
-                else:
-                    logger.warning(f"❓ Unknown status: {status}")
-                    return {
-                        'status': 'UNKNOWN',
-                        'data': status_data,
-                        'job_id': job_id
-                    }
+                delay = interval.next(status)
                     
             except requests.exceptions.RequestException as e:
                 logger.error(f"❌ Status check error: {e}")
-                time.sleep(check_interval)
+                delay = check_interval
+            time.sleep(max(0, min(delay, max_wait_time - (time.time() - start_time))))
         
         logger.error(f"❌ Job wait timeout ({max_wait_time} seconds)")
         return {
@@ -161,10 +1165,57 @@ class GenerateVideoClient:
             'job_id': job_id
         }
     
+    def run_sync(
+        self,
+        input_data: Dict[str, Any],
+        wait_seconds: int = 90,
+        check_interval: float = 10,
+        max_wait_time: int = 1800
+    ) -> Dict[str, Any]:
+        """
+        Run a job through /runsync, which returns the result in the same request for short jobs
+        
+        If the job has not finished within wait_seconds, the returned job ID is
+        polled like a job submitted with submit_job.
+        
+        Args:
+            input_data: API input data
+            wait_seconds: How long /runsync holds the request open (seconds)
+            check_interval: Maximum status check interval when falling back to polling (seconds)
+            max_wait_time: Maximum wait time (seconds)
+        
+        Returns:
+            Job result dictionary
+        """
+        try:
+            logger.info(f"Submitting job to RunPod: {self.runsync_url}")
+            response = self._request(
+                'POST', self.runsync_url, params={'wait': int(wait_seconds * 1000)},
+                data=_JsonBody({"input": input_data}), timeout=wait_seconds + 30, stream=self.stream_media
+            )
+            status_data = self._read_json(response)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Job submission failed: {e}")
+            return {"error": "Job submission failed"}
+        
+        job_id = status_data.get('id')
+        if not job_id:
+            logger.error(f"❌ Failed to receive Job ID: {status_data}")
+            return {"error": "Job submission failed"}
+        result = self._status_result(job_id, status_data)
+        if result is not None:
+            return result
+        
+        logger.info(f"🏃 Job still {status_data.get('status')} after {wait_seconds}s, polling status (Job ID: {job_id})")
+        return self.wait_for_completion(job_id, check_interval=check_interval, max_wait_time=max_wait_time)
+    
     def save_video_result(self, result: Dict[str, Any], output_path: str) -> bool:
         """
         Save video file from job result
         
+        The video is written to a temporary file and renamed into place, so
+        output_path never holds a partial video.
+        
         Args:
             result: Job result dictionary
             output_path: File path to save
@@ -178,20 +1229,28 @@ class GenerateVideoClient:
                 return False
             
             output = result.get('output', {})
-            video_b64 = output.get('video')
             
-            if not video_b64:
-                logger.error("Video data not found")
-                return False
+            # Streaming workers return the list of streamed items (progress events, video chunks, final result)
+            if isinstance(output, list):
+                return self.assemble_video_chunks(output, output_path)
             
-            # Create directory
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            video = output.get('video')
             
-            # Decode base64 and save video
-            decoded_video = base64.b64decode(video_b64)
+            if not video and output.get('video_url'):
+                return self.download_video(output, output_path)
+            
+            if not video:
+                logger.error("Video data not found")
+                return False
             
-            with open(output_path, 'wb') as f:
-                f.write(decoded_video)
+            if isinstance(video, SpooledMedia):
+                # Already decoded to disk while the status response was parsed
+                video.move_to(output_path)
+            else:
+                # Decode base64 slice by slice into the file
+                with _AtomicFile(output_path) as f:
+                    _write_base64(f, video)
+                    f.commit()
             
             file_size = os.path.getsize(output_path)
             logger.info(f"✅ Video saved successfully: {output_path} ({file_size / (1024*1024):.1f}MB)")
@@ -201,59 +1260,238 @@ class GenerateVideoClient:
             logger.error(f"❌ Video save failed: {e}")
             return False
     
-    def create_video_from_image(
-        self,
-        image_path: str,
-        prompt: str = "running man, grab the gun",
-        width: int = 480,
-        height: int = 832,
-        length: int = 81,
-        steps: int = 10,
-        seed: int = 42,
-        cfg: float = 2.0,
-        context_overlap: int = 48,
-        lora_pairs: Optional[List[Dict[str, Any]]] = None
-    ) -> Dict[str, Any]:
+    def assemble_video_chunks(self, items: Iterable[Dict[str, Any]], output_path: str) -> bool:
         """
-        Generate video from image
+        Reassemble a video streamed as ordered base64 chunks
+        
+        Each chunk is decoded and written as soon as it arrives, so memory use
+        does not grow with the video length.
         
         Args:
-            image_path: Image file path
-            prompt: Prompt text
-            width: Output width
-            height: Output height
-            length: Number of frames
-            steps: Number of steps
-            seed: Seed value
-            cfg: CFG scale
-            context_overlap: Context overlap
-            lora_pairs: LoRA settings list (max 4)
+            items: Streamed output items (progress events, video_chunk items and the final result)
+            output_path: File path to save
         
         Returns:
-            Job result dictionary
+            Save success status
         """
-        # Check file existence
-        if not os.path.exists(image_path):
-            return {"error": f"Image file does not exist: {image_path}"}
+        try:
+            digest = hashlib.sha256()
+            next_index = 0
+            summary = None
+            with _AtomicFile(output_path) as f:
+                for item in items:
+                    if not isinstance(item, dict):
+                        continue
+                    if item.get('type') == 'video_chunk':
+                        if item['index'] != next_index:
+                            raise ValueError(f"Unexpected chunk index {item['index']} (expected {next_index})")
+                        data = base64.b64decode(item['data'])
+                        f.write(data)
+                        digest.update(data)
+                        next_index += 1
+                    elif 'type' not in item:
+                        summary = item
+                
+                if summary is None or 'video_chunks' not in summary:
+                    f.discard()
+                    # Not a chunked result: fall back to inline/object storage handling
+                    if summary and (summary.get('video') or summary.get('video_url')):
+                        return self.save_video_result({'status': 'COMPLETED', 'output': summary}, output_path)
+                    logger.error(f"Video data not found: {summary.get('error') if summary else 'no result item'}")
+                    return False
+                
+                if next_index != summary['video_chunks'] or digest.hexdigest() != summary.get('video_sha256'):
+                    logger.error(f"❌ Reassembled video is incomplete or corrupted: {output_path}")
+                    return False
+                f.commit()
+            
+            file_size = os.path.getsize(output_path)
+            logger.info(f"✅ Video reassembled from {next_index} chunks: {output_path} ({file_size / (1024*1024):.1f}MB)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Video reassembly failed: {e}")
+            return False
+    
+    def stream_job(self, job_id: str, poll_interval: float = 1.0, max_wait_time: int = 1800) -> Iterator[Dict[str, Any]]:
+        """
+        Yield streamed output items of a job from the /stream endpoint as they arrive
         
-        # Encode image to base64
-        image_base64 = self.encode_file_to_base64(image_path)
-        if not image_base64:
-            return {"error": "Image base64 encoding failed"}
+        Args:
+            job_id: Job ID
+            poll_interval: Delay between /stream calls (seconds)
+            max_wait_time: Maximum wait time (seconds)
+        
+        Yields:
+            Streamed output items
+        """
+        start_time = time.time()
+        
+        while time.time() - start_time < max_wait_time:
+            response = self.session.get(f"{self.stream_url}/{job_id}", timeout=60, stream=self.stream_media)
+            response.raise_for_status()
+            stream_data = self._read_json(response)
+            
+            for entry in stream_data.get('stream', []):
+                yield entry.get('output')
+            
+            status = stream_data.get('status')
+            if status in ('COMPLETED', 'FAILED', 'CANCELLED', 'TIMED_OUT'):
+                if status != 'COMPLETED':
+                    logger.error(f"❌ Job ended with status {status}")
+                return
+            time.sleep(poll_interval)
+        
+        logger.error(f"❌ Job stream timeout ({max_wait_time} seconds)")
+    
+    def save_streamed_video(self, job_id: str, output_path: str) -> bool:
+        """
+        Save a chunked video by consuming the job's /stream output directly
+        
+        Args:
+            job_id: Job ID
+            output_path: File path to save
+        
+        Returns:
+            Save success status
+        """
+        return self.assemble_video_chunks(self.stream_job(job_id), output_path)
+    
+    def download_video(self, output: Dict[str, Any], output_path: str, chunk_size: int = 1024 * 1024) -> bool:
+        """
+        Download a video uploaded to object storage by the worker
+        
+        Args:
+            output: Job output containing video_url (and optionally video_sha256)
+            output_path: File path to save
+            chunk_size: Download chunk size (bytes)
+        
+        Returns:
+            Save success status
+        """
+        try:
+            # Pre-signed URLs must not receive the RunPod Authorization header
+            digest = hashlib.sha256()
+            with requests.get(output['video_url'], stream=True, timeout=60) as response:
+                response.raise_for_status()
+                with _AtomicFile(output_path) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                    
+                    expected_sha256 = output.get('video_sha256')
+                    if expected_sha256 and digest.hexdigest() != expected_sha256:
+                        logger.error(f"❌ Checksum mismatch for downloaded video: {output_path}")
+                        return False
+                    f.commit()
+            
+            file_size = os.path.getsize(output_path)
+            logger.info(f"✅ Video downloaded successfully: {output_path} ({file_size / (1024*1024):.1f}MB)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Video download failed: {e}")
+            return False
+    
+    def upload_image(self, image_path: str, wait_seconds: int = 60) -> Optional[str]:
+        """
+        Store an image in the endpoint's input store, so jobs can send its hash instead of the image
+        
+        The upload is a short job that does not run ComfyUI. Each image is uploaded
+        once per client; later calls return the known reference without a request.
+        
+        Args:
+            image_path: Image file path
+            wait_seconds: How long /runsync holds the upload request open (seconds)
+        
+        Returns:
+            sha256 image reference (the image_ref input), or None if the upload failed
+            (e.g. the endpoint has no input store)
+        """
+        try:
+            image_ref = _file_sha256(image_path)
+        except OSError as e:
+            logger.error(f"❌ Image file can not be read: {e}")
+            return None
+        if image_ref in self._image_refs:
+            return image_ref
+        
+        result = self.run_sync({"upload_only": True, "image_base64": Base64File(image_path)}, wait_seconds=wait_seconds)
+        if result.get('status') != 'COMPLETED' or (result.get('output') or {}).get('image_ref') != image_ref:
+            logger.warning(f"⚠️ Image upload failed, images are sent inline: {result.get('error', result.get('status'))}")
+            return None
+        self._image_refs.add(image_ref)
+        logger.info(f"📤 Image uploaded: {image_path} (image_ref: {image_ref[:12]})")
+        return image_ref
+    
+    @staticmethod
+    def _is_image_ref_miss(result: Dict[str, Any]) -> bool:
+        return result.get('status') == 'FAILED' and IMAGE_REF_NOT_FOUND in str(result.get('error', ''))
+    
+    def build_video_input(
+        self,
+        image_path: str,
+        prompt: str = "running man, grab the gun",
+        width: int = 480,
+        height: int = 832,
+        length: int = 81,
+        steps: int = 10,
+        seed: int = 42,
+        cfg: float = 2.0,
+        context_overlap: int = 48,
+        lora_pairs: Optional[List[Dict[str, Any]]] = None,
+        image_data: Optional[bytes] = None,
+        image_ref: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the API input for generating a video from an image
+        
+        Args:
+            image_path: Image file path
+            prompt: Prompt text
+            width: Output width
+            height: Output height
+            length: Number of frames
+            steps: Number of steps
+            seed: Seed value
+            cfg: CFG scale
+            context_overlap: Context overlap
+            lora_pairs: LoRA settings list (max 4)
+            image_data: Already preprocessed image bytes to send instead of the file
+            image_ref: sha256 of the image in the endpoint's input store (see upload_image),
+                sent instead of the image itself
+        
+        Returns:
+            API input data (image_base64 is a Base64File), or a dictionary with "error" on failure
+        """
+        # Check file existence
+        if not os.path.exists(image_path):
+            return {"error": f"Image file does not exist: {image_path}"}
+        
+        # The image is base64-encoded from disk while the request is sent
+        try:
+            if image_ref is not None:
+                image_input = {"image_ref": image_ref}
+            elif image_data is not None:
+                image_input = {"image_base64": base64.b64encode(image_data).decode('ascii')}
+            else:
+                image_input = {"image_base64": Base64File(image_path)}
+        except OSError as e:
+            logger.error(f"❌ File base64 encoding failed: {e}")
+            return {"error": "Image base64 encoding failed"}
         
         # Process LoRA settings
         if lora_pairs is None:
             lora_pairs = []
         
         # Support up to 4 LoRAs
-        lora_count = min(len(lora_pairs), 4)
         if len(lora_pairs) > 4:
             logger.warning(f"LoRA count is {len(lora_pairs)}. Only up to 4 LoRAs are supported. Using first 4 only.")
             lora_pairs = lora_pairs[:4]
         
         # Configure API input data
-        input_data = {
-            "image_base64": image_base64,
+        return {
+            **image_input,
             "prompt": prompt,
             "width": width,
             "height": height,
@@ -264,6 +1502,79 @@ class GenerateVideoClient:
             "context_overlap": context_overlap,
             "lora_pairs": lora_pairs
         }
+    
+    @staticmethod
+    def _preprocess_options(preprocess: Union[bool, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not preprocess:
+            return None
+        if Image is None:
+            raise ImportError("Image preprocessing requires Pillow (pip install pillow)")
+        return {} if preprocess is True else dict(preprocess)
+    
+    @staticmethod
+    def _log_preprocessed(image_path: str, info: Dict[str, Any]):
+        original_w, original_h = info["original_size"]
+        width, height = info["size"]
+        action = "re-encoded" if info["reencoded"] else "kept original"
+        logger.info(
+            f"🗜️ Preprocessed {os.path.basename(image_path)}: {original_w}x{original_h} {info['original_bytes'] / 1024:.0f}KB"
+            f" -> {width}x{height} {info['bytes'] / 1024:.0f}KB ({action})"
+        )
+    
+    def create_video_from_image(
+        self,
+        image_path: str,
+        prompt: str = "running man, grab the gun",
+        width: int = 480,
+        height: int = 832,
+        length: int = 81,
+        steps: int = 10,
+        seed: int = 42,
+        cfg: float = 2.0,
+        context_overlap: int = 48,
+        lora_pairs: Optional[List[Dict[str, Any]]] = None,
+        use_runsync: bool = False,
+        preprocess: Union[bool, Dict[str, Any]] = False
+    ) -> Dict[str, Any]:
+        """
+        Generate video from image
+        
+        Args:
+            image_path: Image file path
+            prompt: Prompt text
+            width: Output width
+            height: Output height
+            length: Number of frames
+            steps: Number of steps
+            seed: Seed value
+            cfg: CFG scale
+            context_overlap: Context overlap
+            lora_pairs: LoRA settings list (max 4)
+            use_runsync: Submit through /runsync so short jobs return without status polling
+            preprocess: Resize/crop/re-encode the image to the target resolution before upload;
+                True for defaults or a dict of preprocess_image options (fit, image_format, quality, max_bytes)
+        
+        Returns:
+            Job result dictionary
+        """
+        image_data = None
+        options = self._preprocess_options(preprocess)
+        if options is not None and os.path.exists(image_path):
+            try:
+                image_data, info = preprocess_image(image_path, width, height, **options)
+            except Exception as e:
+                logger.error(f"❌ Image preprocessing failed: {e}")
+                return {"error": f"Image preprocessing failed: {e}"}
+            self._log_preprocessed(image_path, info)
+        
+        input_data = self.build_video_input(
+            image_path, prompt, width, height, length, steps, seed, cfg, context_overlap, lora_pairs, image_data
+        )
+        if "error" in input_data:
+            return input_data
+        
+        if use_runsync:
+            return self.run_sync(input_data)
         
         # Submit job and wait
         job_id = self.submit_job(input_data)
@@ -273,6 +1584,284 @@ class GenerateVideoClient:
         result = self.wait_for_completion(job_id)
         return result
     
+    def _list_batch_images(self, image_folder_path: str, output_folder_path: str, valid_extensions: tuple) -> Union[List[str], Dict[str, Any]]:
+        """
+        List the images of a batch folder in name order and create the output folder
+        
+        Returns:
+            Sorted image file names, or a dictionary with "error" on failure
+        """
+        # Check path
+        if not os.path.isdir(image_folder_path):
+            return {"error": f"Image folder does not exist: {image_folder_path}"}
+        
+        # Create output folder
+        os.makedirs(output_folder_path, exist_ok=True)
+        
+        # Get image file list
+        image_files = sorted(
+            f for f in os.listdir(image_folder_path)
+            if f.lower().endswith(valid_extensions)
+        )
+        
+        if not image_files:
+            return {"error": f"No image files to process: {image_folder_path}"}
+        return image_files
+    
+    @staticmethod
+    def _batch_output_path(output_folder_path: str, filename: str) -> str:
+        base_filename = os.path.splitext(filename)[0]
+        return os.path.join(output_folder_path, f"result_{base_filename}.mp4")
+    
+    @staticmethod
+    def _batch_summary(image_files: List[str], entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        successful = sum(1 for entry in entries if entry["status"] == "success")
+        logger.info(f"\n🎉 Batch processing completed: {successful}/{len(image_files)} successful")
+        return {
+            "total_files": len(image_files),
+            "successful": successful,
+            "failed": len(entries) - successful,
+            "results": entries
+        }
+    
+    @staticmethod
+    def _open_manifest(manifest: Union[bool, str], output_folder_path: str) -> Optional[BatchManifest]:
+        if manifest is False or manifest is None:
+            return None
+        path = os.path.join(output_folder_path, "batch_manifest.jsonl") if manifest is True else manifest
+        return BatchManifest(path)
+    
+    def _manifest_state(
+        self,
+        manifest: BatchManifest,
+        filename: str,
+        image_path: str,
+        output_path: str,
+        params_sha256: str
+    ) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Look up a batch item in the manifest
+        
+        Returns:
+            (manifest key, result entry if the item is already done, job ID to re-attach to)
+        """
+        content_sha256 = _file_sha256(image_path)
+        key = f"{content_sha256}:{params_sha256}:{filename}"
+        entry = manifest.get(key)
+        if entry is None:
+            manifest.update(
+                key, filename=filename, content_sha256=content_sha256, params_sha256=params_sha256,
+                job_id=None, status="pending", output_file=output_path, error=None
+            )
+            return key, None, None
+        
+        if entry.get('status') == 'success' and entry.get('output_file') and os.path.exists(entry['output_file']):
+            logger.info(f"⏭️ [{filename}] Already processed: {entry['output_file']}")
+            done = {"filename": filename, "status": "success", "output_file": entry['output_file'], "job_id": entry.get('job_id'), "skipped": True}
+            return key, done, None
+        # A submitted job may still be running (or its result may still be fetchable if the output went missing)
+        resume_job_id = entry.get('job_id') if entry.get('status') in ('submitted', 'success') else None
+        return key, None, resume_job_id
+    
+    def _record_batch_item(self, manifest: BatchManifest, key: str, entry: Dict[str, Any], result: Dict[str, Any]):
+        if entry["status"] == "success":
+            status = "success"
+        elif result.get('status') in UNSETTLED_STATUSES:
+            # The job may still finish; a rerun re-attaches to it
+            status = "submitted"
+        else:
+            status = "failed"
+        fields = {"output_file": entry["output_file"]} if "output_file" in entry else {}
+        manifest.update(key, status=status, job_id=entry.get("job_id"), error=entry.get("error"), **fields)
+    
+    def _batch_item_flow(
+        self,
+        filename: str,
+        image_path: str,
+        output_path: str,
+        video_params: Dict[str, Any],
+        progress: _BatchProgress,
+        job_retries: int,
+        preprocess: Optional[Dict[str, Any]] = None,
+        manifest: Optional[BatchManifest] = None,
+        params_sha256: Optional[str] = None,
+        image_ref: Optional[str] = None
+    ) -> Generator[_BatchOp, Any, Dict[str, Any]]:
+        """
+        Decide how to resume, submit, wait for and save one batch image
+        
+        The threaded and asyncio batches share this logic and differ only in how they
+        run the I/O: the generator yields (operation, argument) pairs and is resumed
+        with the outcome (or has the raised exception thrown into it):
+        
+            ("call", fn)     blocking local work such as manifest updates and saving
+            ("process", fn)  CPU bound work run on the preprocess executor
+            ("submit", data) submit a job; resumed with the job ID or None
+            ("wait", job_id) wait on the status poller; resumed with the job result
+            ("sleep", delay) back off before resubmitting
+        
+        Returns:
+            Batch result entry
+        """
+        key = resume_job_id = result = None
+        if manifest is not None:
+            try:
+                key, done, resume_job_id = yield ("call", partial(
+                    self._manifest_state, manifest, filename, image_path, output_path, params_sha256
+                ))
+            except OSError as e:
+                done = {"filename": filename, "status": "failed", "error": f"Image file can not be read: {e}", "job_id": None}
+                progress.emit("failed", filename, error=done["error"])
+                return done
+            if done is not None:
+                progress.emit("skipped", filename, job_id=done["job_id"], output_file=done["output_file"])
+                return done
+        
+        if resume_job_id:
+            logger.info(f"🔗 [{filename}] Re-attaching to job {resume_job_id}")
+            progress.emit("resumed", filename, job_id=resume_job_id)
+            result = yield ("wait", resume_job_id)
+            if result.get('status') not in ('COMPLETED',) + UNSETTLED_STATUSES:
+                logger.warning(f"[{filename}] Job {resume_job_id} can not be resumed ({result.get('error', result.get('status'))}), resubmitting")
+                result = None
+        
+        if result is None:
+            result = yield from self._submit_batch_item(
+                filename, image_path, video_params, progress, job_retries, preprocess, manifest, key, image_ref
+            )
+        
+        entry = yield ("call", partial(self._finish_batch_item, filename, output_path, result, progress))
+        if manifest is not None:
+            yield ("call", partial(self._record_batch_item, manifest, key, entry, result))
+        return entry
+    
+    def _submit_batch_item(
+        self,
+        filename: str,
+        image_path: str,
+        video_params: Dict[str, Any],
+        progress: _BatchProgress,
+        job_retries: int,
+        preprocess: Optional[Dict[str, Any]],
+        manifest: Optional[BatchManifest],
+        key: Optional[str],
+        image_ref: Optional[str] = None
+    ) -> Generator[_BatchOp, Any, Dict[str, Any]]:
+        """
+        Preprocess, encode and submit one batch image, resubmitting failed jobs (part of _batch_item_flow)
+        
+        With image_ref only the hash is sent; if the endpoint no longer has the
+        image, the job is resubmitted with the image inline.
+        
+        Returns:
+            Job result dictionary (or a dictionary with "error")
+        """
+        image_data = None
+        if preprocess is not None:
+            try:
+                image_data, info = yield ("process", partial(
+                    preprocess_image, image_path, video_params.get("width", 480), video_params.get("height", 832), **preprocess
+                ))
+            except Exception as e:
+                return {"error": f"Image preprocessing failed: {e}"}
+            self._log_preprocessed(image_path, info)
+        
+        input_data = yield ("call", partial(self.build_video_input, image_path, image_data=image_data, image_ref=image_ref, **video_params))
+        if "error" in input_data:
+            return input_data
+        
+        attempt = 0
+        while True:
+            job_id = yield ("submit", input_data)
+            if job_id:
+                if manifest is not None:
+                    yield ("call", partial(manifest.update, key, status="submitted", job_id=job_id))
+                progress.emit("submitted", filename, job_id=job_id, attempt=attempt)
+                result = yield ("wait", job_id)
+            else:
+                result = {"error": "Job submission failed"}
+            if image_ref is not None and self._is_image_ref_miss(result):
+                # Evicted from (or never stored in) the input store: send the image itself
+                logger.warning(f"[{filename}] image_ref {image_ref[:12]} not found on the endpoint, resubmitting inline")
+                self._image_refs.discard(image_ref)
+                image_ref = None
+                input_data = yield ("call", partial(self.build_video_input, image_path, image_data=image_data, **video_params))
+                if "error" in input_data:
+                    return input_data
+                continue
+            # A timed out job may still be running on the endpoint, and a submission that failed
+            # after the request was sent may have been queued, so only jobs that ran and failed are resubmitted
+            if not job_id or result.get('status') in ('COMPLETED',) + UNSETTLED_STATUSES or attempt == job_retries:
+                break
+            delay = self._retry_delay(attempt)
+            logger.warning(f"[{filename}] Job failed ({result.get('error', 'Unknown error')}), resubmitting in {delay:.1f}s")
+            attempt += 1
+            progress.emit("retrying", filename, job_id=result.get('job_id'), error=result.get('error'), attempt=attempt)
+            yield ("sleep", delay)
+        return result
+    
+    def _process_batch_item(
+        self,
+        filename: str,
+        image_path: str,
+        output_path: str,
+        video_params: Dict[str, Any],
+        progress: _BatchProgress,
+        job_retries: int,
+        poller: _StatusPoller,
+        preprocess: Optional[Dict[str, Any]] = None,
+        preprocess_executor: Optional[Executor] = None,
+        manifest: Optional[BatchManifest] = None,
+        params_sha256: Optional[str] = None,
+        image_ref: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Submit, wait for and save one batch image with blocking I/O (runs in a worker thread)
+        
+        Returns:
+            Batch result entry
+        """
+        flow = self._batch_item_flow(
+            filename, image_path, output_path, video_params, progress, job_retries,
+            preprocess, manifest, params_sha256, image_ref
+        )
+        value = error = None
+        while True:
+            try:
+                kind, arg = flow.throw(error) if error is not None else flow.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value = error = None
+            try:
+                if kind == "call":
+                    value = arg()
+                elif kind == "process":
+                    value = preprocess_executor.submit(arg).result()
+                elif kind == "submit":
+                    value = self.submit_job(arg)
+                elif kind == "wait":
+                    value = poller.wait(arg)
+                else:
+                    time.sleep(arg)
+            except Exception as e:
+                error = e
+    
+    def _finish_batch_item(self, filename: str, output_path: str, result: Dict[str, Any], progress: _BatchProgress) -> Dict[str, Any]:
+        if result.get('status') == 'COMPLETED':
+            if self.save_video_result(result, output_path):
+                logger.info(f"✅ [{filename}] Processing completed")
+                entry = {"filename": filename, "status": "success", "output_file": output_path, "job_id": result.get('job_id')}
+                progress.emit("success", filename, job_id=entry["job_id"], output_file=output_path)
+                return entry
+            logger.error(f"[{filename}] Result save failed")
+            error = "Result save failed"
+        else:
+            error = result.get('error', result.get('status', 'Unknown error'))
+            logger.error(f"[{filename}] Job failed: {error}")
+        entry = {"filename": filename, "status": "failed", "error": error, "job_id": result.get('job_id')}
+        progress.emit("failed", filename, job_id=entry["job_id"], error=error)
+        return entry
+    
     def batch_process_images(
         self,
         image_folder_path: str,
@@ -286,11 +1875,25 @@ class GenerateVideoClient:
         seed: int = 42,
         cfg: float = 2.0,
         context_overlap: int = 48,
-        lora_pairs: Optional[List[Dict[str, Any]]] = None
+        lora_pairs: Optional[List[Dict[str, Any]]] = None,
+        max_concurrency: int = 4,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        job_retries: int = 1,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_interval: float = 0.5,
+        preprocess: Union[bool, Dict[str, Any]] = False,
+        preprocess_workers: Optional[int] = None,
+        manifest: Union[bool, str] = True
     ) -> Dict[str, Any]:
         """
         Batch process all image files in folder
         
+        Up to max_concurrency jobs are in flight at once. Each worker encodes,
+        submits and saves its own image, so submitting the next image overlaps
+        with waiting for and saving earlier ones. Status checks of all in-flight
+        jobs are served by one polling loop with per-job adaptive intervals.
+        
         Args:
             image_folder_path: Folder path containing image files
             output_folder_path: Folder path to save results
@@ -304,92 +1907,397 @@ class GenerateVideoClient:
             cfg: CFG scale
             context_overlap: Context overlap
             lora_pairs: LoRA settings list
+            max_concurrency: Maximum number of jobs in flight (1 processes images one by one)
+            progress_callback: Called with a dict per event ("submitted", "resumed", "retrying", "success",
+                "skipped", "failed") including filename, job_id, done, total, successful and failed
+            job_retries: How many times a failed job is resubmitted
+            check_interval: Maximum status check interval (seconds)
+            max_wait_time: Maximum wait time per job (seconds)
+            min_interval: Initial status check interval (seconds)
+            preprocess: Resize/crop/re-encode images before upload (see create_video_from_image)
+            preprocess_workers: Processes used for preprocessing (default: CPU count)
+            manifest: Resume manifest path; True uses batch_manifest.jsonl in the output folder,
+                False disables resuming
         
         Returns:
-            Batch processing result dictionary
+            Batch processing result dictionary (results are in file name order)
         """
-        # Check path
-        if not os.path.isdir(image_folder_path):
-            return {"error": f"Image folder does not exist: {image_folder_path}"}
+        image_files = self._list_batch_images(image_folder_path, output_folder_path, valid_extensions)
+        if isinstance(image_files, dict):
+            return image_files
         
-        # Create output folder
+        max_concurrency = max(1, max_concurrency)
+        preprocess_options = self._preprocess_options(preprocess)
+        batch_manifest = self._open_manifest(manifest, output_folder_path)
+        logger.info(f"Starting batch processing: {len(image_files)} files ({max_concurrency} in flight)")
+        
+        # Keep one pooled connection per worker
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, max_concurrency))
+        self.session.mount("https://", adapter)
+        
+        video_params = {
+            "prompt": prompt, "width": width, "height": height, "length": length, "steps": steps,
+            "seed": seed, "cfg": cfg, "context_overlap": context_overlap, "lora_pairs": lora_pairs
+        }
+        params_sha256 = BatchManifest.params_sha256(video_params, preprocess_options)
+        progress = _BatchProgress(len(image_files), progress_callback)
+        poller = _StatusPoller(self, check_interval, min_interval, max_wait_time)
+        # Decoding and resizing are CPU bound, so they run in processes rather than the worker threads
+        preprocess_executor = ProcessPoolExecutor(preprocess_workers) if preprocess_options is not None else None
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch") as executor:
+                futures = [
+                    executor.submit(
+                        self._process_batch_item,
+                        filename,
+                        os.path.join(image_folder_path, filename),
+                        self._batch_output_path(output_folder_path, filename),
+                        video_params,
+                        progress,
+                        job_retries,
+                        poller,
+                        preprocess_options,
+                        preprocess_executor,
+                        batch_manifest,
+                        params_sha256
+                    )
+                    for filename in image_files
+                ]
+                entries = [future.result() for future in futures]
+        finally:
+            poller.close()
+            if preprocess_executor is not None:
+                preprocess_executor.shutdown()
+            if batch_manifest is not None:
+                batch_manifest.close()
+        
+        return self._batch_summary(image_files, entries)
+    
+    def sweep_image(
+        self,
+        image_path: str,
+        output_folder_path: str,
+        variations: List[Dict[str, Any]],
+        max_concurrency: int = 4,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        job_retries: int = 1,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_interval: float = 0.5,
+        use_image_ref: bool = True,
+        manifest: Union[bool, str] = True,
+        **video_params
+    ) -> Dict[str, Any]:
+        """
+        Generate one video per parameter variation of a single image (seeds, prompts, LoRAs, ...)
+        
+        The image is uploaded to the endpoint's input store once and every job sends
+        only its hash (image_ref). If the endpoint has no input store the image is sent
+        inline, and a job whose reference has been evicted is resubmitted inline.
+        Jobs run concurrently as in batch_process_images.
+        
+        Args:
+            image_path: Image file path
+            output_folder_path: Folder path to save results (<image name>_<index>.mp4)
+            variations: Parameter overrides per video, e.g. [{"seed": 1}, {"seed": 2, "prompt": "..."}]
+            max_concurrency: Maximum number of jobs in flight
+            progress_callback: Called with a dict per event (see batch_process_images)
+            job_retries: How many times a failed job is resubmitted
+            check_interval: Maximum status check interval (seconds)
+            max_wait_time: Maximum wait time per job (seconds)
+            min_interval: Initial status check interval (seconds)
+            use_image_ref: Upload the image once and send image_ref (False sends it with every job)
+            manifest: Resume manifest path (see batch_process_images)
+            **video_params: Parameters shared by all variations (prompt, width, ...)
+        
+        Returns:
+            Batch processing result dictionary (results are in variation order)
+        """
+        if not os.path.exists(image_path):
+            return {"error": f"Image file does not exist: {image_path}"}
         os.makedirs(output_folder_path, exist_ok=True)
         
-        # Get image file list
-        image_files = [
-            f for f in os.listdir(image_folder_path)
-            if f.lower().endswith(valid_extensions)
-        ]
+        max_concurrency = max(1, max_concurrency)
+        image_ref = self.upload_image(image_path) if use_image_ref else None
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        names = [f"{stem}_{index:03d}" for index in range(len(variations))]
+        logger.info(f"Starting sweep: {len(variations)} variations of {image_path} ({max_concurrency} in flight)")
         
-        if not image_files:
-            return {"error": f"No image files to process: {image_folder_path}"}
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, max_concurrency))
+        self.session.mount("https://", adapter)
         
-        logger.info(f"Starting batch processing: {len(image_files)} files")
+        batch_manifest = self._open_manifest(manifest, output_folder_path)
+        progress = _BatchProgress(len(variations), progress_callback)
+        poller = _StatusPoller(self, check_interval, min_interval, max_wait_time)
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="sweep") as executor:
+                futures = []
+                for name, variation in zip(names, variations):
+                    params = {**video_params, **variation}
+                    futures.append(executor.submit(
+                        self._process_batch_item,
+                        name,
+                        image_path,
+                        os.path.join(output_folder_path, f"{name}.mp4"),
+                        params,
+                        progress,
+                        job_retries,
+                        poller,
+                        None,
+                        None,
+                        batch_manifest,
+                        BatchManifest.params_sha256(params),
+                        image_ref
+                    ))
+                entries = [future.result() for future in futures]
+        finally:
+            poller.close()
+            if batch_manifest is not None:
+                batch_manifest.close()
         
-        results = {
-            "total_files": len(image_files),
-            "successful": 0,
-            "failed": 0,
-            "results": []
-        }
+        return self._batch_summary(names, entries)
+    
+    async def _async_request(
+        self, http: "aiohttp.ClientSession", method: str, url: str, stream_media: Optional[bool] = None, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        aiohttp counterpart of _request; returns the decoded JSON body
         
-        # Process each image file
-        for filename in image_files:
-            logger.info(f"\n==================== Processing started: {filename} ====================")
-            
-            image_path = os.path.join(image_folder_path, filename)
-            
-            # Generate video
-            result = self.create_video_from_image(
-                image_path=image_path,
-                prompt=prompt,
-                width=width,
-                height=height,
-                length=length,
-                steps=steps,
-                seed=seed,
-                cfg=cfg,
-                context_overlap=context_overlap,
-                lora_pairs=lora_pairs
+        A _JsonBody passed as data is streamed, and with stream_media (default: the
+        client setting) the response is spooled and parsed as in _read_json.
+        """
+        stream_media = self.stream_media if stream_media is None else stream_media
+        body = kwargs.get('data')
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRYABLE_STATUS_CODES if idempotent else NON_IDEMPOTENT_RETRYABLE_STATUS_CODES
+        for attempt in range(self.max_retries + 1):
+            if isinstance(body, _JsonBody):
+                kwargs['data'] = body.aiter()
+                kwargs['headers'] = {'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+            try:
+                async with http.request(method, url, **kwargs) as response:
+                    if response.status not in retry_statuses or attempt == self.max_retries:
+                        response.raise_for_status()
+                        if not stream_media:
+                            return await response.json()
+                        return await self._async_read_json(response)
+                    delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+                    logger.warning(f"⚠️ {method} {url} returned {response.status}, retrying in {delay:.1f}s")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries or not (idempotent or isinstance(e, aiohttp.ClientConnectorError)):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"⚠️ {method} {url} failed ({e!r}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
+    async def _async_read_json(self, response: "aiohttp.ClientResponse") -> Any:
+        # Spool the body (in memory up to 1 MB, then on disk) and parse it off the event loop
+        spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, dir=self.spool_dir)
+        try:
+            async for chunk in response.content.iter_chunked(RESPONSE_CHUNK_BYTES):
+                spool.write(chunk)
+            spool.seek(0)
+            chunks = iter(lambda: spool.read(RESPONSE_CHUNK_BYTES), b'')
+            parser = _JsonStreamParser(chunks, self.media_keys, self.spool_dir)
+            return await asyncio.to_thread(parser.parse)
+        except ValueError as e:
+            raise aiohttp.ClientPayloadError(f"Invalid JSON response: {e}")
+        finally:
+            spool.close()
+    
+    async def async_submit_job(self, http: "aiohttp.ClientSession", input_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Submit job to RunPod with aiohttp
+        
+        Args:
+            http: aiohttp session
+            input_data: API input data
+        
+        Returns:
+            Job ID or None (on failure)
+        """
+        try:
+            response_data = await self._async_request(
+                http, 'POST', self.runpod_api_endpoint, data=_JsonBody({"input": input_data}), timeout=aiohttp.ClientTimeout(total=30)
             )
-            
-            if result.get('status') == 'COMPLETED':
-                # Save result file
-                base_filename = os.path.splitext(filename)[0]
-                output_filename = os.path.join(output_folder_path, f"result_{base_filename}.mp4")
-                
-                if self.save_video_result(result, output_filename):
-                    logger.info(f"✅ [{filename}] Processing completed")
-                    results["successful"] += 1
-                    results["results"].append({
-                        "filename": filename,
-                        "status": "success",
-                        "output_file": output_filename,
-                        "job_id": result.get('job_id')
-                    })
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"❌ Job submission failed: {e!r}")
+            return None
+        
+        job_id = response_data.get('id')
+        if job_id:
+            logger.info(f"✅ Job submission successful! Job ID: {job_id}")
+        else:
+            logger.error(f"❌ Failed to receive Job ID: {response_data}")
+        return job_id
+    
+    async def async_wait_for_completion(
+        self,
+        http: "aiohttp.ClientSession",
+        job_id: str,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_interval: float = 0.5
+    ) -> Dict[str, Any]:
+        """
+        Wait for job completion with aiohttp (adaptive intervals as in wait_for_completion)
+        
+        Args:
+            http: aiohttp session
+            job_id: Job ID
+            check_interval: Maximum status check interval (seconds)
+            max_wait_time: Maximum wait time (seconds)
+            min_interval: Initial status check interval (seconds)
+        
+        Returns:
+            Job result dictionary
+        """
+        start_time = time.time()
+        interval = self._adaptive_interval(check_interval, min_interval)
+        
+        while time.time() - start_time < max_wait_time:
+            try:
+                status_data = await self._async_request(
+                    http, 'GET', f"{self.status_url}/{job_id}", timeout=aiohttp.ClientTimeout(total=30)
+                )
+                result = self._status_result(job_id, status_data)
+                if result is not None:
+                    return result
+                status = status_data.get('status')
+                if status != interval.status:
+                    logger.info(f"🏃 Job in progress... (Job ID: {job_id}, Status: {status})")
+                delay = interval.next(status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"❌ Status check error: {e!r}")
+                delay = check_interval
+            await asyncio.sleep(max(0, min(delay, max_wait_time - (time.time() - start_time))))
+        
+        logger.error(f"❌ Job wait timeout ({max_wait_time} seconds)")
+        return {
+            'status': 'TIMEOUT',
+            'job_id': job_id
+        }
+    
+    async def _async_run_batch_item(
+        self,
+        flow: Generator[_BatchOp, Any, Dict[str, Any]],
+        http: "aiohttp.ClientSession",
+        poller: _AsyncStatusPoller,
+        preprocess_executor: Optional[Executor]
+    ) -> Dict[str, Any]:
+        """
+        Run a _batch_item_flow on the event loop (blocking work goes to threads)
+        
+        Returns:
+            Batch result entry
+        """
+        value = error = None
+        while True:
+            try:
+                kind, arg = flow.throw(error) if error is not None else flow.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value = error = None
+            try:
+                if kind == "call":
+                    value = await asyncio.to_thread(arg)
+                elif kind == "process":
+                    value = await asyncio.get_running_loop().run_in_executor(preprocess_executor, arg)
+                elif kind == "submit":
+                    value = await self.async_submit_job(http, arg)
+                elif kind == "wait":
+                    value = await poller.wait(arg)
                 else:
-                    logger.error(f"[{filename}] Result save failed")
-                    results["failed"] += 1
-                    results["results"].append({
-                        "filename": filename,
-                        "status": "failed",
-                        "error": "Result save failed",
-                        "job_id": result.get('job_id')
-                    })
-            else:
-                logger.error(f"[{filename}] Job failed: {result.get('error', 'Unknown error')}")
-                results["failed"] += 1
-                results["results"].append({
-                    "filename": filename,
-                    "status": "failed",
-                    "error": result.get('error', 'Unknown error'),
-                    "job_id": result.get('job_id')
-                })
-            
-            logger.info(f"==================== Processing completed: {filename} ====================")
+                    await asyncio.sleep(arg)
+            except Exception as e:
+                error = e
+    
+    async def async_batch_process_images(
+        self,
+        image_folder_path: str,
+        output_folder_path: str,
+        valid_extensions: tuple = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff'),
+        max_concurrency: int = 8,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        job_retries: int = 1,
+        check_interval: float = 10,
+        max_wait_time: int = 1800,
+        min_interval: float = 0.5,
+        preprocess: Union[bool, Dict[str, Any]] = False,
+        preprocess_workers: Optional[int] = None,
+        manifest: Union[bool, str] = True,
+        **video_params
+    ) -> Dict[str, Any]:
+        """
+        asyncio variant of batch_process_images using aiohttp
+        
+        Submission and polling run on the event loop, with one coalesced polling
+        task for all in-flight jobs; base64 encoding and saving run in worker
+        threads so they do not block other jobs.
+        
+        Args:
+            image_folder_path: Folder path containing image files
+            output_folder_path: Folder path to save results
+            valid_extensions: Image file extensions to process
+            max_concurrency: Maximum number of jobs in flight
+            progress_callback: Called with a dict per event (see batch_process_images)
+            job_retries: How many times a failed job is resubmitted
+            check_interval: Maximum status check interval (seconds)
+            max_wait_time: Maximum wait time per job (seconds)
+            min_interval: Initial status check interval (seconds)
+            preprocess: Resize/crop/re-encode images before upload (see create_video_from_image)
+            preprocess_workers: Processes used for preprocessing (default: CPU count)
+            manifest: Resume manifest path (see batch_process_images)
+            **video_params: Generation parameters of create_video_from_image (prompt, width, ...)
+        
+        Returns:
+            Batch processing result dictionary (results are in file name order)
+        """
+        if aiohttp is None:
+            raise ImportError("async_batch_process_images requires aiohttp (pip install aiohttp)")
+        
+        image_files = self._list_batch_images(image_folder_path, output_folder_path, valid_extensions)
+        if isinstance(image_files, dict):
+            return image_files
+        
+        max_concurrency = max(1, max_concurrency)
+        preprocess_options = self._preprocess_options(preprocess)
+        batch_manifest = self._open_manifest(manifest, output_folder_path)
+        params_sha256 = BatchManifest.params_sha256(video_params, preprocess_options)
+        logger.info(f"Starting async batch processing: {len(image_files)} files ({max_concurrency} in flight)")
+        progress = _BatchProgress(len(image_files), progress_callback)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        preprocess_executor = ProcessPoolExecutor(preprocess_workers) if preprocess_options is not None else None
+        
+        async def process(http, poller, filename):
+            async with semaphore:
+                flow = self._batch_item_flow(
+                    filename,
+                    os.path.join(image_folder_path, filename),
+                    self._batch_output_path(output_folder_path, filename),
+                    video_params,
+                    progress,
+                    job_retries,
+                    preprocess_options,
+                    batch_manifest,
+                    params_sha256
+                )
+                return await self._async_run_batch_item(flow, http, poller, preprocess_executor)
+        
+        headers = {'Authorization': f'Bearer {self.runpod_api_key}'}
+        connector = aiohttp.TCPConnector(limit=max_concurrency * 2)
+        async with aiohttp.ClientSession(headers=headers, connector=connector) as http:
+            poller = _AsyncStatusPoller(self, http, check_interval, min_interval, max_wait_time)
+            try:
+                entries = await asyncio.gather(*(process(http, poller, filename) for filename in image_files))
+            finally:
+                await poller.close()
+                if preprocess_executor is not None:
+                    preprocess_executor.shutdown()
+                if batch_manifest is not None:
+                    batch_manifest.close()
         
-        logger.info(f"\n🎉 Batch processing completed: {results['successful']}/{results['total_files']} successful")
-        return results
+        return self._batch_summary(image_files, list(entries))
 
 
 def main():
@@ -1,15 +1,31 @@
 import runpod
+import asyncio
 import os
-import websocket
 import base64
-import json
+import queue
 import uuid
+import time
 import logging
-import urllib.request
-import urllib.parse
 import binascii # Base64 에러 처리를 위해 import
-import subprocess
-import time
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from comfy_client import ComfyUIClient, received_at
+from progress import ProgressTracker
+from downloader import Downloader
+from input_store import InputStore, ImageRefNotFound
+from staging import InputStager, rewrite_image_references, staged_reference
+from workflows import WorkflowRegistry
+from result_cache import ResultCache
+from singleflight import SingleFlight
+from cancellation import JobCancelled, JobControl, RunPodStatusChecker
+from scheduler import PromptGate, model_set_key
+from startup import ColdStart
+from model_cache import ModelCache
+from model_index import ModelIndex
+from model_paths import model_file_names
+from metrics import Metrics, StageTimer
+from profiler import NodeProfiler, ProfileAggregator, workload_dims
+from outputs import ObjectStore, OutputPrefetcher, build_video_result, encode_file_base64, resolve_output_mode, stream_video_chunks
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +33,68 @@ logger = logging.getLogger(__name__)
 
 server_address = os.getenv('SERVER_ADDRESS', '127.0.0.1')
 client_id = str(uuid.uuid4())
+# 워커 시작 시 한 번 생성되어 모든 job에서 공유되는 ComfyUI 세션
+comfy = ComfyUIClient(server_address, int(os.getenv('SERVER_PORT', '8188')), client_id)
+# ComfyUI 부팅과 병렬로 준비 확인/웹소켓 연결/웜업을 진행하고 단계별 시간을 기록
+cold_start = ColdStart.from_env(comfy)
+# true면 부팅 시 기본 템플릿으로 작은 prompt를 한 번 실행해 첫 job 전에 모델을 로드
+WARMUP = os.getenv('WARMUP', 'false').lower() == 'true'
+# 웜업 prompt의 마감 시간(초). 넘으면 prompt를 중단하고 PromptGate 슬롯을 반납
+WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '600'))
+# true면 generator handler로 등록되어 진행 상황/프리뷰 프레임을 RunPod 스트리밍 출력으로 내보냄
+STREAM_OUTPUT = os.getenv('STREAM_OUTPUT', 'false').lower() == 'true'
+PREVIEW_MAX_SIZE = int(os.getenv('PREVIEW_MAX_SIZE', '256'))
+# 출력 전송 방식: auto(버킷이 설정되어 있고 크기가 임계값을 넘으면 s3) / inline / s3
+OUTPUT_MODE = os.getenv('OUTPUT_MODE', 'auto')
+OUTPUT_INLINE_MAX_BYTES = int(os.getenv('OUTPUT_INLINE_MAX_BYTES', str(10 * 1024 * 1024)))
+object_store = ObjectStore.from_env()
+# chunked 출력의 청크 크기 (3의 배수로 내림 정렬됨)
+OUTPUT_CHUNK_SIZE = int(os.getenv('OUTPUT_CHUNK_SIZE', str(768 * 1024)))
+# false면 RunPod가 스트리밍 출력을 메모리에 모아 /status로 돌려주지 않음 (대용량 chunked 출력은 /stream으로 수신)
+STREAM_AGGREGATE = os.getenv('STREAM_AGGREGATE', 'true').lower() == 'true'
+# 출력 노드의 executed 이벤트를 받는 즉시 나머지 노드 실행과 겹쳐서 인코딩/업로드를 시작
+output_executor = ThreadPoolExecutor(max_workers=int(os.getenv('OUTPUT_WORKERS', '4')), thread_name_prefix="output")
+# executed 이벤트의 gifs[].fullpath로 결과 파일을 알 수 있는 출력 노드 타입 (모두 받으면 /history 조회 생략)
+VIDEO_OUTPUT_NODE_TYPES = ("VHS_VideoCombine",)
+# image_url/end_image_url 다운로드용 (커넥션 풀, 크기/시간 제한, 볼륨 캐시)
+downloader = Downloader.from_env()
+# base64 입력 이미지를 sha256으로 저장해 두고, 이후 job은 image_ref만 보내 재사용 (INPUT_STORE_DIR를 비우면 비활성화)
+input_store = InputStore.from_env()
+# ComfyUI 입력 디렉토리를 공유하면 HTTP 업로드 대신 해시 기반으로 직접 배치
+stager = InputStager(comfy, os.getenv('COMFYUI_INPUT_DIR', '/runpod-volume/ComfyUI/input'))
+# 반복 요청(같은 그래프 + 입력)의 결과 캐시 (RESULT_CACHE_DIR를 비우면 비활성화)
+result_cache = ResultCache.from_env()
+# 동시에 들어온 동일 job은 하나의 prompt 실행을 공유
+inflight = SingleFlight()
+# job 마감 시간 기본값(초, 0이면 없음). job 입력의 timeout_seconds가 우선하며, 넘으면 ComfyUI에서 prompt를 중단
+JOB_TIMEOUT_SECONDS = float(os.getenv('JOB_TIMEOUT_SECONDS', '0'))
+# RUNPOD_API_KEY가 있으면 RunPod에서 취소/타임아웃된 job을 감지해 GPU를 바로 반납
+status_checker = RunPodStatusChecker.from_env()
+# 동시에 받는 job 수와, 그중 ComfyUI 큐에 동시에 올라갈 수 있는 prompt 수
+# (ComfyUI는 prompt를 하나씩 실행하므로 VRAM을 많이 쓰는 prompt가 병렬로 실행되지는 않음)
+# 모델/LoRA 기준 재정렬은 게이트에서 2개 이상 대기할 때만 동작하므로 JOB_CONCURRENCY > PROMPT_SLOTS + 1이어야 함
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '4'))
+PROMPT_SLOTS = int(os.getenv('PROMPT_SLOTS', '2'))
+# 대기 중인 prompt가 모델/LoRA 세트가 같은 prompt에게 추월당할 수 있는 최대 횟수 (0이면 FIFO)
+AFFINITY_MAX_SKIPS = int(os.getenv('AFFINITY_MAX_SKIPS', '3'))
+prompt_gate = PromptGate(PROMPT_SLOTS, AFFINITY_MAX_SKIPS)
+if AFFINITY_MAX_SKIPS > 0 and JOB_CONCURRENCY <= PROMPT_SLOTS + 1:
+    logger.warning(
+        f"⚠️ JOB_CONCURRENCY({JOB_CONCURRENCY})가 PROMPT_SLOTS+1({PROMPT_SLOTS + 1}) 이하라 "
+        f"모델/LoRA 기준 prompt 재정렬이 동작하지 않습니다"
+    )
+# 자주 쓰는 모델/LoRA를 네트워크 볼륨에서 로컬 디스크로 미러링 (ComfyUI는 로컬 복사본을 우선 사용)
+model_cache = ModelCache.from_env()
+# job 단계별 소요 시간 집계 (METRICS_FILE / METRICS_PORT로 Prometheus 형식 출력)
+metrics = Metrics.from_env()
+# 웹소켓 이벤트로 측정한 노드별 실행 시간을 노드 타입/작업 크기별로 누적 (PROFILE_DIR에 JSON 리포트)
+node_profiles = ProfileAggregator.from_env()
+# 모델 디렉토리 파일 인덱스: LoRA 이름을 큐에 넣기 전에 검증/보정하고 필요한 파일을 미리 읽음
+model_index = ModelIndex.from_env()
+# 인덱스가 아직 만들어지는 중이면 job이 기다리는 최대 시간(초). 넘으면 검증 없이 진행
+MODEL_INDEX_WAIT_SECONDS = float(os.getenv('MODEL_INDEX_WAIT_SECONDS', '30'))
+# 워크플로우 템플릿은 시작 시 한 번 로드/검증하고 파일이 바뀌면 다시 로드
+workflow_registry = WorkflowRegistry(template_dir=os.getenv('WORKFLOW_TEMPLATE_DIR', '/workflows'))
 def to_nearest_multiple_of_16(value):
     """주어진 값을 가장 가까운 16의 배수로 보정, 최소 16 보장"""
     try:
@@ -43,87 +121,88 @@ def process_input(input_data, temp_dir, output_filename, input_type):
         # Base64인 경우 디코딩하여 저장
         logger.info(f"🔢 Base64 입력 처리")
         return save_base64_to_file(input_data, temp_dir, output_filename)
+    elif input_type == "ref":
+        # 입력 저장소에 있는 이미지를 링크 (없으면 ImageRefNotFound → 클라이언트가 인라인으로 재전송)
+        logger.info(f"🔗 image_ref 입력 처리: {input_data}")
+        if input_store is None:
+            raise ImageRefNotFound(input_data)
+        return input_store.place(input_data, os.path.abspath(os.path.join(temp_dir, output_filename)))
     else:
         raise Exception(f"지원하지 않는 입력 타입: {input_type}")
 
         
 def download_file_from_url(url, output_path):
-    """URL에서 파일을 다운로드하는 함수"""
+    """URL에서 파일을 다운로드하는 함수 (커넥션 풀 + 볼륨 캐시 공유)"""
     try:
-        # wget을 사용하여 파일 다운로드
-        result = subprocess.run([
-            'wget', '-O', output_path, '--no-verbose', url
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            logger.info(f"✅ URL에서 파일을 성공적으로 다운로드했습니다: {url} -> {output_path}")
-            return output_path
-        else:
-            logger.error(f"❌ wget 다운로드 실패: {result.stderr}")
-            raise Exception(f"URL 다운로드 실패: {result.stderr}")
-    except subprocess.TimeoutExpired:
-        logger.error("❌ 다운로드 시간 초과")
-        raise Exception("다운로드 시간 초과")
+        downloader.fetch(url, output_path)
+        logger.info(f"✅ URL에서 파일을 성공적으로 다운로드했습니다: {url} -> {output_path}")
+        return output_path
     except Exception as e:
         logger.error(f"❌ 다운로드 중 오류 발생: {e}")
         raise Exception(f"다운로드 중 오류 발생: {e}")
 
 
-def save_base64_to_file(base64_data, temp_dir, output_filename):
-    """Base64 데이터를 파일로 저장하는 함수"""
+def process_inputs(specs, temp_dir):
+    """(input_data, output_filename, input_type) 목록을 처리. 두 개 이상이면 병렬로 처리 (FLF2V 시작/끝 이미지)"""
+    active = [spec for spec in specs if spec is not None]
+    if len(active) < 2:
+        return [process_input(spec[0], temp_dir, spec[1], spec[2]) if spec else None for spec in specs]
+    futures = [downloader.executor.submit(process_input, spec[0], temp_dir, spec[1], spec[2]) if spec else None for spec in specs]
+    return [future.result() if future else None for future in futures]
+
+
+def decode_base64(base64_data):
+    """Base64 문자열을 디코딩하는 함수"""
     try:
-        # Base64 문자열 디코딩
-        decoded_data = base64.b64decode(base64_data)
-        
-        # 디렉토리가 존재하지 않으면 생성
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # 파일로 저장
-        file_path = os.path.abspath(os.path.join(temp_dir, output_filename))
-        with open(file_path, 'wb') as f:
-            f.write(decoded_data)
-        
-        logger.info(f"✅ Base64 입력을 '{file_path}' 파일로 저장했습니다.")
-        return file_path
+        return base64.b64decode(base64_data)
     except (binascii.Error, ValueError) as e:
         logger.error(f"❌ Base64 디코딩 실패: {e}")
         raise Exception(f"Base64 디코딩 실패: {e}")
+
+
+def save_base64_to_file(base64_data, temp_dir, output_filename):
+    """Base64 데이터를 파일로 저장하는 함수"""
+    decoded_data = decode_base64(base64_data)
+    file_path = os.path.abspath(os.path.join(temp_dir, output_filename))
+    
+    # 디렉토리가 존재하지 않으면 생성
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    # 파일로 저장
+    with open(file_path, 'wb') as f:
+        f.write(decoded_data)
+    
+    logger.info(f"✅ Base64 입력을 '{file_path}' 파일로 저장했습니다.")
+    if input_store is not None:
+        # 이후 job이 image_ref로 재사용할 수 있도록 입력 저장소(네트워크 볼륨)에는 백그라운드로 저장
+        input_store.put_bytes_background(decoded_data)
+    return file_path
+
+
+def store_inputs(specs):
+    """upload_only job: base64 입력은 입력 저장소에 저장하고 image_ref 입력은 존재를 확인한 뒤 ref를 반환"""
+    if input_store is None:
+        return {"error": "입력 저장소가 설정되지 않았습니다 (INPUT_STORE_DIR)"}
+    refs = {}
+    for key, spec in specs.items():
+        if spec is None:
+            continue
+        input_data, _, input_type = spec
+        if input_type == "base64":
+            refs[key] = input_store.put_bytes(decode_base64(input_data))[0]
+        elif input_type == "ref":
+            if not input_store.contains(input_data):
+                return {"error": str(ImageRefNotFound(input_data))}
+            refs[key] = input_data
+        else:
+            return {"error": f"upload_only는 base64/image_ref 입력만 지원합니다: {input_type}"}
+    return refs
     
 def upload_image_to_comfyui(image_path):
-    """Upload image to ComfyUI server"""
+    """Stage image as ComfyUI input (hash dedup, shared input dir or streamed upload)"""
     try:
-        url = f"http://{server_address}:8188/upload/image"
-        logger.info(f"Uploading image to: {url}")
-        
-        # Читаем файл
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-        
-        # Определяем имя файла
-        filename = os.path.basename(image_path)
-        
-        # Создаем multipart/form-data request
-        boundary = '----WebKitFormBoundary' + str(uuid.uuid4())
-        
-        # Формируем данные
-        body = []
-        body.append(f'--{boundary}'.encode())
-        body.append(f'Content-Disposition: form-data; name="image"; filename="{filename}"'.encode())
-        body.append(b'Content-Type: image/jpeg')
-        body.append(b'')
-        body.append(image_data)
-        body.append(f'--{boundary}--'.encode())
-        body.append(b'')
-        
-        request_body = b'\r\n'.join(body)
-        
-        # Отправляем запрос
-        req = urllib.request.Request(url, data=request_body)
-        req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
-        
-        response = urllib.request.urlopen(req)
-        result = json.loads(response.read())
-        
+        logger.info(f"Staging image for ComfyUI: {image_path}")
+        result = stager.stage(image_path)
         logger.info(f"✅ Image uploaded successfully: {result}")
         return result
         
@@ -131,68 +210,294 @@ def upload_image_to_comfyui(image_path):
         logger.error(f"❌ Failed to upload image: {e}")
         raise Exception(f"Failed to upload image: {e}")
 
-def queue_prompt(prompt):
-    url = f"http://{server_address}:8188/prompt"
-    logger.info(f"Queueing prompt to: {url}")
-    p = {"prompt": prompt, "client_id": client_id}
-    data = json.dumps(p).encode('utf-8')
-    req = urllib.request.Request(url, data=data)
-    return json.loads(urllib.request.urlopen(req).read())
+def queue_prompt(prompt, prompt_id=None):
+    logger.info(f"Queueing prompt to: {comfy.base_url}/prompt")
+    return comfy.queue_prompt(prompt, prompt_id)
 
 def get_image(filename, subfolder, folder_type):
-    url = f"http://{server_address}:8188/view"
-    logger.info(f"Getting image from: {url}")
-    data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
-    url_values = urllib.parse.urlencode(data)
-    with urllib.request.urlopen(f"{url}?{url_values}") as response:
-        return response.read()
+    logger.info(f"Getting image from: {comfy.base_url}/view")
+    return comfy.get_image(filename, subfolder, folder_type)
 
 def get_history(prompt_id):
-    url = f"http://{server_address}:8188/history/{prompt_id}"
-    logger.info(f"Getting history from: {url}")
-    with urllib.request.urlopen(url) as response:
-        return json.loads(response.read())
+    logger.info(f"Getting history from: {comfy.base_url}/history/{prompt_id}")
+    return comfy.get_history(prompt_id)
 
-def get_videos(ws, prompt):
-    prompt_id = queue_prompt(prompt)['prompt_id']
-    output_videos = {}
-    while True:
-        out = ws.recv()
-        if isinstance(out, str):
-            message = json.loads(out)
-            if message['type'] == 'executing':
-                data = message['data']
-                if data['node'] is None and data['prompt_id'] == prompt_id:
-                    break
+def prompt_in_queue(prompt_id):
+    """prompt가 ComfyUI 큐에서 실행 중이거나 대기 중이면 True"""
+    queue_state = comfy.get_queue()
+    return any(item[1] == prompt_id for key in ("queue_running", "queue_pending") for item in queue_state.get(key, []))
+
+def cancel_prompt(prompt_id):
+    """prompt를 ComfyUI에서 제거: 대기 중이면 /queue에서 삭제하고, 실행 중이면 /interrupt"""
+    try:
+        comfy.delete_from_queue([prompt_id])
+        running = {item[1] for item in comfy.get_queue().get("queue_running", [])}
+        if prompt_id in running:
+            comfy.interrupt(prompt_id)
+            logger.info(f"🛑 실행 중인 prompt를 중단했습니다: {prompt_id}")
         else:
-            continue
+            logger.info(f"🛑 대기 중인 prompt를 큐에서 제거했습니다: {prompt_id}")
+    except Exception as e:
+        logger.warning(f"⚠️ prompt 중단 실패: {prompt_id} ({e})")
 
-    history = get_history(prompt_id)[prompt_id]
+def prefetch_output(prefetch, path, requested_mode, streaming, key_prefix=""):
+    """executed 이벤트로 받은 출력 파일의 전송 준비를 백그라운드에서 시작 (첫 파일 기준으로 전송 방식 결정)"""
+    if prefetch.mode is None:
+        try:
+            prefetch.mode = resolve_output_mode(requested_mode, path, object_store, OUTPUT_INLINE_MAX_BYTES, streaming, STREAM_AGGREGATE)
+        except Exception as e:
+            # 잘못된 output_mode 등은 출력 단계에서 그대로 에러로 처리
+            logger.debug(f"출력 미리 처리를 건너뜁니다: {e}")
+            prefetch.mode = "none"
+        prefetch.primary_path = path
+    if prefetch.mode == "inline" and path == prefetch.primary_path:
+        prefetch.submit("base64", path, encode_file_base64, path)
+    elif prefetch.mode == "s3":
+        prefetch.submit("s3", path, object_store.upload_file, path, key_prefix)
+    else:
+        return
+    logger.info(f"⚡ 출력 처리를 미리 시작합니다 ({prefetch.mode}): {os.path.basename(path)}")
+
+def get_videos(prompt, tracker=None, on_queued=None, scheduling=None, timer=None, profiler=None, control=None, shared=None, on_output=None):
+    """prompt를 큐에 넣고 완료될 때까지 진행 이벤트를 yield한 뒤, 노드별 비디오 파일 경로 목록을 반환
+
+    출력 노드의 executed 이벤트가 오면 on_output(node_id, path)를 바로 호출해 나머지 노드가 실행되는 동안
+    출력 처리를 시작할 수 있게 하고, 모든 비디오 출력 노드의 파일 경로를 웹소켓으로 받았으면 /history를 조회하지 않는다.
+    scheduling dict를 넘기면 모델 교체/재정렬 통계를 채워 주고, timer에는 단계별 시간을,
+    profiler에는 노드별 실행 시간을 기록한다. control(JobControl)의 마감/취소가 걸리면
+    prompt를 ComfyUI에서 중단하고 JobCancelled를 던진다. 단 shared()가 True면(같은 결과를
+    기다리는 다른 job이 있음) 중단하지 않고 계속 실행한다.
+    """
+    timer = timer or StageTimer()
+    output_videos = {}
+    expected_outputs = {node_id for node_id, node in prompt.items() if node.get("class_type") in VIDEO_OUTPUT_NODE_TYPES}
+    missed_messages = False
+    # 큐에 넣기 전에 구독해야 실행 시작 메시지를 놓치지 않음
+    prompt_id = str(uuid.uuid4())
+    messages = comfy.subscribe(prompt_id)
+    subscribed = [prompt_id]
+    try:
+        # ComfyUI 큐에 동시에 올라가는 prompt 수 제한 (실행 자체는 ComfyUI가 하나씩 처리)
+        # 대기 중에는 직전 prompt와 모델/LoRA 세트가 같은 prompt가 먼저 나감
+        with timer.stage("schedule_wait"):
+            if control is not None:
+                control.stage = "schedule_wait"
+            ticket = prompt_gate.acquire(model_set_key(prompt), check=control.check if control is not None else None)
+        try:
+            with timer.stage("submit"):
+                queued_id = queue_prompt(prompt, prompt_id)['prompt_id']
+            queued_at = time.monotonic()
+            if queued_id != prompt_id:
+                # prompt_id 지정을 지원하지 않는 ComfyUI 버전
+                prompt_id = queued_id
+                comfy.subscribe(prompt_id, messages)
+                subscribed.append(prompt_id)
+            if on_queued is not None:
+                on_queued(prompt_id)
+            if tracker is not None:
+                tracker.prompt_id = prompt_id
+            if profiler is not None:
+                profiler.prompt_id = prompt_id
+            started_at = finished_at = None
+            if control is not None:
+                control.stage = "execution"
+            while True:
+                if control is not None:
+                    try:
+                        control.check()
+                    except JobCancelled:
+                        if shared is not None and shared():
+                            logger.warning(f"⚠️ 마감/취소됐지만 같은 prompt를 기다리는 job이 있어 계속 실행합니다: {prompt_id}")
+                            control = None
+                            continue
+                        cancel_prompt(prompt_id)
+                        raise
+                    try:
+                        message = messages.get(timeout=control.poll_interval())
+                    except queue.Empty:
+                        continue
+                else:
+                    message = messages.get()
+                if message is None:
+                    # 재연결 중 완료/executed 메시지를 놓쳤을 수 있으므로 큐와 history로 확인
+                    # (큐를 먼저 봐야 그 사이에 끝난 prompt를 history에서 찾을 수 있음)
+                    missed_messages = True
+                    queued = prompt_in_queue(prompt_id)
+                    if prompt_id in get_history(prompt_id):
+                        break
+                    if not queued:
+                        # ComfyUI가 재시작되어 prompt가 사라진 경우 (기다려도 완료 메시지가 오지 않음)
+                        raise Exception(f"ComfyUI 재연결 후 prompt를 큐와 history에서 찾을 수 없습니다: {prompt_id}")
+                    continue
+                if profiler is not None:
+                    profiler.feed(message)
+                if tracker is not None:
+                    event = tracker.feed(message)
+                    if event is not None:
+                        yield event
+                if isinstance(message, dict) and message['type'] == 'execution_start':
+                    started_at = received_at(message)
+                if isinstance(message, dict) and message['type'] == 'executed':
+                    data = message['data']
+                    paths = [video['fullpath'] for video in (data.get('output') or {}).get('gifs', []) if video.get('fullpath')]
+                    if paths:
+                        output_videos[data['node']] = paths
+                        if on_output is not None:
+                            for path in paths:
+                                on_output(data['node'], path)
+                if isinstance(message, dict) and message['type'] == 'executing':
+                    data = message['data']
+                    if data['node'] is None and data['prompt_id'] == prompt_id:
+                        finished_at = received_at(message)
+                        break
+            if finished_at is None:
+                finished_at = time.monotonic()
+            if started_at is not None:
+                prompt_gate.record_execution(ticket, finished_at - started_at)
+                # ComfyUI 큐에서 앞선 prompt를 기다린 시간과 실제 실행 시간을 구분
+                # (실행 시작 메시지가 /prompt 응답보다 먼저 도착할 수 있으므로 0 미만은 0으로)
+                timer.add("queue_wait", max(started_at - queued_at, 0.0))
+                timer.add("execution", finished_at - started_at)
+            else:
+                timer.add("execution", finished_at - queued_at)
+        finally:
+            prompt_gate.release(ticket)
+        if scheduling is not None:
+            scheduling.update(prompt_gate.stats(ticket))
+    finally:
+        for subscribed_id in subscribed:
+            comfy.unsubscribe(subscribed_id)
+
+    # 여기부터는 GPU 슬롯을 반납한 뒤 처리 (다음 prompt 실행과 겹침)
+    if expected_outputs and expected_outputs <= set(output_videos) and not missed_messages:
+        return output_videos
+    output_videos = {}
+    with timer.stage("history"):
+        history = get_history(prompt_id)[prompt_id]
     for node_id in history['outputs']:
         node_output = history['outputs'][node_id]
         videos_output = []
         if 'gifs' in node_output:
             for video in node_output['gifs']:
-                # fullpath를 이용하여 직접 파일을 읽고 base64로 인코딩
-                with open(video['fullpath'], 'rb') as f:
-                    video_data = base64.b64encode(f.read()).decode('utf-8')
-                videos_output.append(video_data)
+                # 파일 내용은 출력 단계(build_video_result)에서 전송 방식에 맞게 읽음
+                videos_output.append(video['fullpath'])
         output_videos[node_id] = videos_output
 
     return output_videos
 
-def load_workflow(workflow_path):
-    with open(workflow_path, 'r') as file:
-        return json.load(file)
+def build_workflow_params(job_input, image_path, end_image_path):
+    """job 입력을 템플릿 바인딩에 넣을 파라미터(dict)로 정규화 (기본값, 16배수 보정, LoRA 펼치기)"""
+    for key in ("prompt", "seed", "cfg", "width", "height"):
+        if key not in job_input:
+            raise Exception(f"필수 입력이 없습니다: {key}")
+
+    steps = job_input.get("steps", 10)
+    params = {
+        "image_path": image_path,
+        "end_image_path": end_image_path,
+        "length": job_input.get("length", 81),
+        "prompt": job_input["prompt"],
+        "seed": job_input["seed"],
+        "cfg": job_input["cfg"],
+        "context_overlap": job_input.get("context_overlap", 48),
+        "steps": steps,
+        "low_steps": int(steps*0.6),
+    }
+    logger.info(f"Steps set to: {steps}, LowSteps set to: {params['low_steps']}")
+
+    # 해상도(폭/높이) 16배수 보정
+    for key in ("width", "height"):
+        original = job_input[key]
+        adjusted = to_nearest_multiple_of_16(original)
+        if adjusted != original:
+            logger.info(f"{key.capitalize()} adjusted to nearest multiple of 16: {original} -> {adjusted}")
+        params[key] = adjusted
+
+    # LoRA 설정 - 최대 4개까지 지원, lora_1부터 시작 (HIGH/LOW 각각 별도 노드)
+    lora_pairs = job_input.get("lora_pairs", [])
+    if len(lora_pairs) > 4:
+        logger.warning(f"LoRA 개수가 {len(lora_pairs)}개입니다. 최대 4개까지만 지원됩니다. 처음 4개만 사용합니다.")
+        lora_pairs = lora_pairs[:4]
+    for i, lora_pair in enumerate(lora_pairs, start=1):
+        if lora_pair.get("high"):
+            params[f"lora_high_{i}"] = lora_pair["high"]
+            params[f"lora_high_weight_{i}"] = lora_pair.get("high_weight", 1.0)
+        if lora_pair.get("low"):
+            params[f"lora_low_{i}"] = lora_pair["low"]
+            params[f"lora_low_weight_{i}"] = lora_pair.get("low_weight", 1.0)
+    params["lora_count"] = len(lora_pairs)
+    return params
+
+def prepare_models(job_input, template_name=None):
+    """job 도착 즉시 LoRA 이름을 인덱스로 검증/보정하고 필요한 모델 파일의 readahead를 시작
+
+    보정된 lora_pairs를 담은 job_input을 반환한다. 찾을 수 없는 LoRA가 있으면 큐에 넣기 전에 실패한다.
+    """
+    if model_index is None or not model_index.ready.wait(MODEL_INDEX_WAIT_SECONDS):
+        return job_input
+    names = set()
+    if template_name is not None:
+        lora_pairs = []
+        for pair in job_input.get("lora_pairs", []):
+            pair = dict(pair)
+            for side in ("high", "low"):
+                name = pair.get(side)
+                if not name:
+                    continue
+                resolved = model_index.resolve("loras", name)
+                if resolved is None:
+                    suggestions = model_index.suggest("loras", name)
+                    hint = f" (비슷한 파일: {', '.join(suggestions)})" if suggestions else ""
+                    raise Exception(f"LoRA 파일을 찾을 수 없습니다: {name}{hint}")
+                if resolved != name:
+                    logger.info(f"LoRA 이름 보정: {name} -> {resolved}")
+                pair[side] = resolved
+                names.add(resolved)
+            lora_pairs.append(pair)
+        if lora_pairs:
+            job_input = {**job_input, "lora_pairs": lora_pairs}
+        template = workflow_registry.get(template_name)
+        if template.graph is not None:
+            names |= model_file_names(template.graph)
+    else:
+        names |= model_file_names(job_input["workflow"])
+    # 입력 준비(다운로드/디코딩)와 디스크 읽기가 겹치도록 비동기로 요청
+    model_index.readahead(names, local_root=model_cache.cache_dir if model_cache is not None else None)
+    return job_input
 
-def handler(job):
+def run_job(job, streaming=False, control=None):
+    """job 하나를 처리하는 제너레이터. 진행 이벤트(스트리밍 모드에서는 비디오 청크 포함)를 yield하고 최종 결과(dict)를 반환
+
+    단계별 소요 시간은 결과의 timings에 담고 메트릭으로도 집계한다.
+    마감 시간을 넘기거나 취소되면 구조화된 에러(error_type: timeout/cancelled)를 반환한다.
+    """
+    timer = StageTimer()
+    try:
+        control = control or JobControl.for_job(job, JOB_TIMEOUT_SECONDS, status_checker)
+        result = yield from _run_job(job, streaming, timer, control)
+    except JobCancelled as e:
+        logger.warning(f"⏰ {e}")
+        metrics.record_job(timer, e.reason)
+        return dict(e.result(), timings=timer.timings())
+    except Exception:
+        metrics.record_job(timer, "error")
+        raise
+    if "error" in result:
+        metrics.record_job(timer, "error")
+        return result
+    result["timings"] = timer.timings()
+    metrics.record_job(timer, "cached" if result.get("cache", {}).get("hit") else "ok")
+    return result
+
+def _run_job(job, streaming, timer, control):
     job_input = job.get("input", {})
 
     logger.info(f"Received job input: {job_input}")
     task_id = f"task_{uuid.uuid4()}"
 
     # 이미지 입력 처리 - 먼저 images[] 배열 체크, 그 다음 단일 이미지
-    image_path = None
+    # 입력 방식을 먼저 결정한 뒤 시작/끝 이미지를 함께 처리 (URL 두 개는 병렬 다운로드)
+    image_spec = None
     
     # 새로운 형식: images[] 배열 (우선순위)
     if "images" in job_input and len(job_input["images"]) > 0:
@@ -205,173 +510,263 @@ def handler(job):
             img_data = img_data.split(",")[1]
         
         # Base64 디코딩하여 저장
-        image_path = process_input(img_data, task_id, img_name, "base64")
+        image_spec = (img_data, img_name, "base64")
         logger.info(f"✅ Processed image from images[] array: {img_name}")
     
     # 기존 형식: image_path, image_url, image_base64
     elif "image_path" in job_input:
-        image_path = process_input(job_input["image_path"], task_id, "input_image.jpg", "path")
+        image_spec = (job_input["image_path"], "input_image.jpg", "path")
     elif "image_url" in job_input:
-        image_path = process_input(job_input["image_url"], task_id, "input_image.jpg", "url")
+        image_spec = (job_input["image_url"], "input_image.jpg", "url")
     elif "image_base64" in job_input:
-        image_path = process_input(job_input["image_base64"], task_id, "input_image.jpg", "base64")
-    else:
-        # 기본값 사용
-        image_path = "/example_image.png"
-        logger.info("기본 이미지 파일을 사용합니다: /example_image.png")
+        image_spec = (job_input["image_base64"], "input_image.jpg", "base64")
+    elif "image_ref" in job_input:
+        image_spec = (job_input["image_ref"], "input_image.jpg", "ref")
 
-    # 엔드 이미지 입력 처리 (end_image_path, end_image_url, end_image_base64 중 하나만 사용)
-    end_image_path_local = None
+    # 엔드 이미지 입력 처리 (end_image_path, end_image_url, end_image_base64, end_image_ref 중 하나만 사용)
+    end_image_spec = None
     if "end_image_path" in job_input:
-        end_image_path_local = process_input(job_input["end_image_path"], task_id, "end_image.jpg", "path")
+        end_image_spec = (job_input["end_image_path"], "end_image.jpg", "path")
     elif "end_image_url" in job_input:
-        end_image_path_local = process_input(job_input["end_image_url"], task_id, "end_image.jpg", "url")
+        end_image_spec = (job_input["end_image_url"], "end_image.jpg", "url")
     elif "end_image_base64" in job_input:
-        end_image_path_local = process_input(job_input["end_image_base64"], task_id, "end_image.jpg", "base64")
+        end_image_spec = (job_input["end_image_base64"], "end_image.jpg", "base64")
+    elif "end_image_ref" in job_input:
+        end_image_spec = (job_input["end_image_ref"], "end_image.jpg", "ref")
+
+    # 입력 저장소에만 올리는 job: ComfyUI를 실행하지 않고 image_ref를 반환 (스윕 전에 이미지를 한 번만 업로드)
+    if job_input.get("upload_only", False):
+        return store_inputs({"image_ref": image_spec, "end_image_ref": end_image_spec})
+
+    # 템플릿 선택 (지정하지 않으면 end_image_*가 있을 때 FLF2V 워크플로 사용)
+    use_custom_workflow = "workflow" in job_input
+    template_name = None if use_custom_workflow else job_input.get("template") or ("wan22_flf2v" if end_image_spec else "wan22")
+    with timer.stage("prepare_models"):
+        job_input = prepare_models(job_input, template_name)
+
+    with timer.stage("process_input"):
+        try:
+            image_path, end_image_path_local = process_inputs([image_spec, end_image_spec], task_id)
+        except ImageRefNotFound as e:
+            logger.warning(f"⚠️ {e}")
+            return {"error": str(e)}
+    control.stage = "process_input"
+    control.check()
+    if image_path is None:
+        # 기본값 사용
+        image_path = "/example_image.png"
+        logger.info("기본 이미지 파일을 사용합니다: /example_image.png")
     
-    # 워크플로우 처리 - 커스텀 workflow가 있으면 사용, 없으면 기본 Wan2.2
-    if "workflow" in job_input:
+    # 워크플로우 처리 - 커스텀 workflow가 있으면 사용, 없으면 등록된 템플릿(기본 Wan2.2)
+    params = None
+    if use_custom_workflow:
         # 커스텀 workflow 사용 (동적 입력)
         logger.info("✅ Using custom workflow from input")
         prompt = job_input["workflow"]
     else:
-        # 기본 Wan2.2 workflow 사용
-        logger.info("Using default Wan2.2 workflow")
-        
-        # LoRA 설정 확인 - 배열로 받아서 처리
-        lora_pairs = job_input.get("lora_pairs", [])
-        
-        # 최대 4개 LoRA까지 지원
-        lora_count = min(len(lora_pairs), 4)
-        if lora_count > len(lora_pairs):
-            logger.warning(f"LoRA 개수가 {len(lora_pairs)}개입니다. 최대 4개까지만 지원됩니다. 처음 4개만 사용합니다.")
-            lora_pairs = lora_pairs[:4]
-        
-        # 워크플로우 파일 선택 (end_image_*가 있으면 FLF2V 워크플로 사용)
-        workflow_file = "/new_Wan22_flf2v_api.json" if end_image_path_local else "/new_Wan22_api.json"
-        logger.info(f"Using {'FLF2V' if end_image_path_local else 'single'} workflow with {lora_count} LoRA pairs")
-        
-        prompt = load_workflow(workflow_file)
-    
-    # 커스텀 workflow가 아닌 경우에만 Wan2.2 파라미터 적용
-    use_custom_workflow = "workflow" in job_input
+        template = workflow_registry.get(template_name)
+        params = build_workflow_params(job_input, image_path, end_image_path_local)
+        logger.info(f"Using workflow template '{template_name}' with {params['lora_count']} LoRA pairs")
+        prompt = template.instantiate(params)
     
     # 커스텀 workflow의 경우 изображение нужно загрузить в ComfyUI
     if use_custom_workflow and image_path:
         logger.info(f"Uploading image to ComfyUI: {image_path}")
-        upload_result = upload_image_to_comfyui(image_path)
-        # ComfyUI возвращает: {"name": "filename.jpg", "subfolder": "", "type": "input"}
-        uploaded_filename = upload_result.get("name", os.path.basename(image_path))
+        with timer.stage("upload"):
+            upload_result = upload_image_to_comfyui(image_path)
+        # ComfyUI возвращает: {"name": "<sha256>.jpg", "subfolder": "staged", "type": "input"}
+        uploaded_filename = staged_reference(upload_result)
         logger.info(f"✅ Image uploaded as: {uploaded_filename}")
-        # Пользователь сам указывает в своем workflow куда нужно подставить
-        # Мы просто загрузили файл, теперь он доступен в ComfyUI
-        
-    if not use_custom_workflow:
-        length = job_input.get("length", 81)
-        steps = job_input.get("steps", 10)
-
-        prompt["244"]["inputs"]["image"] = image_path
-        prompt["541"]["inputs"]["num_frames"] = length
-        prompt["135"]["inputs"]["positive_prompt"] = job_input["prompt"]
-        prompt["220"]["inputs"]["seed"] = job_input["seed"]
-        prompt["540"]["inputs"]["seed"] = job_input["seed"]
-        prompt["540"]["inputs"]["cfg"] = job_input["cfg"]
-        # 해상도(폭/높이) 16배수 보정
-        original_width = job_input["width"]
-        original_height = job_input["height"]
-        adjusted_width = to_nearest_multiple_of_16(original_width)
-        adjusted_height = to_nearest_multiple_of_16(original_height)
-        if adjusted_width != original_width:
-            logger.info(f"Width adjusted to nearest multiple of 16: {original_width} -> {adjusted_width}")
-        if adjusted_height != original_height:
-            logger.info(f"Height adjusted to nearest multiple of 16: {original_height} -> {adjusted_height}")
-        prompt["235"]["inputs"]["value"] = adjusted_width
-        prompt["236"]["inputs"]["value"] = adjusted_height
-        prompt["498"]["inputs"]["context_overlap"] = job_input.get("context_overlap", 48)
-        
-        # step 설정 적용
-        if "834" in prompt:
-            prompt["834"]["inputs"]["steps"] = steps
-            logger.info(f"Steps set to: {steps}")
-            lowsteps = int(steps*0.6)
-            prompt["829"]["inputs"]["step"] = lowsteps
-            logger.info(f"LowSteps set to: {lowsteps}")
-
-        # 엔드 이미지가 있는 경우 617번 노드에 경로 적용 (FLF2V 전용)
-        if end_image_path_local:
-            prompt["617"]["inputs"]["image"] = end_image_path_local
-        
-        # LoRA 설정 적용 - HIGH LoRA는 노드 279, LOW LoRA는 노드 553
-        if lora_count > 0:
-            # HIGH LoRA 노드 (279번)
-            high_lora_node_id = "279"
-            
-            # LOW LoRA 노드 (553번)
-            low_lora_node_id = "553"
-            
-            # 입력받은 LoRA pairs 적용 (lora_1부터 시작)
-            for i, lora_pair in enumerate(lora_pairs):
-                if i < 4:  # 최대 4개까지만
-                    lora_high = lora_pair.get("high")
-                    lora_low = lora_pair.get("low")
-                    lora_high_weight = lora_pair.get("high_weight", 1.0)
-                    lora_low_weight = lora_pair.get("low_weight", 1.0)
-                    
-                    # HIGH LoRA 설정 (노드 279번, lora_1부터 시작)
-                    if lora_high:
-                        prompt[high_lora_node_id]["inputs"][f"lora_{i+1}"] = lora_high
-                        prompt[high_lora_node_id]["inputs"][f"strength_{i+1}"] = lora_high_weight
-                        logger.info(f"LoRA {i+1} HIGH applied to node 279: {lora_high} with weight {lora_high_weight}")
-                    
-                    # LOW LoRA 설정 (노드 553번, lora_1부터 시작)
-                    if lora_low:
-                        prompt[low_lora_node_id]["inputs"][f"lora_{i+1}"] = lora_low
-                        prompt[low_lora_node_id]["inputs"][f"strength_{i+1}"] = lora_low_weight
-                        logger.info(f"LoRA {i+1} LOW applied to node 553: {lora_low} with weight {lora_low_weight}")
-
-    ws_url = f"ws://{server_address}:8188/ws?clientId={client_id}"
-    logger.info(f"Connecting to WebSocket: {ws_url}")
-    
-    # 먼저 HTTP 연결이 가능한지 확인
-    http_url = f"http://{server_address}:8188/"
-    logger.info(f"Checking HTTP connection to: {http_url}")
-    
-    # HTTP 연결 확인 (최대 1분)
-    max_http_attempts = 180
-    for http_attempt in range(max_http_attempts):
+        # 워크플로우는 원래 파일 이름(input_image.jpg 등)을 가리키므로 내용 해시 이름으로 바꿈
+        # (동시에 실행되는 다른 job의 같은 이름 입력과 섞이지 않음)
+        prompt, rewritten = rewrite_image_references(prompt, upload_result["original_name"], uploaded_filename)
+        logger.info(f"워크플로우 이미지 참조 {rewritten}개를 {uploaded_filename}(으)로 변경")
+
+    # 같은 그래프 + 같은 입력 이미지면 GPU를 다시 돌리지 않고 캐시된 결과를 사용
+    # 키는 결과 캐시와 동시 실행 병합(single-flight)에 함께 사용
+    with timer.stage("cache_lookup"):
+        input_paths = [path for path in (image_path, end_image_path_local) if path and os.path.isfile(path)]
+        cache_key = ResultCache.key_for(prompt, input_paths)
+        videos = None
+        if result_cache is not None:
+            if job_input.get("cache_bypass", False):
+                logger.info("Result cache bypassed for this job")
+            else:
+                videos = result_cache.lookup(cache_key)
+    cache_hit = videos is not None
+    coalesced_prompt_id = None
+    scheduling = {}
+    profile = None
+    prefetch = None
+    requested_output_mode = job_input.get("output_mode", OUTPUT_MODE)
+
+    if not cache_hit:
+        call, leader = inflight.begin(cache_key)
+        if leader:
+            try:
+                # 서버 상태는 워커 단위로 기억하므로 웜 워커에서는 프로브 없이 바로 통과
+                with timer.stage("connect"):
+                    comfy.wait_until_ready(alive=cold_start.alive)
+                    comfy.start_dispatcher()
+                tracker = ProgressTracker(None, prompt, preview=job_input.get("preview", False), preview_max_size=PREVIEW_MAX_SIZE)
+                profiler = NodeProfiler(None, prompt, workload_dims(prompt, params))
+                prefetch = OutputPrefetcher(output_executor)
+                # 실행이 끝날 때까지 이 prompt의 모델 파일은 로컬 캐시에서 제거되지 않도록 고정
+                with model_cache.pinned(prompt) if model_cache is not None else contextlib.nullcontext():
+                    videos = yield from get_videos(
+                        prompt, tracker,
+                        on_queued=lambda prompt_id: setattr(call, "prompt_id", prompt_id),
+                        scheduling=scheduling, timer=timer, profiler=profiler,
+                        control=control, shared=lambda: call.followers > 0,
+                        on_output=lambda node_id, path: prefetch_output(
+                            prefetch, path, requested_output_mode, streaming, key_prefix=f"{task_id}/"
+                        ),
+                    )
+                profile = profiler.report()
+                node_profiles.add(profile)
+                slowest = ", ".join(f"{node['class_type']} {node['seconds']:.2f}s" for node in profile["nodes"][:3])
+                logger.info(f"⏱️ 노드 프로파일 ({profile['total_seconds']:.2f}s): {slowest}")
+                if result_cache is not None and any(videos.values()):
+                    with timer.stage("cache_store"):
+                        result_cache.store(cache_key, videos)
+                if model_cache is not None:
+                    # 현재 job의 모델 로드와 대역폭을 다투지 않도록 실행이 끝난 뒤 기록/복사
+                    model_cache.observe(prompt)
+            except BaseException as e:
+                if prefetch is not None:
+                    prefetch.cancel()
+                inflight.fail(call, e)
+                raise
+            inflight.finish(call, videos)
+        else:
+            # 동일한 job이 이미 실행 중이면 GPU를 다시 쓰지 않고 그 prompt의 결과를 공유
+            logger.info(f"🔗 동일한 job이 실행 중입니다. prompt {call.prompt_id}의 결과를 기다립니다.")
+            control.stage = "coalesced_wait"
+            with timer.stage("coalesced_wait"):
+                # 마감/취소되면 이 job만 빠지고 prompt는 리더가 계속 실행 (다른 job이 기다리지 않으면 리더가 중단)
+                while not call.done(control.poll_interval()):
+                    try:
+                        control.check()
+                    except JobCancelled:
+                        inflight.leave(call)
+                        raise
+                videos = call.wait()
+            coalesced_prompt_id = call.prompt_id
+
+    # 이미지가 없는 경우 처리
+    if not any(videos.values()):
+        return {"error": "비디오를를 찾을 수 없습니다."}
+
+    primary_path = next(path for paths in videos.values() for path in paths)
+    output_mode = resolve_output_mode(requested_output_mode, primary_path, object_store, OUTPUT_INLINE_MAX_BYTES, streaming, STREAM_AGGREGATE)
+    logger.info(f"Output mode: {output_mode}")
+    with timer.stage("output"):
+        if output_mode == "chunked":
+            # 비디오를 순서 있는 청크로 스트리밍하고, 마지막 결과에는 재조립 검증 정보만 담음
+            result = yield from stream_video_chunks(primary_path, OUTPUT_CHUNK_SIZE)
+        else:
+            result = build_video_result(videos, output_mode, object_store, key_prefix=f"{task_id}/", prefetch=prefetch)
+    if result_cache is not None:
+        result["cache"] = result_cache.stats(cache_hit, cache_key)
+    if coalesced_prompt_id is not None:
+        result["coalesced_with"] = coalesced_prompt_id
+    if scheduling:
+        result["scheduling"] = scheduling
+    if profile is not None and job_input.get("profile", False):
+        result["profile"] = profile
+    return result
+
+def warmup():
+    """기본 템플릿으로 작은 prompt를 실행해 모델을 미리 로드 (결과는 캐시하지 않고 삭제)"""
+    template = workflow_registry.get("wan22")
+    image_path = "/example_image.png"
+    if not os.path.exists(image_path):
+        from PIL import Image
+        image_path = os.path.join("/tmp", "warmup.png")
+        Image.new("RGB", (256, 256), (128, 128, 128)).save(image_path)
+    params = build_workflow_params(
+        {"prompt": "warmup", "seed": 0, "cfg": 1.0, "width": 256, "height": 256, "length": 5, "steps": 2},
+        image_path, None,
+    )
+    logger.info("🔥 웜업 prompt를 실행합니다.")
+    # 일반 job처럼 마감 시간을 걸어, 멈춘 웜업이 PromptGate 슬롯을 계속 잡고 있지 않도록 함
+    # (마감/실패 시 get_videos가 prompt를 중단하고 슬롯을 반납)
+    events = get_videos(template.instantiate(params), control=JobControl("warmup", WARMUP_TIMEOUT_SECONDS))
+    while True:
         try:
-            import urllib.request
-            response = urllib.request.urlopen(http_url, timeout=5)
-            logger.info(f"HTTP 연결 성공 (시도 {http_attempt+1})")
+            next(events)
+        except StopIteration as stop:
+            videos = stop.value
             break
-        except Exception as e:
-            logger.warning(f"HTTP 연결 실패 (시도 {http_attempt+1}/{max_http_attempts}): {e}")
-            if http_attempt == max_http_attempts - 1:
-                raise Exception("ComfyUI 서버에 연결할 수 없습니다. 서버가 실행 중인지 확인하세요.")
-            time.sleep(1)
-    
-    ws = websocket.WebSocket()
-    # 웹소켓 연결 시도 (최대 3분)
-    max_attempts = int(180/5)  # 3분 (1초에 한 번씩 시도)
-    for attempt in range(max_attempts):
-        import time
+    for path in (path for paths in videos.values() for path in paths):
         try:
-            ws.connect(ws_url)
-            logger.info(f"웹소켓 연결 성공 (시도 {attempt+1})")
-            break
-        except Exception as e:
-            logger.warning(f"웹소켓 연결 실패 (시도 {attempt+1}/{max_attempts}): {e}")
-            if attempt == max_attempts - 1:
-                raise Exception("웹소켓 연결 시간 초과 (3분)")
-            time.sleep(5)
-    videos = get_videos(ws, prompt)
-    ws.close()
+            os.remove(path)
+        except OSError:
+            pass
 
-    # 이미지가 없는 경우 처리
-    for node_id in videos:
-        if videos[node_id]:
-            return {"video": videos[node_id][0]}
-    
-    return {"error": "비디오를를 찾을 수 없습니다."}
+def handler(job, control=None):
+    """일반 모드: 진행 이벤트는 버리고 최종 결과만 반환"""
+    events = run_job(job, control=control)
+    while True:
+        try:
+            next(events)
+        except StopIteration as stop:
+            return stop.value
+
+def stream_handler(job, control=None):
+    """스트리밍 모드: 진행 상황/프리뷰 이벤트를 yield한 뒤 마지막에 최종 결과를 yield"""
+    result = yield from run_job(job, streaming=True, control=control)
+    yield result
 
-runpod.serverless.start({"handler": handler})
\ No newline at end of file
+async def async_handler(job):
+    """동시 처리용: job을 스레드에서 실행해 여러 job의 입력 준비/출력 처리가 GPU 실행과 겹치도록 함"""
+    control = JobControl.for_job(job, JOB_TIMEOUT_SECONDS, status_checker)
+    try:
+        return await asyncio.to_thread(handler, job, control)
+    except asyncio.CancelledError:
+        # RunPod가 job task를 취소해도 스레드는 계속 돌기 때문에 취소를 알려 prompt를 중단시킴
+        control.cancel()
+        raise
+
+async def async_stream_handler(job):
+    control = JobControl.for_job(job, JOB_TIMEOUT_SECONDS, status_checker)
+    events = stream_handler(job, control)
+    done = object()
+    try:
+        while True:
+            item = await asyncio.to_thread(next, events, done)
+            if item is done:
+                break
+            yield item
+    except (asyncio.CancelledError, GeneratorExit):
+        control.cancel()
+        raise
+
+def concurrency_modifier(current_concurrency):
+    """워커가 동시에 받을 job 수 (GPU 실행 수는 PROMPT_SLOTS로 따로 제한)"""
+    return JOB_CONCURRENCY
+
+# 등록된 템플릿이 쓰는 노드 타입이 ComfyUI에 모두 로드됐는지 부팅 시 확인
+required_nodes = {
+    node["class_type"]
+    for template in workflow_registry.templates.values() if template.graph
+    for node in template.graph.values()
+}
+cold_start.mark("handler_loaded")
+if model_index is not None:
+    model_index.start()
+if model_cache is not None:
+    # 부팅 중에는 ComfyUI 시작과 대역폭을 다투지 않도록 준비가 확인된 뒤 미러링 시작
+    model_cache.start(ready=lambda: comfy.wait_until_ready(alive=cold_start.alive))
+cold_start.start(required_nodes, warmup if WARMUP else None)
+
+# 벤치마크 등에서 모듈을 import할 때는 RunPod 워커를 시작하지 않음
+if __name__ == "__main__":
+    if STREAM_OUTPUT:
+        runpod.serverless.start({
+            "handler": async_stream_handler,
+            "return_aggregate_stream": STREAM_AGGREGATE,
+            "concurrency_modifier": concurrency_modifier,
+        })
+    else:
+        runpod.serverless.start({"handler": async_handler, "concurrency_modifier": concurrency_modifier})
\ No newline at end of file
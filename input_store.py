@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 백그라운드 저장을 기다릴 수 있는 최대 이미지 수 (넘으면 저장을 생략해 메모리를 제한)
+_MAX_PENDING_WRITES = 4
+
+# 입력 저장소에 없는 image_ref를 받았을 때 에러 메시지 앞에 붙는 코드 (클라이언트가 인라인 업로드로 재시도하는 기준)
+IMAGE_REF_NOT_FOUND = "IMAGE_REF_NOT_FOUND"
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ImageRefNotFound(Exception):
+    def __init__(self, ref):
+        super().__init__(f"{IMAGE_REF_NOT_FOUND}: 입력 저장소에 이미지가 없습니다 ({ref})")
+        self.ref = ref
+
+
+class InputStore:
+    """네트워크 볼륨 위 콘텐츠 주소 기반 입력 이미지 저장소
+
+    image_base64로 받은 이미지를 <store_dir>/<sha256>에 한 번만 저장하고, 이후 job은
+    image_ref(sha256)만 보내 같은 파일을 사용한다. 볼륨을 공유하는 모든 워커가 같은 저장소를 보며,
+    mtime을 LRU 접근 시각으로 사용해 총 용량이 예산을 넘으면 오래된 이미지부터 삭제한다.
+    """
+
+    def __init__(self, store_dir, max_bytes=2 * 1024 ** 3):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        self._pending_writes = threading.BoundedSemaphore(_MAX_PENDING_WRITES)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="input-store")
+
+    @classmethod
+    def from_env(cls):
+        store_dir = os.getenv('INPUT_STORE_DIR', '/runpod-volume/cache/inputs')
+        if not store_dir:
+            return None
+        try:
+            return cls(store_dir, int(os.getenv('INPUT_STORE_MAX_BYTES', str(2 * 1024 ** 3))))
+        except OSError as e:
+            logger.warning(f"입력 저장소 디렉토리를 만들 수 없어 image_ref 없이 동작합니다: {store_dir} ({e})")
+            return None
+
+    def _path(self, ref):
+        ref = str(ref).lower()
+        if ref.startswith("sha256:"):
+            ref = ref[len("sha256:"):]
+        if not _SHA256_RE.match(ref):
+            raise ValueError(f"image_ref는 sha256 hex digest여야 합니다: {ref}")
+        return ref, os.path.join(self.store_dir, ref)
+
+    def contains(self, ref):
+        return os.path.exists(self._path(ref)[1])
+
+    def put_bytes(self, data):
+        """이미지 바이트를 저장하고 (ref, 경로)를 반환. 이미 있으면 쓰지 않고 접근 시각만 갱신"""
+        ref = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.store_dir, ref)
+        if os.path.exists(path):
+            os.utime(path)
+            logger.info(f"♻️ 입력 저장소 적중: {ref[:12]}")
+            return ref, path
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"💾 입력 저장소에 저장: {ref[:12]} ({len(data)} bytes)")
+        self._evict(keep=path)
+        return ref, path
+
+    def put_bytes_background(self, data):
+        """put_bytes를 백그라운드에서 실행 (job 처리 경로에서 네트워크 볼륨 쓰기를 빼기 위함)
+
+        인라인으로 받은 이미지도 이후 image_ref로 재사용할 수 있게 저장하되, 밀린 쓰기가 많으면 생략한다.
+        """
+        if not self._pending_writes.acquire(blocking=False):
+            logger.debug("입력 저장소 쓰기가 밀려 있어 이번 이미지는 저장하지 않습니다")
+            return
+
+        def write():
+            try:
+                self.put_bytes(data)
+            except Exception as e:
+                logger.warning(f"입력 저장소 저장 실패: {e}")
+            finally:
+                self._pending_writes.release()
+
+        self._executor.submit(write)
+
+    def place(self, ref, output_path):
+        """저장된 이미지를 작업 디렉토리로 하드링크(같은 파일시스템) 또는 복사. 없으면 ImageRefNotFound"""
+        ref, path = self._path(ref)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            raise ImageRefNotFound(ref)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        try:
+            os.link(path, output_path)
+        except FileNotFoundError:
+            # 링크 직전에 제거된 경우
+            raise ImageRefNotFound(ref)
+        except OSError:
+            shutil.copyfile(path, output_path)
+        logger.info(f"♻️ image_ref 입력 사용: {ref[:12]} -> {output_path}")
+        return output_path
+
+    def _evict(self, keep=None):
+        """총 용량이 예산을 넘으면 가장 오래 사용하지 않은 이미지부터 삭제 (keep은 제외)"""
+        with self._evict_lock:
+            blobs = []
+            total = 0
+            with os.scandir(self.store_dir) as it:
+                for item in it:
+                    if item.is_file() and not item.name.endswith(".part"):
+                        stat = item.stat()
+                        blobs.append((stat.st_mtime, stat.st_size, item.path))
+                        total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(blobs):
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                logger.info(f"🧹 입력 저장소 제거: {os.path.basename(path)[:12]} ({size} bytes)")
+                if total <= self.max_bytes:
+                    break
@@ -0,0 +1,161 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 단계별 시간 히스토그램 버킷 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageTimer:
+    """job 하나의 단계별 소요 시간(초)을 모으는 타이머. 같은 단계가 여러 번 실행되면 합산"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def timings(self):
+        timings = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+        timings["total"] = round(time.monotonic() - self.started, 4)
+        return timings
+
+
+class _Histogram:
+    def __init__(self, buckets, window):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        # 분위수(p50/p95/p99)는 최근 window개 표본으로 계산
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return float("nan")
+        ordered = sorted(self.recent)
+        # nearest-rank
+        return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+class Metrics:
+    """단계별 시간 히스토그램과 job 수를 모아 Prometheus 텍스트 형식으로 내보내는 레지스트리"""
+
+    def __init__(self, prefix="comfy_worker", buckets=DEFAULT_BUCKETS, window=1024, path=None):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.window = window
+        self.path = path
+        self.stages = {}
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @classmethod
+    def from_env(cls):
+        metrics = cls(path=os.getenv('METRICS_FILE') or None)
+        port = int(os.getenv('METRICS_PORT', '0'))
+        if port:
+            metrics.serve(port)
+        return metrics
+
+    def record_job(self, timer, status):
+        """job의 단계별 시간과 상태를 집계하고, 파일 출력이 설정돼 있으면 갱신"""
+        timings = timer.timings()
+        with self._lock:
+            for name, seconds in timings.items():
+                histogram = self.stages.get(name)
+                if histogram is None:
+                    histogram = self.stages[name] = _Histogram(self.buckets, self.window)
+                histogram.observe(seconds)
+            self.jobs[status] = self.jobs.get(status, 0) + 1
+        if self.path:
+            self.write(self.path)
+
+    def render(self):
+        """Prometheus 텍스트 노출 형식"""
+        stage_name = f"{self.prefix}_stage_duration_seconds"
+        recent_name = f"{self.prefix}_stage_duration_recent_seconds"
+        jobs_name = f"{self.prefix}_jobs_total"
+        lines = [
+            f"# HELP {stage_name} Time spent in each job stage.",
+            f"# TYPE {stage_name} histogram",
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            for name, histogram in stages:
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{stage_name}_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'{stage_name}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{stage_name}_sum{{stage="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{stage_name}_count{{stage="{name}"}} {histogram.count}')
+            lines.append(f"# HELP {recent_name} Quantiles of recent job stage durations.")
+            lines.append(f"# TYPE {recent_name} summary")
+            for name, histogram in stages:
+                for q in QUANTILES:
+                    lines.append(f'{recent_name}{{stage="{name}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+                lines.append(f'{recent_name}_sum{{stage="{name}"}} {sum(histogram.recent):.6f}')
+                lines.append(f'{recent_name}_count{{stage="{name}"}} {len(histogram.recent)}')
+            lines.append(f"# HELP {jobs_name} Jobs handled by status.")
+            lines.append(f"# TYPE {jobs_name} counter")
+            for status, count in sorted(self.jobs.items()):
+                lines.append(f'{jobs_name}{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """node_exporter textfile collector 등에서 읽을 수 있도록 파일을 원자적으로 교체"""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"메트릭 파일 저장 실패: {path} ({e})")
+
+    def serve(self, port):
+        """/metrics를 제공하는 HTTP 서버를 백그라운드 스레드로 시작"""
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"📊 메트릭 서버 시작: :{port}/metrics")
@@ -0,0 +1,389 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from model_paths import load_model_paths, model_file_names
+
+logger = logging.getLogger(__name__)
+
+# 한 파일을 나눠 병렬로 복사하는 단위
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+_IO_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class ModelCache:
+    """네트워크 볼륨의 자주 쓰는 모델/LoRA 파일을 로컬 디스크(NVMe)에 미러링하는 캐시
+
+    - ComfyUI에는 로컬 캐시 디렉토리를 각 카테고리의 우선 경로로 등록한다 (write_config)
+    - job에서 본 모델 이름으로 사용 빈도를 학습하고(볼륨의 hotness 파일에 저장),
+      새 워커는 부팅 시 자주 쓰인 파일부터 미리 복사한다
+    - 로컬 복사본은 원본과 크기+mtime이 같아야 유효하며, verify="sha256"이면 청크 해시로도 검증한다
+    - 총 용량이 max_bytes를 넘거나 디스크 여유 공간이 min_free_bytes보다 적어지면 LRU로 삭제한다
+      (실행 중인 prompt가 참조하는 파일은 삭제하지 않음)
+    """
+
+    def __init__(self, cache_dir, sources, max_bytes=50 * 1024 ** 3, min_free_bytes=2 * 1024 ** 3,
+                 hotness_path=None, verify="size_mtime", workers=8, chunk_size=COPY_CHUNK_SIZE):
+        self.cache_dir = cache_dir
+        self.sources = sources
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.hotness_path = hotness_path
+        self.verify = verify
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-cache")
+        self.local_hits = 0
+        self.remote_hits = 0
+        self._index_path = os.path.join(cache_dir, ".index.json")
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._in_use = Counter()
+        self._thread = None
+        for category in sources:
+            os.makedirs(os.path.join(cache_dir, category), exist_ok=True)
+        self.index = self._load_index()
+
+    @classmethod
+    def from_env(cls):
+        cache_dir = os.getenv('MODEL_CACHE_DIR', '')
+        if not cache_dir:
+            return None
+        config_path = os.getenv('MODEL_PATHS_CONFIG', '/app/extra_model_paths.yaml')
+        categories = [c.strip() for c in os.getenv('MODEL_CACHE_CATEGORIES', 'diffusion_models,loras').split(',') if c.strip()]
+        try:
+            sources = load_model_paths(config_path, categories)
+            return cls(
+                cache_dir,
+                sources,
+                max_bytes=int(os.getenv('MODEL_CACHE_MAX_BYTES', str(50 * 1024 ** 3))),
+                min_free_bytes=int(os.getenv('MODEL_CACHE_MIN_FREE_BYTES', str(2 * 1024 ** 3))),
+                hotness_path=os.getenv('MODEL_CACHE_HOTNESS_FILE', '/runpod-volume/cache/model_hotness.json') or None,
+                verify=os.getenv('MODEL_CACHE_VERIFY', 'size_mtime'),
+                workers=int(os.getenv('MODEL_CACHE_WORKERS', '8')),
+            )
+        except OSError as e:
+            logger.warning(f"모델 로컬 캐시를 사용할 수 없어 볼륨에서 직접 로드합니다: {cache_dir} ({e})")
+            return None
+
+    def write_config(self, path=None):
+        """로컬 캐시 디렉토리를 우선 경로로 등록하는 extra_model_paths 설정 파일을 쓰고 경로를 반환
+
+        ComfyUI는 나중에 읽은 is_default 경로를 앞에 두므로 기존 설정 뒤에 넘겨야 한다.
+        """
+        path = path or os.path.join(self.cache_dir, "extra_model_paths.yaml")
+        lines = ["model_cache:", f"    base_path: {self.cache_dir}", "    is_default: true"]
+        lines += [f"    {category}: {category}/" for category in self.sources]
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    # ------------------------------------------------------------------
+    # 인덱스 / 사용 빈도
+    # ------------------------------------------------------------------
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # 중단된 복사(.part)와 파일이 사라진 항목 정리
+        for category in self.sources:
+            for root, _, files in os.walk(os.path.join(self.cache_dir, category)):
+                for name in files:
+                    if name.endswith(".part"):
+                        os.remove(os.path.join(root, name))
+        return {key: entry for key, entry in index.items() if os.path.exists(os.path.join(self.cache_dir, key))}
+
+    def _save_index(self):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _load_hotness(self):
+        try:
+            with open(self.hotness_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _record_hotness(self, keys):
+        """여러 워커가 공유하는 사용 빈도 파일에 이번 job의 모델들을 반영
+
+        다른 워커의 갱신을 덮어쓰지 않도록 읽기-수정-쓰기 전체를 옆의 .lock 파일로 flock한다
+        (데이터 파일은 os.replace로 바뀌므로 그 자체에는 잠금을 걸 수 없음).
+        """
+        if not self.hotness_path:
+            return
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.hotness_path), exist_ok=True)
+                with open(f"{self.hotness_path}.lock", 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    hotness = self._load_hotness()
+                    now = time.time()
+                    for key in keys:
+                        entry = hotness.setdefault(key, {"hits": 0})
+                        entry["hits"] += 1
+                        entry["last_seen"] = now
+                    tmp_path = f"{self.hotness_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w') as f:
+                        json.dump(hotness, f)
+                    os.replace(tmp_path, self.hotness_path)
+            except OSError as e:
+                logger.warning(f"모델 사용 빈도 파일 저장 실패: {e}")
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def resolve(self, name):
+        """모델 이름(카테고리 기준 상대 경로)을 볼륨의 원본 파일로 찾아 (key, source_path) 반환"""
+        for category, dirs in self.sources.items():
+            for directory in dirs:
+                if directory.startswith(self.cache_dir):
+                    continue
+                source = os.path.join(directory, name)
+                if os.path.isfile(source):
+                    return f"{category}/{name}", source
+        return None, None
+
+    def _valid(self, key, source_stat):
+        entry = self.index.get(key)
+        if entry is None or entry["size"] != source_stat.st_size or entry["mtime"] != source_stat.st_mtime:
+            return False
+        try:
+            return os.path.getsize(os.path.join(self.cache_dir, key)) == source_stat.st_size
+        except OSError:
+            return False
+
+    @contextmanager
+    def pinned(self, prompt):
+        """prompt가 큐에 들어가 실행을 마칠 때까지 prompt가 참조하는 캐시 파일을 삭제 대상에서 제외
+
+        ComfyUI는 실행 시점에 경로를 정하고 나중에 파일을 열기 때문에, 그 사이에 로컬 복사본이 지워지면 로드가 실패한다.
+        """
+        keys = Counter(key for key, _ in map(self.resolve, model_file_names(prompt)) if key is not None)
+        with self._lock:
+            self._in_use += keys
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use -= keys
+
+    def observe(self, prompt):
+        """job의 prompt에서 모델 이름을 모아 사용 빈도를 기록하고, 로컬에 없는 파일은 백그라운드로 복사"""
+        keys = []
+        for name in model_file_names(prompt):
+            key, source = self.resolve(name)
+            if key is None:
+                continue
+            keys.append(key)
+            with self._lock:
+                cached = self._valid(key, os.stat(source))
+                if cached:
+                    self.index[key]["last_used"] = time.time()
+                    self.local_hits += 1
+                else:
+                    self.remote_hits += 1
+            if not cached:
+                self.enqueue(key, source)
+        if keys:
+            self._record_hotness(keys)
+
+    # ------------------------------------------------------------------
+    # 미러링
+    # ------------------------------------------------------------------
+    def start(self, ready=None):
+        """복사 스레드를 시작하고 자주 쓰인 파일부터 예산 안에서 미리 복사하도록 예약
+
+        ready가 주어지면 복사 스레드는 ready()가 반환된 뒤(ComfyUI 준비 완료)에 복사를 시작해
+        부팅 중 ComfyUI 시작/모델 로드와 디스크·볼륨 대역폭을 다투지 않는다.
+        """
+        self._thread = threading.Thread(target=self._worker, args=(ready,), name="model-cache-mirror", daemon=True)
+        self._thread.start()
+        hotness = self._load_hotness()
+        planned = 0
+        for key in sorted(hotness, key=lambda k: (hotness[k].get("hits", 0), hotness[k].get("last_seen", 0)), reverse=True):
+            category, _, name = key.partition("/")
+            for directory in self.sources.get(category, ()):
+                source = os.path.join(directory, name)
+                if directory.startswith(self.cache_dir) or not os.path.isfile(source):
+                    continue
+                size = os.path.getsize(source)
+                if planned + size > self.max_bytes:
+                    break
+                planned += size
+                self.enqueue(key, source)
+                break
+
+    def enqueue(self, key, source):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put((key, source))
+
+    def _worker(self, ready):
+        if ready is not None:
+            try:
+                ready()
+            except Exception as e:
+                logger.warning(f"⚠️ ComfyUI가 준비되지 않아 모델 로컬 캐시 복사를 시작하지 않습니다: {e}")
+                return
+        while True:
+            key, source = self._queue.get()
+            try:
+                self.mirror(key, source)
+            except Exception as e:
+                logger.warning(f"⚠️ 모델 로컬 캐시 복사 실패: {key} ({e})")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def mirror(self, key, source):
+        """원본을 청크 단위로 병렬 복사하고 검증한 뒤 원자적으로 캐시에 등록"""
+        source_stat = os.stat(source)
+        size = source_stat.st_size
+        with self._lock:
+            if self._valid(key, source_stat):
+                return
+        if size > self.max_bytes:
+            logger.info(f"모델 파일이 캐시 예산보다 커서 복사하지 않습니다: {key} ({size} bytes)")
+            return
+        if not self._make_room(size, keep=key):
+            logger.info(f"로컬 디스크 공간이 부족해 복사하지 않습니다: {key} ({size} bytes)")
+            return
+
+        target = os.path.join(self.cache_dir, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        part_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.part")
+        started = time.monotonic()
+        try:
+            digest = self._copy_chunks(source, part_path, size)
+            if os.stat(source).st_mtime != source_stat.st_mtime:
+                raise OSError("복사 중에 원본 파일이 변경되었습니다.")
+            if digest is not None and self._hash_chunks(part_path, size) != digest:
+                raise OSError("복사본의 해시가 원본과 다릅니다.")
+            # 크기+mtime 검증을 위해 원본 mtime을 유지
+            os.utime(part_path, (source_stat.st_atime, source_stat.st_mtime))
+            os.replace(part_path, target)
+        except BaseException:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            raise
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.index[key] = {
+                "size": size,
+                "mtime": source_stat.st_mtime,
+                "sha256": digest,
+                "last_used": time.time(),
+            }
+            self._save_index()
+        logger.info(f"💾 모델 로컬 캐시 복사 완료: {key} ({size / 1024 ** 2:.0f} MiB, {elapsed:.1f}s, {size / 1024 ** 2 / max(elapsed, 1e-6):.0f} MiB/s)")
+
+    def _copy_chunks(self, source, target, size):
+        """pread/pwrite로 청크들을 병렬 복사. sha256 검증 모드면 청크 해시들의 해시를 반환"""
+        hashing = self.verify == "sha256"
+        src = os.open(source, os.O_RDONLY)
+        dst = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(dst, size)
+
+            def copy(offset):
+                length = min(self.chunk_size, size - offset)
+                chunk_hash = hashlib.sha256() if hashing else None
+                done = 0
+                while done < length:
+                    data = os.pread(src, min(_IO_BLOCK_SIZE, length - done), offset + done)
+                    if not data:
+                        raise OSError("복사 중에 원본 파일이 줄어들었습니다.")
+                    written = 0
+                    while written < len(data):
+                        written += os.pwrite(dst, data[written:], offset + done + written)
+                    if chunk_hash is not None:
+                        chunk_hash.update(data)
+                    done += len(data)
+                return chunk_hash.digest() if chunk_hash is not None else None
+
+            digests = list(self.executor.map(copy, range(0, size, self.chunk_size)))
+            os.fsync(dst)
+        finally:
+            os.close(src)
+            os.close(dst)
+        return hashlib.sha256(b"".join(digests)).hexdigest() if hashing else None
+
+    def _hash_chunks(self, path, size):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            def digest(offset):
+                length = min(self.chunk_size, size - offset)
+                chunk_hash = hashlib.sha256()
+                done = 0
+                while done < length:
+                    data = os.pread(fd, min(_IO_BLOCK_SIZE, length - done), offset + done)
+                    if not data:
+                        break
+                    chunk_hash.update(data)
+                    done += len(data)
+                return chunk_hash.digest()
+
+            digests = list(self.executor.map(digest, range(0, size, self.chunk_size)))
+        finally:
+            os.close(fd)
+        return hashlib.sha256(b"".join(digests)).hexdigest()
+
+    def _make_room(self, size, keep=None):
+        """size 바이트를 넣을 수 있도록 가장 오래 사용하지 않은 파일부터 삭제. 공간을 못 만들면 False"""
+        with self._lock:
+            entries = sorted(self.index.items(), key=lambda item: item[1].get("last_used", 0))
+            total = sum(entry["size"] for entry in self.index.values())
+            evicted = False
+            for key, entry in entries:
+                free = shutil.disk_usage(self.cache_dir).free
+                if total + size <= self.max_bytes and free - size >= self.min_free_bytes:
+                    break
+                if key == keep or self._in_use[key]:
+                    continue
+                # ComfyUI가 이미 메모리에 올린 파일이어도 삭제는 안전 (이후에는 볼륨 원본을 사용)
+                try:
+                    os.remove(os.path.join(self.cache_dir, key))
+                except OSError:
+                    pass
+                del self.index[key]
+                total -= entry["size"]
+                evicted = True
+                logger.info(f"🧹 모델 로컬 캐시 제거: {key} ({entry['size']} bytes)")
+            if evicted:
+                self._save_index()
+            free = shutil.disk_usage(self.cache_dir).free
+            return total + size <= self.max_bytes and free - size >= self.min_free_bytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self.index),
+                "bytes": sum(entry["size"] for entry in self.index.values()),
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+            }
+
+
+if __name__ == "__main__":
+    # entrypoint.sh에서 ComfyUI 시작 전에 호출: 로컬 캐시 경로 설정 파일을 만들고 경로를 출력
+    cache = ModelCache.from_env()
+    if cache is not None:
+        print(cache.write_config(os.getenv('MODEL_CACHE_CONFIG') or None))
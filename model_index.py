@@ -0,0 +1,239 @@
+import difflib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_paths import MODEL_FILE_EXTENSIONS, load_model_paths
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_extension(name):
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in MODEL_FILE_EXTENSIONS else name
+
+
+class ModelIndex:
+    """extra_model_paths.yaml의 모델 디렉토리에 있는 파일 목록(이름, 크기, mtime) 인덱스
+
+    시작 시 백그라운드로 한 번 만들고 주기적으로 갱신한다. 갱신할 때 mtime이 바뀌지 않은
+    디렉토리는 다시 나열하지 않으므로 네트워크 볼륨에서도 디렉토리 stat 비용만 든다.
+    """
+
+    def __init__(self, paths, refresh_interval=30.0, readahead_workers=4, readahead_window=300.0):
+        self.paths = paths
+        self.refresh_interval = refresh_interval
+        self.readahead_window = readahead_window
+        self.files = {}
+        self.ready = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=readahead_workers, thread_name_prefix="readahead")
+        self._dirs = {}
+        self._lower = {}
+        self._stems = {}
+        self._basenames = {}
+        self._basestems = {}
+        self._refreshed_at = 0.0
+        # 마지막으로 readahead를 요청한 모델 파일 세트와 시각 (같은 세트가 이어지면 readahead_window 동안 생략)
+        self._readahead_set = None
+        self._readahead_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        config_path = os.getenv('MODEL_PATHS_CONFIG', '/app/extra_model_paths.yaml')
+        try:
+            paths = load_model_paths(config_path)
+        except OSError as e:
+            logger.warning(f"모델 경로 설정을 읽을 수 없어 모델 인덱스 없이 동작합니다: {config_path} ({e})")
+            return None
+        return cls(
+            paths,
+            refresh_interval=float(os.getenv('MODEL_INDEX_REFRESH_SECONDS', '30')),
+            readahead_window=float(os.getenv('MODEL_READAHEAD_WINDOW_SECONDS', '300')),
+        )
+
+    def start(self):
+        threading.Thread(target=self._run, name="model-index", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"모델 인덱스 갱신 실패: {e}")
+            self.ready.set()
+            time.sleep(self.refresh_interval)
+
+    # ------------------------------------------------------------------
+    # 스캔
+    # ------------------------------------------------------------------
+    def _scan_dir(self, directory):
+        """디렉토리의 (mtime, 모델 파일 {이름: (크기, mtime)}, 하위 디렉토리 목록, inode). mtime이 같으면 이전 결과 재사용"""
+        stat = os.stat(directory)
+        mtime, inode = stat.st_mtime_ns, (stat.st_dev, stat.st_ino)
+        cached = self._dirs.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached
+        files, subdirs = {}, []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(MODEL_FILE_EXTENSIONS):
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, stat.st_mtime)
+                except OSError:
+                    continue
+        result = (mtime, files, subdirs, inode)
+        self._dirs[directory] = result
+        return result
+
+    def refresh(self, min_interval=0.0):
+        """디렉토리를 다시 훑어 인덱스를 갱신 (min_interval 안에 이미 갱신했으면 건너뜀)"""
+        with self._refresh_lock:
+            if time.monotonic() - self._refreshed_at < min_interval:
+                return
+            started = time.monotonic()
+            files = {}
+            seen = set()
+            for category, dirs in self.paths.items():
+                entries = {}
+                visited = set()
+                for base in dirs:
+                    pending = [""]
+                    while pending:
+                        rel_dir = pending.pop()
+                        directory = os.path.join(base, rel_dir) if rel_dir else base
+                        try:
+                            _, dir_files, subdirs, inode = self._scan_dir(directory)
+                        except OSError:
+                            continue
+                        # 심볼릭 링크 순환 방지
+                        if inode in visited:
+                            continue
+                        visited.add(inode)
+                        seen.add(directory)
+                        for name, (size, mtime) in dir_files.items():
+                            rel = f"{rel_dir}/{name}" if rel_dir else name
+                            # ComfyUI처럼 먼저 나오는 디렉토리의 파일이 우선
+                            entries.setdefault(rel, (os.path.join(directory, name), size, mtime))
+                        pending.extend(f"{rel_dir}/{sub}" if rel_dir else sub for sub in subdirs)
+                files[category] = entries
+
+            lower, stems, basenames, basestems = {}, {}, {}, {}
+            for category, entries in files.items():
+                lower[category] = {rel.lower(): rel for rel in entries}
+                stems[category], basenames[category], basestems[category] = {}, {}, {}
+                for rel in entries:
+                    basename = os.path.basename(rel)
+                    stems[category].setdefault(_strip_extension(rel).lower(), []).append(rel)
+                    basenames[category].setdefault(basename.lower(), []).append(rel)
+                    basestems[category].setdefault(_strip_extension(basename).lower(), []).append(rel)
+            with self._lock:
+                self.files = files
+                self._lower, self._stems, self._basenames, self._basestems = lower, stems, basenames, basestems
+                self._dirs = {d: v for d, v in self._dirs.items() if d in seen}
+            self._refreshed_at = time.monotonic()
+        count = sum(len(entries) for entries in files.values())
+        logger.debug(f"모델 인덱스 갱신: {count} files ({time.monotonic() - started:.2f}s)")
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def _match(self, category, name):
+        name = name.replace("\\", "/")
+        with self._lock:
+            entries = self.files.get(category, {})
+            if name in entries:
+                return name
+            rel = self._lower.get(category, {}).get(name.lower())
+            if rel is not None:
+                return rel
+            # 확장자 생략/차이, 하위 폴더 생략은 후보가 하나일 때만 허용
+            for lookup, key in (
+                (self._stems, _strip_extension(name).lower()),
+                (self._basenames, os.path.basename(name).lower()),
+                (self._basestems, _strip_extension(os.path.basename(name)).lower()),
+            ):
+                candidates = lookup.get(category, {}).get(key, [])
+                if len(candidates) == 1:
+                    return candidates[0]
+        return None
+
+    def resolve(self, category, name):
+        """이름을 ComfyUI에 넘길 실제 상대 경로로 해석 (대소문자/확장자/하위 폴더 차이 허용). 없으면 None"""
+        rel = self._match(category, name)
+        if rel is None:
+            # 인덱스 갱신 이후에 올라온 파일일 수 있으므로 한 번 다시 훑어 봄
+            self.refresh(min_interval=2.0)
+            rel = self._match(category, name)
+        return rel
+
+    def suggest(self, category, name, limit=3):
+        """오류 메시지용으로 이름이 비슷한 파일을 찾음 (확장자는 비교에서 제외)"""
+        with self._lock:
+            stems = self._stems.get(category, {})
+        matches = difflib.get_close_matches(_strip_extension(name).lower(), list(stems), n=limit, cutoff=0.6)
+        return [rel for match in matches for rel in stems[match]][:limit]
+
+    def locate(self, name):
+        """카테고리와 무관하게 이름이 가리키는 (카테고리, 상대 경로, 파일 경로)를 반환"""
+        for category in self.paths:
+            rel = self._match(category, name)
+            if rel is not None:
+                return category, rel, self.files[category][rel][0]
+        return None
+
+    # ------------------------------------------------------------------
+    # readahead
+    # ------------------------------------------------------------------
+    def readahead(self, names, local_root=None):
+        """모델 파일들을 페이지 캐시로 미리 읽도록 커널에 요청 (POSIX_FADV_WILLNEED, 비동기)
+
+        local_root에 같은 파일의 로컬 복사본이 있으면 ComfyUI가 그것을 읽으므로 그쪽을 대상으로 한다.
+        직전 요청과 모델 파일 세트가 같고 readahead_window초 안에 요청했으면 생략한다. 같은 세트라도
+        시간이 지나면 페이지 캐시에서 밀려났을 수 있으므로(ComfyUI가 모델을 내렸다 다시 읽는 경우) 다시 요청한다.
+        """
+        if not hasattr(os, "posix_fadvise"):
+            return
+        paths = []
+        for name in names:
+            located = self.locate(name)
+            if located is None:
+                continue
+            category, rel, path = located
+            if local_root:
+                local_path = os.path.join(local_root, category, rel)
+                if os.path.exists(local_path):
+                    path = local_path
+            paths.append(path)
+        model_set = frozenset(paths)
+        now = time.monotonic()
+        with self._lock:
+            if model_set == self._readahead_set and now - self._readahead_at < self.readahead_window:
+                logger.debug("최근에 같은 모델 세트를 readahead해서 생략합니다")
+                return
+            self._readahead_set = model_set
+            self._readahead_at = now
+        for path in paths:
+            self.executor.submit(self._readahead, path)
+
+    @staticmethod
+    def _readahead(path):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            logger.debug(f"readahead 요청: {path}")
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,43 @@
+import os
+
+import yaml
+
+# ComfyUI가 모델 파일로 인식하는 확장자 (folder_paths.supported_pt_extensions와 동일)
+MODEL_FILE_EXTENSIONS = (".ckpt", ".pt", ".pt2", ".bin", ".pth", ".safetensors", ".pkl", ".sft", ".gguf")
+
+
+def load_model_paths(config_path, categories=None):
+    """extra_model_paths.yaml을 읽어 {카테고리: [절대 경로, ...]}를 반환 (ComfyUI와 같은 base_path 규칙)"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    paths = {}
+    for section in config.values():
+        if not isinstance(section, dict):
+            continue
+        base_path = section.get("base_path")
+        if base_path:
+            base_path = os.path.expandvars(os.path.expanduser(base_path))
+        for category, value in section.items():
+            if category in ("base_path", "is_default") or not isinstance(value, str):
+                continue
+            if categories is not None and category not in categories:
+                continue
+            for line in value.split("\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                path = os.path.normpath(os.path.join(base_path, line) if base_path else line)
+                category_paths = paths.setdefault(category, [])
+                if path not in category_paths:
+                    category_paths.append(path)
+    return paths
+
+
+def model_file_names(prompt):
+    """prompt의 노드 입력 중 모델/LoRA 파일 이름으로 보이는 값들을 반환"""
+    names = set()
+    for node in prompt.values():
+        for value in (node.get("inputs") or {}).values():
+            if isinstance(value, str) and value.lower().endswith(MODEL_FILE_EXTENSIONS):
+                names.add(value)
+    return names
@@ -0,0 +1,246 @@
+import base64
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# 768KiB (3의 배수) -> base64 청크 하나가 1MiB
+DEFAULT_CHUNK_SIZE = 768 * 1024
+
+
+def file_sha256(path, chunk_size=HASH_CHUNK_SIZE):
+    """파일을 청크 단위로 읽어 sha256 hex digest를 계산"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _aligned_chunk_size(chunk_size):
+    # 청크 크기를 3의 배수로 맞춰야 마지막 청크에만 패딩이 붙어 청크별로 독립 디코딩이 가능
+    return max(3, chunk_size - chunk_size % 3)
+
+
+def iter_file_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """파일을 고정 크기 청크(bytes)로 순서대로 yield. 가능하면 mmap으로 읽음"""
+    with open(path, 'rb') as f:
+        try:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # 빈 파일이거나 mmap을 지원하지 않는 파일시스템이면 일반 read로 처리
+            yield from iter(lambda: f.read(chunk_size), b'')
+            return
+        with view:
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size]
+
+
+def iter_base64_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """파일을 고정 크기 청크 단위로 base64 인코딩해 순서대로 yield (각 청크는 독립적으로 디코딩 가능)"""
+    for chunk in iter_file_chunks(path, _aligned_chunk_size(chunk_size)):
+        yield base64.b64encode(chunk).decode('ascii')
+
+
+def encode_file_base64(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    # 파일 전체를 bytes로 읽지 않고 청크 단위로 인코딩해 피크 메모리를 줄임
+    return ''.join(iter_base64_chunks(path, chunk_size))
+
+
+def stream_video_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """비디오를 순서 있는 base64 청크 이벤트로 yield한 뒤, 재조립 검증용 요약(dict)을 반환"""
+    chunk_size = _aligned_chunk_size(chunk_size)
+    size = os.path.getsize(path)
+    total = max(1, -(-size // chunk_size))
+    digest = hashlib.sha256()
+    if size == 0:
+        yield {"type": "video_chunk", "index": 0, "total": total, "data": ""}
+    for index, chunk in enumerate(iter_file_chunks(path, chunk_size)):
+        digest.update(chunk)
+        yield {"type": "video_chunk", "index": index, "total": total, "data": base64.b64encode(chunk).decode('ascii')}
+    return {"video_chunks": total, "video_size": size, "video_sha256": digest.hexdigest()}
+
+
+class ObjectStore:
+    """S3 호환 버킷(AWS S3, MinIO, R2 등)에 출력 파일을 스트리밍 멀티파트 업로드"""
+
+    def __init__(
+        self,
+        bucket,
+        endpoint_url=None,
+        region=None,
+        access_key=None,
+        secret_key=None,
+        prefix="",
+        public_url=None,
+        url_expires=3600,
+        part_size=8 * 1024 * 1024,
+        max_concurrency=4,
+    ):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self.url_expires = url_expires
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+        # part_size 단위로 파일에서 직접 읽어 올리므로 메모리 사용량은 part_size * max_concurrency로 제한됨
+        self.transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=max_concurrency,
+        )
+
+    @classmethod
+    def from_env(cls):
+        """S3_BUCKET이 설정되어 있으면 환경 변수로 ObjectStore를 생성, 아니면 None"""
+        bucket = os.getenv('S3_BUCKET')
+        if not bucket:
+            return None
+        return cls(
+            bucket,
+            endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+            region=os.getenv('S3_REGION') or None,
+            access_key=os.getenv('S3_ACCESS_KEY_ID') or None,
+            secret_key=os.getenv('S3_SECRET_ACCESS_KEY') or None,
+            prefix=os.getenv('S3_PREFIX', 'outputs/'),
+            public_url=os.getenv('S3_PUBLIC_URL') or None,
+            url_expires=int(os.getenv('S3_URL_EXPIRES', '3600')),
+            part_size=int(os.getenv('S3_PART_SIZE', str(8 * 1024 * 1024))),
+            max_concurrency=int(os.getenv('S3_MAX_CONCURRENCY', '4')),
+        )
+
+    def url_for(self, key):
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=self.url_expires,
+        )
+
+    def upload_file(self, path, key_prefix=""):
+        """파일을 업로드하고 url, size, sha256 등 메타데이터를 반환"""
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path)
+        key = f"{self.prefix}{key_prefix}{os.path.basename(path)}"
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.client.upload_file(
+            path,
+            self.bucket,
+            key,
+            ExtraArgs={'ContentType': content_type, 'Metadata': {'sha256': sha256}},
+            Config=self.transfer_config,
+        )
+        logger.info(f"✅ 출력 파일 업로드 완료: s3://{self.bucket}/{key} ({size} bytes)")
+        return {
+            "url": self.url_for(key),
+            "bucket": self.bucket,
+            "key": key,
+            "size": size,
+            "sha256": sha256,
+        }
+
+
+def resolve_output_mode(requested, primary_path, store, inline_max_bytes, streaming=False, aggregate=False):
+    """요청된 output_mode(auto/inline/chunked/s3)를 실제 전송 방식(inline/chunked/s3)으로 결정
+
+    aggregate는 RunPod가 스트리밍 출력을 /status용으로 모아 두는지 여부(return_aggregate_stream)이며,
+    이 경우 청크도 워커 메모리에 전부 쌓이므로 auto는 청크 전송을 고르지 않는다.
+    """
+    if requested == "chunked":
+        if not streaming:
+            raise Exception("output_mode가 chunked이면 STREAM_OUTPUT=true 워커가 필요합니다.")
+        return "chunked"
+    if requested == "inline":
+        return "inline"
+    if requested == "s3":
+        if store is None:
+            raise Exception("output_mode가 s3이지만 S3_BUCKET이 설정되어 있지 않습니다.")
+        return "s3"
+    if requested != "auto":
+        raise Exception(f"지원하지 않는 output_mode: {requested}")
+    size = os.path.getsize(primary_path)
+    if store is not None and size > inline_max_bytes:
+        return "s3"
+    # 스트리밍 워커에서는 한 덩어리 base64 대신 청크로 내보내 메모리를 일정하게 유지
+    if streaming and not aggregate and size > DEFAULT_CHUNK_SIZE:
+        return "chunked"
+    return "inline"
+
+
+class OutputPrefetcher:
+    """출력 노드의 executed 이벤트로 파일이 생기는 즉시 전송 작업(base64 인코딩/S3 업로드)을 백그라운드에서 시작
+
+    작업은 (종류, 경로)별로 한 번만 실행되며, build_video_result가 같은 작업을 요청하면 그 결과를 기다려 재사용한다.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        # 첫 출력 파일로 정한 전송 방식과 그 파일 (handler가 채움)
+        self.mode = None
+        self.primary_path = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, path, fn, *args, **kwargs):
+        with self._lock:
+            future = self._futures.get((kind, path))
+            if future is None:
+                future = self._futures[(kind, path)] = self.executor.submit(fn, *args, **kwargs)
+        return future
+
+    def get(self, kind, path, fn, *args, **kwargs):
+        return self.submit(kind, path, fn, *args, **kwargs).result()
+
+    def cancel(self):
+        """아직 시작하지 않은 작업을 취소 (job이 실패/중단된 경우)"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+
+
+def build_video_result(videos, mode, store=None, key_prefix="", max_workers=4, prefetch=None):
+    """노드별 비디오 경로({node_id: [path, ...]})로 handler 응답을 생성. 비디오가 없으면 None
+
+    prefetch(OutputPrefetcher)를 넘기면 실행 중에 미리 시작한 인코딩/업로드 결과를 재사용한다.
+    """
+    entries = [(node_id, path) for node_id, paths in videos.items() for path in paths]
+    if not entries:
+        return None
+    primary_path = entries[0][1]
+
+    if mode == "inline":
+        # 응답에는 첫 번째 비디오만 포함되므로 나머지는 인코딩하지 않음
+        if prefetch is not None:
+            return {"video": prefetch.get("base64", primary_path, encode_file_base64, primary_path)}
+        return {"video": encode_file_base64(primary_path)}
+
+    def upload(entry):
+        if prefetch is not None:
+            return prefetch.get("s3", entry[1], store.upload_file, entry[1], key_prefix)
+        return store.upload_file(entry[1], key_prefix)
+
+    # 출력 노드가 여러 개면 병렬로 업로드
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(entries)))) as pool:
+        uploaded = list(pool.map(upload, entries))
+    primary = uploaded[0]
+    return {
+        "video_url": primary["url"],
+        "video_size": primary["size"],
+        "video_sha256": primary["sha256"],
+        "videos": [dict(node=node_id, **info) for (node_id, _), info in zip(entries, uploaded)],
+    }
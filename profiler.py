@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from comfy_client import received_at
+
+logger = logging.getLogger(__name__)
+
+# 노드 입력 중 해상도/길이/스텝으로 보는 이름 (커스텀 워크플로우에서 집계 키를 찾을 때 사용)
+_DIMENSION_INPUTS = {
+    "width": ("width",),
+    "height": ("height",),
+    "length": ("length", "num_frames", "frame_count"),
+    "steps": ("steps",),
+}
+
+
+def workload_dims(prompt, params=None):
+    """집계용 작업 크기 {width, height, length, steps}. 템플릿 파라미터가 있으면 그것을 사용"""
+    if params:
+        return {key: params.get(key) for key in _DIMENSION_INPUTS}
+    dims = {}
+    for node in prompt.values():
+        inputs = node.get("inputs") or {}
+        for key, names in _DIMENSION_INPUTS.items():
+            if key in dims:
+                continue
+            for name in names:
+                if isinstance(inputs.get(name), int):
+                    dims[key] = inputs[name]
+                    break
+    return {key: dims.get(key) for key in _DIMENSION_INPUTS}
+
+
+def dims_label(dims):
+    width, height, length, steps = (dims.get(key) for key in ("width", "height", "length", "steps"))
+    return f"{width}x{height}x{length}@{steps}"
+
+
+class NodeProfiler:
+    """한 prompt의 웹소켓 메시지로 노드별 실행 시간과 캐시 적중 여부를 측정
+
+    ComfyUI는 노드를 하나씩 실행하므로 한 노드의 시간은 그 노드의 executing부터
+    다음 executing(또는 완료)까지로 본다.
+    """
+
+    def __init__(self, prompt_id, prompt, dims=None):
+        self.prompt_id = prompt_id
+        self.prompt = prompt
+        self.dims = dims or {}
+        self.nodes = {}
+        self.started_at = None
+        self.finished_at = None
+        self._current = None
+        self._current_started = None
+
+    def _node(self, node_id):
+        entry = self.nodes.get(node_id)
+        if entry is None:
+            node = self.prompt.get(node_id) or {}
+            entry = self.nodes[node_id] = {
+                "node": node_id,
+                "class_type": node.get("class_type"),
+                "title": (node.get("_meta") or {}).get("title"),
+                "seconds": 0.0,
+                "cached": False,
+                "steps": 0,
+            }
+        return entry
+
+    def _close_current(self, now):
+        if self._current is not None:
+            self._node(self._current)["seconds"] += now - self._current_started
+        self._current = None
+
+    def feed(self, message):
+        if not isinstance(message, dict):
+            return
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        if data.get("prompt_id") not in (None, self.prompt_id):
+            return
+        now = received_at(message)
+
+        if msg_type == "execution_start":
+            self.started_at = now
+        elif msg_type == "execution_cached":
+            for node_id in data.get("nodes", []):
+                self._node(node_id)["cached"] = True
+        elif msg_type == "executing":
+            self._close_current(now)
+            node_id = data.get("node")
+            if node_id is None:
+                self.finished_at = now
+                return
+            if self.started_at is None:
+                self.started_at = now
+            self._current, self._current_started = node_id, now
+            self._node(node_id)
+        elif msg_type == "progress":
+            node_id = data.get("node") or self._current
+            if node_id is not None:
+                entry = self._node(node_id)
+                entry["steps"] = max(entry["steps"], data.get("value", 0))
+        elif msg_type in ("execution_error", "execution_interrupted"):
+            self._close_current(now)
+            self.finished_at = now
+
+    def report(self):
+        """prompt 하나의 프로파일 (노드는 실행 시간이 긴 순)"""
+        total = (self.finished_at or time.monotonic()) - self.started_at if self.started_at is not None else 0.0
+        nodes = sorted(self.nodes.values(), key=lambda entry: entry["seconds"], reverse=True)
+        return {
+            "prompt_id": self.prompt_id,
+            "dims": self.dims,
+            "total_seconds": round(total, 4),
+            "cached_nodes": sum(1 for entry in nodes if entry["cached"]),
+            "nodes": [{**entry, "seconds": round(entry["seconds"], 4)} for entry in nodes],
+        }
+
+
+class ProfileAggregator:
+    """job별 프로파일을 노드 class_type별, 그리고 (class_type, 작업 크기)별로 누적한 리포트
+
+    report_dir가 있으면 job별 JSON(<prompt_id>.json)과 누적 리포트(report.json)를 쓴다.
+    """
+
+    def __init__(self, report_dir=None):
+        self.report_dir = report_dir
+        self.jobs = 0
+        self.total_seconds = 0.0
+        self.by_class = {}
+        self.by_dims = {}
+        self._lock = threading.Lock()
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        report_dir = os.getenv('PROFILE_DIR') or None
+        try:
+            return cls(report_dir)
+        except OSError as e:
+            logger.warning(f"프로파일 디렉토리를 만들 수 없어 파일로 저장하지 않습니다: {report_dir} ({e})")
+            return cls()
+
+    @staticmethod
+    def _accumulate(stats, entry):
+        stats["count"] += 1
+        if entry["cached"]:
+            stats["cached"] += 1
+        else:
+            stats["seconds"] += entry["seconds"]
+            stats["max_seconds"] = max(stats["max_seconds"], entry["seconds"])
+
+    def add(self, profile):
+        label = dims_label(profile["dims"])
+        with self._lock:
+            self.jobs += 1
+            self.total_seconds += profile["total_seconds"]
+            for entry in profile["nodes"]:
+                class_type = entry["class_type"] or "unknown"
+                empty = {"count": 0, "cached": 0, "seconds": 0.0, "max_seconds": 0.0}
+                self._accumulate(self.by_class.setdefault(class_type, dict(empty)), entry)
+                self._accumulate(self.by_dims.setdefault(label, {}).setdefault(class_type, dict(empty)), entry)
+        if self.report_dir:
+            self._write(f"{profile['prompt_id']}.json", profile)
+            self._write("report.json", self.report())
+
+    @staticmethod
+    def _summarize(table, total):
+        rows = []
+        for class_type, stats in table.items():
+            executed = stats["count"] - stats["cached"]
+            rows.append({
+                "class_type": class_type,
+                "count": stats["count"],
+                "cached": stats["cached"],
+                "seconds": round(stats["seconds"], 3),
+                "mean_seconds": round(stats["seconds"] / executed, 3) if executed else 0.0,
+                "max_seconds": round(stats["max_seconds"], 3),
+                "share": round(stats["seconds"] / total, 4) if total else 0.0,
+            })
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def report(self):
+        """누적 리포트: 실행 시간 비중이 큰 노드 타입 순, 작업 크기별로도 같은 표"""
+        with self._lock:
+            by_dims = {}
+            for label, table in self.by_dims.items():
+                total = sum(stats["seconds"] for stats in table.values())
+                by_dims[label] = self._summarize(table, total)
+            return {
+                "jobs": self.jobs,
+                "total_seconds": round(self.total_seconds, 3),
+                "by_class_type": self._summarize(self.by_class, sum(s["seconds"] for s in self.by_class.values())),
+                "by_dims": by_dims,
+            }
+
+    def _write(self, name, payload):
+        path = os.path.join(self.report_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"프로파일 저장 실패: {path} ({e})")
@@ -0,0 +1,161 @@
+import base64
+import io
+import logging
+import struct
+
+from comfy_client import received_at
+
+logger = logging.getLogger(__name__)
+
+# ComfyUI 바이너리 웹소켓 메시지 타입 (server.py BinaryEventTypes)
+PREVIEW_IMAGE = 1
+# 프리뷰 이미지 포맷 (1: JPEG, 2: PNG)
+_PREVIEW_FORMATS = {1: "jpeg", 2: "png"}
+
+
+class ProgressTracker:
+    """하나의 prompt에 대한 ComfyUI 웹소켓 메시지를 구조화된 진행 이벤트로 변환"""
+
+    def __init__(self, prompt_id, prompt, preview=False, preview_max_size=256, preview_interval=1.0):
+        self.prompt_id = prompt_id
+        self.prompt = prompt
+        self.preview = preview
+        self.preview_max_size = preview_max_size
+        self.preview_interval = preview_interval
+
+        self.total_nodes = len(prompt) if isinstance(prompt, dict) else 0
+        self.cached_nodes = set()
+        self.executed_nodes = set()
+        self.current_node = None
+        # 시각은 모두 time.monotonic 기준 (웹소켓 수신 시각)
+        self.started_at = None
+        self.node_started_at = None
+        self._message_at = None
+        self.running = False
+        self._last_preview_at = 0.0
+
+    def _class_type(self, node_id):
+        node = self.prompt.get(node_id) if isinstance(self.prompt, dict) else None
+        return node.get("class_type") if isinstance(node, dict) else None
+
+    def percent(self, step=None, max_step=None):
+        """캐시된 노드를 제외한 전체 노드 대비 진행률(%)"""
+        remaining = self.total_nodes - len(self.cached_nodes)
+        if remaining <= 0:
+            return None
+        done = len(self.executed_nodes - self.cached_nodes)
+        if step is not None and max_step:
+            done += step / max_step
+        return round(min(done / remaining, 1.0) * 100, 1)
+
+    def _event(self, event_type, **fields):
+        event = {"type": event_type, "prompt_id": self.prompt_id}
+        if self.started_at is not None:
+            event["elapsed"] = round(self._message_at - self.started_at, 2)
+        event.update(fields)
+        return event
+
+    def feed(self, message):
+        """웹소켓 메시지(str 또는 bytes) 하나를 처리하고 클라이언트로 보낼 이벤트(dict) 또는 None을 반환"""
+        self._message_at = now = received_at(message)
+        if isinstance(message, (bytes, bytearray)):
+            return self._feed_binary(message)
+
+        msg_type = message.get("type")
+        data = message.get("data", {})
+        if data.get("prompt_id") not in (None, self.prompt_id):
+            return None
+
+        if msg_type == "execution_start":
+            self.running = True
+            self.started_at = now
+            return self._event("started", total_nodes=self.total_nodes)
+
+        if msg_type == "execution_cached":
+            self.cached_nodes.update(data.get("nodes", []))
+            return self._event("cached", nodes=data.get("nodes", []), percent=self.percent())
+
+        if msg_type == "executing":
+            node = data.get("node")
+            if self.current_node is not None:
+                self.executed_nodes.add(self.current_node)
+            self.current_node = node
+            if node is None:
+                self.running = False
+                return self._event("finished", percent=100.0)
+            if self.started_at is None:
+                self.started_at = now
+            self.running = True
+            self.node_started_at = now
+            return self._event("executing", node=node, class_type=self._class_type(node), percent=self.percent())
+
+        if msg_type == "progress":
+            step = data.get("value", 0)
+            max_step = data.get("max", 0)
+            node = data.get("node") or self.current_node
+            eta = None
+            if self.node_started_at is not None and step > 0 and max_step:
+                per_step = (now - self.node_started_at) / step
+                eta = round(per_step * (max_step - step), 1)
+            return self._event(
+                "progress",
+                node=node,
+                class_type=self._class_type(node),
+                step=step,
+                max=max_step,
+                percent=self.percent(step, max_step),
+                eta=eta,
+            )
+
+        if msg_type == "executed":
+            node = data.get("node")
+            self.executed_nodes.add(node)
+            return self._event("executed", node=node, class_type=self._class_type(node), percent=self.percent())
+
+        if msg_type == "execution_error":
+            self.running = False
+            return self._event(
+                "error",
+                node=data.get("node_id"),
+                class_type=data.get("node_type"),
+                message=data.get("exception_message"),
+            )
+
+        if msg_type == "execution_interrupted":
+            self.running = False
+            return self._event("interrupted", node=data.get("node_id"))
+
+        return None
+
+    def _feed_binary(self, message):
+        # 바이너리 메시지에는 prompt_id가 없으므로 이 prompt가 실행 중일 때만 프리뷰로 간주
+        if not self.preview or not self.running or len(message) < 8:
+            return None
+        event_type, image_format = struct.unpack(">II", message[:8])
+        if event_type != PREVIEW_IMAGE:
+            return None
+        now = self._message_at
+        if now - self._last_preview_at < self.preview_interval:
+            return None
+        self._last_preview_at = now
+
+        image_data = message[8:]
+        try:
+            from PIL import Image
+            with Image.open(io.BytesIO(image_data)) as image:
+                image = image.convert("RGB")
+                image.thumbnail((self.preview_max_size, self.preview_max_size))
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=70)
+                image_data = buffer.getvalue()
+                mime = "image/jpeg"
+        except Exception as e:
+            # PIL이 없거나 디코딩에 실패하면 원본 프리뷰를 그대로 전달
+            logger.debug(f"프리뷰 축소 실패, 원본을 전달합니다: {e}")
+            mime = f"image/{_PREVIEW_FORMATS.get(image_format, 'jpeg')}"
+
+        return self._event(
+            "preview",
+            node=self.current_node,
+            image=f"data:{mime};base64,{base64.b64encode(image_data).decode('utf-8')}",
+        )
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from outputs import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# 캐시 키 형식이 바뀌면 올려서 이전 항목을 무효화
+CACHE_KEY_VERSION = 1
+
+
+class ResultCache:
+    """패치가 끝난 prompt 그래프와 입력 이미지 해시로 주소화한 생성 결과 캐시 (네트워크 볼륨)
+
+    항목 구조: <cache_dir>/<key>/manifest.json + 출력 파일들 (manifest의 mtime을 LRU 접근 시각으로 사용)
+    """
+
+    def __init__(self, cache_dir, max_bytes=20 * 1024 ** 3):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        cache_dir = os.getenv('RESULT_CACHE_DIR', '/runpod-volume/cache/results')
+        if not cache_dir:
+            return None
+        try:
+            return cls(cache_dir, int(os.getenv('RESULT_CACHE_MAX_BYTES', str(20 * 1024 ** 3))))
+        except OSError as e:
+            logger.warning(f"결과 캐시 디렉토리를 만들 수 없어 캐시 없이 동작합니다: {cache_dir} ({e})")
+            return None
+
+    @staticmethod
+    def key_for(prompt, input_paths):
+        """prompt 그래프 + 입력 파일 내용으로 결정적인 캐시 키를 계산
+
+        job마다 달라지는 입력 경로(task_<uuid>/...)는 그래프 안에서 내용 해시로 치환한다.
+        """
+        input_hashes = {path: file_sha256(path) for path in input_paths}
+
+        def canonical(value):
+            if isinstance(value, dict):
+                return {k: canonical(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [canonical(v) for v in value]
+            if isinstance(value, str) and value in input_hashes:
+                return f"sha256:{input_hashes[value]}"
+            return value
+
+        payload = {
+            "version": CACHE_KEY_VERSION,
+            "prompt": canonical(prompt),
+            "inputs": sorted(input_hashes.values()),
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """캐시된 출력({node_id: [path, ...]}) 또는 None을 반환하고 적중/미스를 집계"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            videos = {
+                node_id: [os.path.join(entry_dir, name) for name in names]
+                for node_id, names in manifest["outputs"].items()
+            }
+            if not all(os.path.exists(path) for paths in videos.values() for path in paths):
+                raise OSError("출력 파일 일부가 없습니다.")
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.info(f"♻️ 결과 캐시 적중: {key[:16]}")
+        return videos
+
+    def store(self, key, videos):
+        """출력 파일을 캐시에 저장 (임시 디렉토리에 만든 뒤 rename으로 원자적으로 등록)"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            outputs = {}
+            for node_id, paths in videos.items():
+                outputs[node_id] = []
+                for index, path in enumerate(paths):
+                    name = f"{node_id}_{index}_{os.path.basename(path)}"
+                    try:
+                        os.link(path, os.path.join(tmp_dir, name))
+                    except OSError:
+                        shutil.copyfile(path, os.path.join(tmp_dir, name))
+                    outputs[node_id].append(name)
+            with open(os.path.join(tmp_dir, "manifest.json"), 'w') as f:
+                json.dump({"outputs": outputs, "created_at": time.time()}, f)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logger.warning(f"결과 캐시 저장 실패: {e}")
+            return
+        logger.info(f"💾 결과 캐시 저장: {key[:16]}")
+        self._evict(keep=entry_dir)
+
+    def _evict(self, keep=None):
+        """총 용량이 예산을 넘으면 가장 오래 사용하지 않은 항목부터 삭제"""
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    if not item.is_dir() or item.name.startswith('.'):
+                        continue
+                    try:
+                        accessed = os.path.getmtime(os.path.join(item.path, "manifest.json"))
+                        size = sum(f.stat().st_size for f in os.scandir(item.path) if f.is_file())
+                    except OSError:
+                        continue
+                    entries.append((accessed, size, item.path))
+                    total += size
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                logger.info(f"🧹 결과 캐시 제거: {os.path.basename(path)[:16]} ({size} bytes)")
+
+    def stats(self, hit, key):
+        return {"hit": hit, "key": key, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from model_paths import MODEL_FILE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+def model_set_key(prompt):
+    """prompt가 로드하는 모델/LoRA 파일과 그 강도로 결정적인 키를 계산 (바뀌면 ComfyUI가 다시 로드/패치함)"""
+    entries = []
+    for node_id, node in prompt.items():
+        inputs = node.get("inputs") or {}
+        files = [
+            (name, value) for name, value in inputs.items()
+            if isinstance(value, str) and value.lower().endswith(MODEL_FILE_EXTENSIONS)
+        ]
+        if not files:
+            continue
+        strengths = [
+            (name, value) for name, value in inputs.items()
+            if name.startswith("strength") and isinstance(value, (int, float))
+        ]
+        entries.append([node_id, sorted(files), sorted(strengths)])
+    encoded = json.dumps(sorted(entries), separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+class _Ticket:
+    """게이트 대기열의 한 prompt"""
+
+    def __init__(self, key):
+        self.key = key
+        self.skipped = 0
+        self.swapped = False
+        self.reordered = False
+        self.enqueued_at = time.monotonic()
+
+
+class PromptGate:
+    """ComfyUI 큐에 동시에 올라가는 prompt 수를 제한하는 게이트
+
+    ComfyUI는 큐를 하나씩 실행하므로 slots=2면 한 prompt가 실행되는 동안
+    다음 job의 prompt를 미리 큐에 넣어 둘 수 있고, 그 이상은 워커 안에서 대기한다.
+    대기 중인 prompt 중 마지막으로 큐에 넣은 prompt와 모델/LoRA 세트가 같은 것을 먼저 보내
+    모델 재로드를 줄인다. 한 prompt가 추월당하는 횟수는 max_skips로 제한한다 (0이면 FIFO).
+    """
+
+    def __init__(self, slots=2, max_skips=3):
+        self.slots = slots
+        self.max_skips = max_skips
+        self.current_key = None
+        self.swaps = 0
+        self.avoided_swaps = 0
+        self._active = 0
+        self._waiting = []
+        self._cond = threading.Condition()
+        # 모델 교체 여부별 실행 시간 합계/횟수 (교체 비용 추정용)
+        self._exec_totals = {True: [0.0, 0], False: [0.0, 0]}
+
+    def _next_waiter(self):
+        head = self._waiting[0]
+        if self.current_key is None or head.key == self.current_key or head.skipped >= self.max_skips:
+            return head
+        for ticket in self._waiting[1:]:
+            if ticket.key == self.current_key:
+                return ticket
+        return head
+
+    def acquire(self, key=None, check=None, poll=1.0):
+        """슬롯을 얻을 때까지 대기. check가 있으면 poll초마다 호출하고, 예외를 던지면 대기열에서 빠지며 전파"""
+        ticket = _Ticket(key)
+        with self._cond:
+            self._waiting.append(ticket)
+            while self._active >= self.slots or self._next_waiter() is not ticket:
+                if check is None:
+                    self._cond.wait()
+                    continue
+                self._cond.wait(poll)
+                try:
+                    check()
+                except BaseException:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    raise
+            index = self._waiting.index(ticket)
+            if index > 0:
+                # 앞에 있던 prompt들은 한 번씩 추월당함
+                for skipped in self._waiting[:index]:
+                    skipped.skipped += 1
+                ticket.reordered = True
+                self.avoided_swaps += 1
+            self._waiting.remove(ticket)
+            self._active += 1
+            if key is not None:
+                ticket.swapped = self.current_key is not None and key != self.current_key
+                if ticket.swapped:
+                    self.swaps += 1
+                self.current_key = key
+            # 남은 슬롯이 있으면 다음 대기자도 깨움
+            self._cond.notify_all()
+        if ticket.reordered:
+            logger.info(f"🔄 모델 세트가 같은 prompt를 먼저 실행합니다 (key {key}, 추월 {index}개)")
+        return ticket
+
+    def release(self, ticket=None):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record_execution(self, ticket, seconds):
+        """prompt 실행 시간을 모델 교체 여부별로 집계"""
+        with self._cond:
+            totals = self._exec_totals[ticket.swapped]
+            totals[0] += seconds
+            totals[1] += 1
+
+    def swap_cost(self):
+        """모델 교체가 있었던 실행과 없었던 실행의 평균 시간 차이(초). 표본이 없으면 None"""
+        with self._cond:
+            (swap_total, swap_count), (same_total, same_count) = self._exec_totals[True], self._exec_totals[False]
+        if not swap_count or not same_count:
+            return None
+        return max(swap_total / swap_count - same_total / same_count, 0.0)
+
+    def stats(self, ticket):
+        cost = self.swap_cost()
+        return {
+            "model_key": ticket.key,
+            "model_swap": ticket.swapped,
+            "reordered": ticket.reordered,
+            "swaps": self.swaps,
+            "avoided_swaps": self.avoided_swaps,
+            "swap_cost_seconds": round(cost, 3) if cost is not None else None,
+            "estimated_seconds_saved": round(cost * self.avoided_swaps, 3) if cost is not None else None,
+        }
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
@@ -0,0 +1,65 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """진행 중인 실행 하나. 리더가 결과를 채우면 대기 중인 팔로워들이 깨어남"""
+
+    def __init__(self, key):
+        self.key = key
+        self.prompt_id = None
+        self.followers = 0
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def done(self, timeout=None):
+        """결과가 준비될 때까지 최대 timeout초 기다리고 준비 여부를 반환"""
+        return self._done.wait(timeout)
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise Exception(f"동일 job(prompt {self.prompt_id})의 결과 대기 시간 초과")
+        if self.error is not None:
+            raise Exception(f"동일 job(prompt {self.prompt_id}) 실행 실패: {self.error}")
+        return self.result
+
+
+class SingleFlight:
+    """같은 키의 동시 실행을 하나로 합치는 in-flight 병합 계층"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """(call, leader) 반환. leader가 True면 호출자가 실제로 실행하고 finish/fail을 호출해야 함"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                return call, False
+            call = _Call(key)
+            self._calls[key] = call
+            return call, True
+
+    def leave(self, call):
+        """팔로워가 결과를 더 기다리지 않음 (마감/취소). 남은 팔로워가 없으면 리더가 실행을 중단할 수 있음"""
+        with self._lock:
+            call.followers = max(call.followers - 1, 0)
+
+    def finish(self, call, result):
+        with self._lock:
+            self._calls.pop(call.key, None)
+        call.result = result
+        call._done.set()
+        if call.followers:
+            logger.info(f"🔗 prompt {call.prompt_id}의 결과를 동일 job {call.followers}개와 공유했습니다.")
+
+    def fail(self, call, error):
+        with self._lock:
+            self._calls.pop(call.key, None)
+        call.error = error
+        call._done.set()
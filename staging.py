@@ -0,0 +1,169 @@
+import io
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+from outputs import file_sha256
+
+logger = logging.getLogger(__name__)
+
+STAGED_SUBFOLDER = "staged"
+
+
+class _MultipartFile(io.RawIOBase):
+    """파일 하나를 multipart/form-data 본문으로 감싸 메모리에 올리지 않고 스트리밍하는 file-like 객체"""
+
+    def __init__(self, path, filename, content_type, boundary, fields=None):
+        head = []
+        for name, value in (fields or {}).items():
+            head.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n')
+        head.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        )
+        self._head = ''.join(head).encode()
+        self._tail = f'\r\n--{boundary}--\r\n'.encode()
+        self._path = path
+        self._file = None
+        self.length = len(self._head) + os.path.getsize(path) + len(self._tail)
+        self.seek(0)
+
+    def readable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # 재시도 시 처음부터 다시 보내기 위한 용도로만 사용
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._path, 'rb')
+        self._parts = [io.BytesIO(self._head), self._file, io.BytesIO(self._tail)]
+        return 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length
+        while self._parts:
+            data = self._parts[0].read(size)
+            if data:
+                return data
+            self._parts.pop(0)
+        return b''
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        super().close()
+
+
+def staged_reference(result):
+    """stage 결과를 워크플로우의 LoadImage image 입력에 넣을 이름으로 변환 (예: staged/<sha256>.jpg)"""
+    subfolder = result.get("subfolder") or ""
+    return f"{subfolder}/{result['name']}" if subfolder else result["name"]
+
+
+def rewrite_image_references(prompt, filename, reference):
+    """워크플로우에서 filename을 가리키는 노드 입력을 reference로 바꾼 복사본과 바꾼 개수를 반환"""
+    replacements = {filename: reference, f"{filename} [input]": f"{reference} [input]"}
+    rewritten = {}
+    count = 0
+    for node_id, node in prompt.items():
+        inputs = node.get("inputs") if isinstance(node, dict) else None
+        if isinstance(inputs, dict) and any(isinstance(v, str) and v in replacements for v in inputs.values()):
+            new_inputs = {}
+            for name, value in inputs.items():
+                if isinstance(value, str) and value in replacements:
+                    value = replacements[value]
+                    count += 1
+                new_inputs[name] = value
+            node = dict(node, inputs=new_inputs)
+        rewritten[node_id] = node
+    return rewritten, count
+
+
+class InputStager:
+    """ComfyUI 입력 이미지를 해시 기반으로 중복 제거하며 입력 디렉토리에 배치
+
+    이미지는 항상 input/staged/<sha256><ext> 이름으로 준비되므로, 동시에 실행되는 job이
+    같은 파일 이름(input_image.jpg 등)을 써도 서로의 입력을 덮어쓰지 않는다. 워크플로우의 참조는
+    rewrite_image_references로 이 이름으로 바꾼다. 입력 디렉토리를 공유하는 경우(같은 호스트/볼륨)
+    HTTP 업로드 없이 직접 저장하고, 공유하지 않는 경우에만 스트리밍 multipart 업로드로 대체한다.
+    """
+
+    def __init__(self, comfy, input_dir=None):
+        self.comfy = comfy
+        self.input_dir = input_dir if input_dir and os.path.isdir(input_dir) else None
+        self._uploaded = set()
+        self._hash_cache = {}
+        self._lock = threading.Lock()
+        if self.input_dir:
+            os.makedirs(os.path.join(self.input_dir, STAGED_SUBFOLDER), exist_ok=True)
+            logger.info(f"📂 ComfyUI 입력 디렉토리를 직접 사용합니다: {self.input_dir}")
+
+    def _sha256(self, path):
+        # 같은 파일(경로, 크기, mtime)은 다시 해시하지 않음
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._hash_cache.get(key)
+        if digest is None:
+            digest = file_sha256(path)
+            if len(self._hash_cache) >= 1024:
+                self._hash_cache.clear()
+            self._hash_cache[key] = digest
+        return digest
+
+    def stage(self, image_path, filename=None):
+        """이미지를 ComfyUI 입력(staged/<sha256><ext>)으로 준비하고 업로드 API와 같은 형식의 결과를 반환"""
+        filename = filename or os.path.basename(image_path)
+        digest = self._sha256(image_path)
+        staged_name = digest + os.path.splitext(filename)[1].lower()
+        if self.input_dir:
+            result = self._stage_local(image_path, staged_name, digest)
+        else:
+            result = self._stage_upload(image_path, staged_name, digest)
+        return dict(result, original_name=filename)
+
+    def _stage_local(self, image_path, staged_name, digest):
+        staged_path = os.path.join(self.input_dir, STAGED_SUBFOLDER, staged_name)
+
+        with self._lock:
+            hit = os.path.exists(staged_path)
+            if not hit:
+                self._link_or_copy(image_path, staged_path)
+        logger.info(f"{'♻️ 해시 적중, 업로드 생략' if hit else '✅ 입력 디렉토리에 배치'}: {staged_name}")
+        return {"name": staged_name, "subfolder": STAGED_SUBFOLDER, "type": "input", "sha256": digest, "deduplicated": hit}
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        # 임시 이름으로 만든 뒤 rename해서 ComfyUI가 쓰다 만 파일을 읽지 않도록 함
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst), suffix=".tmp")
+        os.close(fd)
+        os.remove(tmp_path)
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+    def _stage_upload(self, image_path, staged_name, digest):
+        with self._lock:
+            if staged_name in self._uploaded:
+                logger.info(f"♻️ 같은 내용이 이미 업로드되어 있어 생략: {staged_name}")
+                return {"name": staged_name, "subfolder": STAGED_SUBFOLDER, "type": "input", "sha256": digest, "deduplicated": True}
+
+        content_type = mimetypes.guess_type(staged_name)[0] or 'application/octet-stream'
+        boundary = '----WebKitFormBoundary' + uuid.uuid4().hex
+        # 이름이 내용 해시이므로 덮어써도 같은 내용
+        body = _MultipartFile(image_path, staged_name, content_type, boundary,
+                              fields={"subfolder": STAGED_SUBFOLDER, "overwrite": "true"})
+        try:
+            result = self.comfy.upload_image(body, f'multipart/form-data; boundary={boundary}', body.length)
+        finally:
+            body.close()
+
+        with self._lock:
+            self._uploaded.add(staged_name)
+        return dict(result, sha256=digest, deduplicated=False)
@@ -0,0 +1,79 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def process_alive(pid):
+    """pid 프로세스가 살아 있는지 확인 (좀비 상태도 종료로 봄)"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            state = f.read().rsplit(')', 1)[1].split()[0]
+    except (OSError, IndexError):
+        return False
+    return state not in ("Z", "X")
+
+
+class ColdStart:
+    """컨테이너 시작부터 첫 job을 받을 준비가 될 때까지의 단계별 시간을 기록하고,
+    ComfyUI 준비 확인/웹소켓 연결/웜업을 백그라운드에서 실행한다.
+
+    entrypoint.sh가 BOOT_STARTED_AT(epoch 초)과 COMFYUI_PID를 넘겨 준다.
+    """
+
+    def __init__(self, comfy, started_at=None, comfy_pid=None):
+        self.comfy = comfy
+        self.started_at = started_at or time.time()
+        self.comfy_pid = comfy_pid
+        self.timings = {}
+        self.error = None
+        self.done = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, comfy):
+        started_at = os.getenv('BOOT_STARTED_AT')
+        comfy_pid = os.getenv('COMFYUI_PID')
+        return cls(
+            comfy,
+            started_at=float(started_at) if started_at else None,
+            comfy_pid=int(comfy_pid) if comfy_pid else None,
+        )
+
+    def mark(self, phase):
+        """시작 시점부터 phase 완료까지 걸린 시간(초)을 기록"""
+        self.timings[phase] = round(time.time() - self.started_at, 3)
+
+    def alive(self):
+        return self.comfy_pid is None or process_alive(self.comfy_pid)
+
+    def start(self, required_nodes=(), warmup=None):
+        """부팅 파이프라인을 백그라운드 스레드로 시작 (핸들러 런타임은 그동안 바로 job을 받을 수 있음)"""
+        self._thread = threading.Thread(
+            target=self._run, args=(required_nodes, warmup), name="cold-start", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, required_nodes, warmup):
+        try:
+            self.comfy.wait_until_ready(required_nodes=required_nodes, alive=self.alive)
+            self.mark("comfyui_ready")
+            self.comfy.start_dispatcher()
+            self.mark("websocket_connected")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"❌ 콜드 스타트 실패: {e}")
+            warmup = None
+        try:
+            if warmup is not None:
+                warmup()
+                self.mark("warmup_finished")
+        except Exception as e:
+            # 웜업 실패는 job 처리에 영향을 주지 않음 (첫 job이 모델을 로드)
+            logger.warning(f"⚠️ 웜업 실패: {e}")
+        finally:
+            self.done.set()
+            phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
+            logger.info(f"⏱️ 콜드 스타트 단계별 시간: {phases}")
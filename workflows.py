@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _lora_bindings(high_node, low_node, max_loras=4):
+    # LoRA 노드가 없는 템플릿도 LoRA 없이는 쓸 수 있지만, LoRA를 요청했는데 노드가 없으면 에러
+    bindings = {}
+    for i in range(1, max_loras + 1):
+        for param, node, node_input in (
+            (f"lora_high_{i}", high_node, f"lora_{i}"),
+            (f"lora_high_weight_{i}", high_node, f"strength_{i}"),
+            (f"lora_low_{i}", low_node, f"lora_{i}"),
+            (f"lora_low_weight_{i}", low_node, f"strength_{i}"),
+        ):
+            bindings[param] = [{"node": node, "input": node_input, "optional": True, "required_if_set": True}]
+    return bindings
+
+
+# 파라미터 이름 -> 값을 넣을 노드 입력 목록. optional 노드는 템플릿에 없으면 건너뜀
+# (required_if_set이면 그 파라미터에 값이 주어졌을 때는 건너뛰지 않고 에러)
+WAN22_BINDINGS = {
+    "image_path": [{"node": "244", "input": "image"}],
+    "length": [{"node": "541", "input": "num_frames"}],
+    "prompt": [{"node": "135", "input": "positive_prompt"}],
+    "seed": [{"node": "220", "input": "seed"}, {"node": "540", "input": "seed"}],
+    "cfg": [{"node": "540", "input": "cfg"}],
+    "width": [{"node": "235", "input": "value"}],
+    "height": [{"node": "236", "input": "value"}],
+    "context_overlap": [{"node": "498", "input": "context_overlap"}],
+    "steps": [{"node": "834", "input": "steps", "optional": True}],
+    "low_steps": [{"node": "829", "input": "step", "optional": True}],
+    **_lora_bindings("279", "553"),
+}
+
+WAN22_FLF2V_BINDINGS = {
+    **WAN22_BINDINGS,
+    "end_image_path": [{"node": "617", "input": "image"}],
+}
+
+# 기본 제공 템플릿: 이름 -> (파일 경로, 바인딩)
+BUILTIN_TEMPLATES = {
+    "wan22": ("/new_Wan22_api.json", WAN22_BINDINGS),
+    "wan22_flf2v": ("/new_Wan22_flf2v_api.json", WAN22_FLF2V_BINDINGS),
+}
+
+
+class WorkflowTemplate:
+    """한 번 로드/검증된 ComfyUI API 워크플로우와 파라미터 바인딩"""
+
+    def __init__(self, name, path, bindings):
+        self.name = name
+        self.path = path
+        self.bindings = bindings
+        self.graph = None
+        self.mtime = None
+        self.error = None
+
+    def load(self):
+        self.mtime = os.path.getmtime(self.path)
+        try:
+            with open(self.path, 'r') as f:
+                graph = json.load(f)
+            self.error = self.validate(graph)
+        except (OSError, ValueError) as e:
+            graph, self.error = None, str(e)
+        self.graph = graph if self.error is None else None
+        if self.error:
+            logger.warning(f"⚠️ 워크플로우 템플릿 '{self.name}'이(가) 유효하지 않습니다 ({self.path}): {self.error}")
+        else:
+            logger.info(f"✅ 워크플로우 템플릿 로드: {self.name} ({len(graph)} nodes)")
+
+    def validate(self, graph):
+        """그래프 구조와 바인딩 대상 노드를 검증하고 오류 메시지(없으면 None)를 반환"""
+        if not isinstance(graph, dict):
+            return "API 형식(노드 ID -> 노드) 워크플로우가 아닙니다."
+        for node_id, node in graph.items():
+            if not isinstance(node, dict) or "class_type" not in node or not isinstance(node.get("inputs"), dict):
+                return f"노드 {node_id}에 class_type/inputs가 없습니다."
+        for param, targets in self.bindings.items():
+            for target in targets:
+                if target["node"] not in graph and not target.get("optional"):
+                    return f"바인딩 '{param}'의 노드 {target['node']}이(가) 없습니다."
+        return None
+
+    def instantiate(self, params):
+        """템플릿의 구조적 복사본에 파라미터를 적용한 prompt를 반환 (None 값은 적용하지 않음)"""
+        if self.graph is None:
+            raise Exception(f"워크플로우 템플릿 '{self.name}'을(를) 사용할 수 없습니다: {self.error}")
+        # inputs dict만 새로 만들고 링크 리스트 등 값은 공유 (바인딩은 값을 교체만 함)
+        prompt = {node_id: {**node, "inputs": dict(node["inputs"])} for node_id, node in self.graph.items()}
+        for param, value in params.items():
+            if value is None:
+                continue
+            for target in self.bindings.get(param, ()):
+                node = prompt.get(target["node"])
+                if node is not None:
+                    node["inputs"][target["input"]] = value
+                elif target.get("required_if_set"):
+                    raise Exception(f"워크플로우 템플릿 '{self.name}'에 '{param}'을(를) 적용할 노드 {target['node']}이(가) 없습니다.")
+        return prompt
+
+
+class WorkflowRegistry:
+    """워커 시작 시 모든 템플릿을 로드하고, 파일이 바뀌면 다시 로드하는 레지스트리
+
+    기본 템플릿 외에 template_dir의 <name>.json + <name>.bindings.json 쌍도 등록된다.
+    """
+
+    def __init__(self, builtin=None, template_dir=None, reload_interval=2.0):
+        self.builtin = builtin if builtin is not None else BUILTIN_TEMPLATES
+        self.template_dir = template_dir
+        self.reload_interval = reload_interval
+        self.templates = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _discover(self):
+        specs = {name: spec for name, spec in self.builtin.items() if os.path.exists(spec[0])}
+        if self.template_dir and os.path.isdir(self.template_dir):
+            for filename in os.listdir(self.template_dir):
+                if not filename.endswith(".bindings.json"):
+                    continue
+                name = filename[:-len(".bindings.json")]
+                path = os.path.join(self.template_dir, f"{name}.json")
+                if not os.path.exists(path):
+                    continue
+                try:
+                    with open(os.path.join(self.template_dir, filename), 'r') as f:
+                        specs[name] = (path, json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"⚠️ 바인딩 파일을 읽을 수 없습니다: {filename} ({e})")
+        return specs
+
+    def refresh(self, force=False):
+        """새 템플릿을 등록하고 mtime이 바뀐 템플릿을 다시 로드 (reload_interval 내 중복 호출은 무시)"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            specs = self._discover()
+            for name, (path, bindings) in specs.items():
+                template = self.templates.get(name)
+                if template is None or template.path != path or template.bindings != bindings:
+                    template = WorkflowTemplate(name, path, bindings)
+                    template.load()
+                    self.templates[name] = template
+                elif os.path.getmtime(path) != template.mtime:
+                    logger.info(f"🔄 워크플로우 템플릿 변경 감지, 다시 로드: {name}")
+                    template.load()
+            for name in set(self.templates) - set(specs):
+                del self.templates[name]
+
+    def get(self, name):
+        self.refresh()
+        template = self.templates.get(name)
+        if template is None:
+            raise Exception(f"알 수 없는 워크플로우 템플릿: {name} (사용 가능: {', '.join(sorted(self.templates))})")
+        return template